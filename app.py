@@ -1,49 +1,251 @@
-from flask import Flask, render_template, request, jsonify, redirect, url_for
+from flask import Flask, Response, render_template, request, jsonify, redirect, url_for, stream_with_context
 import networkx as nx
 import pandas as pd
+import atexit
 import json
 import os
+import tempfile
 from werkzeug.utils import secure_filename
-from utils.graph_utils import GraphProcessor
-from utils.data_processor import DataProcessor
-from utils.influence_calc import InfluenceCalculator
-
-# Ontology imports
-import rdflib
-from rdflib.namespace import RDF, Namespace
+from utils.graph_utils import GraphProcessor, DEFAULT_MAX_VISIBLE_NODES
+from utils.data_processor import PYARROW_AVAILABLE, DataProcessor
+from utils.influence_calc import InfluenceCalculator, COMMON_NEIGHBOR_LIMIT
+from utils.metric_cache import MetricCache
+from utils.pagerank import PageRankEngine
+from utils.graph_stats import GraphStats
+from utils.centrality import resolve_betweenness_sample_size
+from utils.ontology import OntologyValidator
+from utils.graph_store import GraphStore
+from utils.job_queue import JOB_TTL, MAX_RETAINED_JOBS, AnalyticsJobQueue
+from utils.parallel_centrality import CentralityEngine
+from utils.change_log import GraphChangeLog
+from utils.layout import LayoutEngine
+from utils.community import CommunityEngine
+from utils.diffusion import SpreadSimulator, DEFAULT_ACTIVATION_PROBABILITY, DEFAULT_RUNS, SIMULATION_SEED
+from utils.influence_index import InfluenceIndex
+from utils.snapshot import DEFAULT_MAX_LOG_RECORDS, SnapshotWriter
+from utils.mutation_log import MutationLog, archive_file
+from utils.json_stream import STREAM_FORMATS, SUPPORTED_ENCODINGS, iter_compressed, iter_json, iter_ndjson
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'your-secret-key-here'
 app.config['UPLOAD_FOLDER'] = 'static/data'
-app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
+# Uploads are streamed to disk and ingested in chunks, so the limit can be large
+app.config['MAX_CONTENT_LENGTH'] = int(os.environ.get('MAX_UPLOAD_MB', 4096)) * 1024 * 1024
+
+# DataProcessor reader for each upload file extension
+UPLOAD_READERS = {'csv': 'process_csv', 'json': 'process_json', 'jsonl': 'process_json_lines',
+                  'ndjson': 'process_json_lines', 'parquet': 'process_parquet', 'arrow': 'process_arrow',
+                  'arrows': 'process_arrow', 'feather': 'process_arrow'}
+# Columnar formats are read with pyarrow and only offered when it is installed
+COLUMNAR_EXTENSIONS = {'parquet', 'arrow', 'arrows', 'feather'}
+ALLOWED_EXTENSIONS = set(UPLOAD_READERS) - (set() if PYARROW_AVAILABLE else COLUMNAR_EXTENSIONS)
+
+def upload_extension(filename):
+    """Lower-cased file extension without the dot, or '' if there is none"""
+    return filename.rsplit('.', 1)[1].lower() if '.' in filename else ''
 
-# Load ontology
-ontology = rdflib.Graph()
-ontology.parse('ontology.owl', format='turtle')
-NS = Namespace('http://example.org/socialmedia#')
+# Load ontology once and precompile its domain/range rules into a lookup table
+ontology_validator = OntologyValidator.from_file('ontology.owl')
 
 # Validation function
 def validate_relationship(source_type, relation, target_type):
-    rel = NS[relation]
-    domain = ontology.value(rel, NS.domain)
-    range_ = ontology.value(rel, NS.range)
-    if domain and range_:
-        if domain.split('#')[-1] == source_type and range_.split('#')[-1] == target_type:
-            return True
-    return False
-
-# Initialize processors
-graph_processor = GraphProcessor()
-data_processor = DataProcessor()
-influence_calc = InfluenceCalculator()
+    return ontology_validator.validate(source_type, relation, target_type)
 
 # Global graph to store the influence network
 influence_graph = nx.DiGraph()
 
+# Metric cache; the graph store rebinds it to each new read snapshot
+metric_cache = MetricCache(influence_graph)
+
+# Running node/edge/degree counters, updated by every mutating endpoint
+graph_stats = GraphStats(influence_graph)
+
+# Sequence-numbered record of touched nodes/links, for incremental graph data refreshes
+change_log = GraphChangeLog()
+
+# Owner of the live graph: writes go through graph_store.apply, reads use graph_store.snapshot()
+graph_store = GraphStore(influence_graph, metric_cache, graph_stats, change_log)
+
+# PageRank solver shared by all processors so it can warm-start across graph versions
+pagerank_engine = PageRankEngine()
+
+# Betweenness/closeness worker pool, one process per core unless CENTRALITY_WORKERS says otherwise
+centrality_engine = CentralityEngine(int(os.environ.get('CENTRALITY_WORKERS', 0)) or None)
+
+# Louvain community detection that refines its previous partition after mutations
+community_engine = CommunityEngine()
+
+# Monte Carlo spread simulation, one worker process per core unless SIMULATION_WORKERS says otherwise
+spread_simulator = SpreadSimulator(int(os.environ.get('SIMULATION_WORKERS', 0)) or None)
+
+# Top-k influence ranking kept up to date from the change log between full PageRank refreshes
+influence_index = InfluenceIndex(change_log, float(os.environ.get('INFLUENCE_INDEX_REFRESH_INTERVAL', 60)))
+
+# Node coordinates kept across graph versions so only changed nodes are relaid out
+layout_engine = LayoutEngine()
+
+# Initialize processors
+graph_processor = GraphProcessor(metric_cache, pagerank_engine, graph_stats, centrality_engine, layout_engine)
+data_processor = DataProcessor(graph_stats, ontology_validator, change_log)
+influence_calc = InfluenceCalculator(metric_cache, pagerank_engine, graph_stats, centrality_engine, community_engine,
+                                     influence_index, spread_simulator)
+
+# Upper bound on Monte Carlo runs per spread simulation request
+MAX_SIMULATION_RUNS = int(os.environ.get('MAX_SIMULATION_RUNS', 100000))
+
+# Batch influence chain queries: users per request, and threads searching groups of users in parallel
+MAX_CHAIN_BATCH_USERS = int(os.environ.get('MAX_CHAIN_BATCH_USERS', 10000))
+CHAIN_BATCH_WORKERS = int(os.environ.get('CHAIN_BATCH_WORKERS', 4))
+
+# Background workers for analytics too slow to run inside a request, and how long finished jobs are kept
+job_queue = AnalyticsJobQueue(graph_store, max_workers=int(os.environ.get('ANALYTICS_WORKERS', 2)),
+                              job_ttl=float(os.environ.get('ANALYTICS_JOB_TTL', JOB_TTL)),
+                              max_jobs=int(os.environ.get('ANALYTICS_MAX_JOBS', MAX_RETAINED_JOBS)))
+# Job snapshot files live in a temporary directory that is removed on exit
+atexit.register(job_queue.shutdown)
+
+# Graph mutations, shared by the endpoints and mutation log replay; each runs inside graph_store.apply
+def add_user_mutation(graph, user_handle, follower_count, engagement_score, niche=None):
+    is_new = user_handle not in graph
+    graph.add_node(user_handle, 
+                   follower_count=follower_count,
+                   engagement_score=engagement_score,
+                   node_type='user')
+    # Count the node only once add_node has accepted it
+    if is_new:
+        graph_stats.node_added()
+    if niche is not None:
+        graph.nodes[user_handle]['niche'] = niche
+    change_log.record(nodes=[user_handle])
+    return graph_stats.num_nodes
+
+def add_relationship_mutation(graph, source, target, relationship_type, weight):
+    # Ensure both nodes exist
+    new_nodes = [node for node in dict.fromkeys((source, target)) if node not in graph]
+    for node in new_nodes:
+        graph.add_node(node, follower_count=0, engagement_score=0.0, node_type='user')
+        graph_stats.node_added()
+    if new_nodes:
+        change_log.record(nodes=new_nodes)
+
+    # Ontology-driven validation
+    src_type = graph.nodes[source].get('node_type').capitalize()
+    tgt_type = graph.nodes[target].get('node_type').capitalize()
+    if not validate_relationship(src_type, relationship_type, tgt_type):
+        return None
+    
+    # For "follows" relationships, reverse edge for influence flow
+    edge = (target, source) if relationship_type == 'follows' else (source, target)
+    existing = graph.get_edge_data(*edge)
+    replaced_type = existing.get('relationship_type', 'unknown') if existing is not None else None
+    graph.add_edge(*edge, relationship_type=relationship_type, weight=weight)
+    graph_stats.edge_added(relationship_type, replaced_type)
+    change_log.record(links=[edge])
+    return graph_stats.num_edges
+
+def upload_mutation(graph, filepath, sha256=None):
+    # sha256 names the archived file's content in the log; the archived file itself never changes
+    extension = upload_extension(filepath)
+    if extension not in UPLOAD_READERS:
+        raise ValueError(f'Unsupported file type: {filepath}')
+    return getattr(data_processor, UPLOAD_READERS[extension])(filepath, graph)
+
+def clear_mutation(graph):
+    graph.clear()
+    graph_stats.reset()
+    change_log.reset()
+
+MUTATIONS = {
+    'add_user': add_user_mutation,
+    'add_relationship': add_relationship_mutation,
+    'upload': upload_mutation,
+    'clear': clear_mutation
+}
+
+def apply_logged(op, **params):
+    """Apply a named mutation, log it if it succeeds, and wait until the record is durable"""
+    def mutation(graph):
+        result = MUTATIONS[op](graph, **params)
+        # Still under the write lock, so records stay in the order mutations were applied
+        mutation_log.append(op, params)
+        return result
+    result = graph_store.apply(mutation)
+    mutation_log.commit()
+    snapshot_writer.compact_if_needed()
+    return result
+
+def replay_mutations(graph, records):
+    """Re-apply logged mutations in order; ones that failed originally fail again and are skipped"""
+    replayed = 0
+    for record in records:
+        try:
+            MUTATIONS[record['op']](graph, **record['params'])
+            replayed += 1
+        except Exception as e:
+            print(f"Skipping mutation log record {record['seq']}: {e}")
+    return replayed
+
+# Persistence files live in the instance folder, which unlike static/ is not served to clients
+# Write-ahead log of every mutation since the last snapshot; MUTATION_LOG_SYNC_INTERVAL > 0 syncs in the background
+mutation_log = MutationLog(os.environ.get('MUTATION_LOG_PATH', os.path.join(app.instance_path, 'mutations.log')),
+                           float(os.environ.get('MUTATION_LOG_SYNC_INTERVAL', 0)))
+
+# Binary graph snapshot, rewritten in the background every SNAPSHOT_INTERVAL seconds (0 disables the schedule)
+# and whenever the log holds SNAPSHOT_LOG_RECORDS records (0 disables the threshold); compacts the log
+snapshot_writer = SnapshotWriter(graph_store,
+                                 os.environ.get('SNAPSHOT_PATH', os.path.join(app.instance_path, 'graph.snapshot')),
+                                 float(os.environ.get('SNAPSHOT_INTERVAL', 0)), mutation_log,
+                                 int(os.environ.get('SNAPSHOT_LOG_RECORDS', DEFAULT_MAX_LOG_RECORDS)))
+
+# Uploaded files, kept under content-addressed names while mutation log records refer to them
+UPLOAD_ARCHIVE_PATH = os.environ.get('UPLOAD_ARCHIVE_PATH', os.path.join(app.instance_path, 'uploads'))
+
+def prune_upload_archive():
+    """Delete archived uploads that no retained log record refers to, and partial uploads"""
+    if not os.path.isdir(UPLOAD_ARCHIVE_PATH):
+        return
+    referenced = {os.path.abspath(record['params']['filepath'])
+                  for record in mutation_log.replay() if record['op'] == 'upload'}
+    for name in os.listdir(UPLOAD_ARCHIVE_PATH):
+        path = os.path.abspath(os.path.join(UPLOAD_ARCHIVE_PATH, name))
+        if path not in referenced:
+            os.remove(path)
+
+# Recover the graph: latest snapshot, then the logged mutations it does not cover
+try:
+    snapshot_header = snapshot_writer.load()
+    log_seq = snapshot_header['metadata'].get('log_seq', 0) if snapshot_header is not None else 0
+    graph_store.apply(lambda graph: replay_mutations(graph, mutation_log.replay(log_seq)))
+    change_log.reset()
+    prune_upload_archive()
+except Exception as e:
+    print(f"Error recovering graph: {e}")
+snapshot_writer.start()
+
+def requested_stream_format(value):
+    """Validate a ?stream= value; None or empty means a regular, fully built response"""
+    if not value:
+        return None
+    if value not in STREAM_FORMATS:
+        raise ValueError(f"stream must be one of {', '.join(STREAM_FORMATS)}")
+    return value
+
+def stream_response(payload, stream_format):
+    """Stream a payload as chunked JSON or NDJSON, compressed with the best encoding the client accepts"""
+    chunks = iter_ndjson(payload) if stream_format == 'ndjson' else iter_json(payload)
+    encoding = request.accept_encodings.best_match(SUPPORTED_ENCODINGS)
+    response = Response(stream_with_context(iter_compressed(chunks, encoding)),
+                        mimetype='application/x-ndjson' if stream_format == 'ndjson' else 'application/json')
+    if encoding is not None:
+        response.headers['Content-Encoding'] = encoding
+    response.headers['Vary'] = 'Accept-Encoding'
+    return response
+
 @app.route('/')
 def index():
     """Main page with input forms and basic visualization"""
-    return render_template('index.html')
+    accept = ','.join(f'.{extension}' for extension in UPLOAD_READERS if extension in ALLOWED_EXTENSIONS)
+    return render_template('index.html', upload_accept=accept, columnar_uploads=PYARROW_AVAILABLE)
 
 @app.route('/graph')
 def graph_view():
@@ -63,17 +265,18 @@ def add_user():
         user_handle = data.get('user_handle')
         follower_count = int(data.get('follower_count', 0))
         engagement_score = float(data.get('engagement_score', 0.0))
+        niche = str(data['niche']) if data.get('niche') else None
+        if not user_handle:
+            return jsonify({'status': 'error', 'message': 'user_handle is required'}), 400
         
         # Add user to graph with attributes
-        influence_graph.add_node(user_handle, 
-                                follower_count=follower_count,
-                                engagement_score=engagement_score,
-                                node_type='user')
+        node_count = apply_logged('add_user', user_handle=user_handle, follower_count=follower_count,
+                                  engagement_score=engagement_score, niche=niche)
         
         return jsonify({
             'status': 'success',
             'message': f'User {user_handle} added successfully',
-            'node_count': influence_graph.number_of_nodes()
+            'node_count': node_count
         })
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)}), 400
@@ -87,36 +290,26 @@ def add_relationship():
         target = data.get('target_entity')
         relationship_type = data.get('relationship_type')
         weight = float(data.get('weight', 1.0))
+        if not source or not target:
+            return jsonify({'status': 'error', 'message': 'source_entity and target_entity are required'}), 400
         
-        # Ensure both nodes exist
-        if source not in influence_graph:
-            influence_graph.add_node(source, follower_count=0, engagement_score=0.0, node_type='user')
-        if target not in influence_graph:
-            influence_graph.add_node(target, follower_count=0, engagement_score=0.0, node_type='user')
-
-        # Ontology-driven validation
-        src_type = influence_graph.nodes[source].get('node_type').capitalize()
-        tgt_type = influence_graph.nodes[target].get('node_type').capitalize()
-        if not validate_relationship(src_type, relationship_type, tgt_type):
-            return jsonify({'status':'error','message':'Invalid relationship per ontology.'}), 400
+        edge_count = apply_logged('add_relationship', source=source, target=target,
+                                  relationship_type=relationship_type, weight=weight)
         
-        # For "follows" relationships, reverse edge for influence flow
-        if relationship_type == 'follows':
-            influence_graph.add_edge(target, source, relationship_type=relationship_type, weight=weight)
-        else:
-            influence_graph.add_edge(source, target, relationship_type=relationship_type, weight=weight)
+        if edge_count is None:
+            return jsonify({'status':'error','message':'Invalid relationship per ontology.'}), 400
         
         return jsonify({
             'status': 'success',
             'message': f'Relationship added: {source} -> {target}',
-            'edge_count': influence_graph.number_of_edges()
+            'edge_count': edge_count
         })
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)}), 400
 
 @app.route('/api/upload_file', methods=['POST'])
 def upload_file():
-    """Handle CSV/JSON file uploads"""
+    """Handle CSV/JSON/JSON Lines/Parquet/Arrow file uploads"""
     try:
         if 'file' not in request.files:
             return jsonify({'status': 'error', 'message': 'No file uploaded'}), 400
@@ -126,22 +319,29 @@ def upload_file():
             return jsonify({'status': 'error', 'message': 'No file selected'}), 400
         
         if file and allowed_file(file.filename):
-            filename = secure_filename(file.filename)
-            filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-            file.save(filepath)
+            # Save under a unique name, then archive it under its digest so the log can refer to it safely
+            os.makedirs(UPLOAD_ARCHIVE_PATH, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(suffix=f'.{upload_extension(secure_filename(file.filename))}',
+                                             dir=UPLOAD_ARCHIVE_PATH)
+            os.close(fd)
+            file.save(temp_path)
+            filepath, sha256 = archive_file(temp_path, UPLOAD_ARCHIVE_PATH)
             
-            # Process the uploaded file
-            if filename.endswith('.csv'):
-                result = data_processor.process_csv(filepath, influence_graph)
-            elif filename.endswith('.json'):
-                result = data_processor.process_json(filepath, influence_graph)
+            # Process the uploaded file as one write; readers keep using the previous snapshot meanwhile
+            result = apply_logged('upload', filepath=filepath, sha256=sha256)
+            # Checkpoint soon so a restart does not have to ingest the whole file again
+            snapshot_writer.request_save()
             
             return jsonify({
                 'status': 'success',
                 'message': f'File processed successfully',
                 'nodes_added': result.get('nodes_added', 0),
-                'edges_added': result.get('edges_added', 0)
+                'edges_added': result.get('edges_added', 0),
+                'edges_rejected': result.get('edges_rejected', 0)
             })
+        elif upload_extension(file.filename) in COLUMNAR_EXTENSIONS:
+            return jsonify({'status': 'error',
+                            'message': 'Parquet and Arrow uploads need pyarrow, which is not installed on the server'}), 400
         else:
             return jsonify({'status': 'error', 'message': 'Invalid file type'}), 400
             
@@ -150,9 +350,49 @@ def upload_file():
 
 @app.route('/api/get_graph_data')
 def get_graph_data():
-    """Get graph data for visualization"""
+    """Get graph data for visualization, or only what changed after ?since=<seq>; ?stream=json|ndjson streams it"""
     try:
-        graph_data = graph_processor.convert_to_d3_format(influence_graph)
+        stream = requested_stream_format(request.args.get('stream'))
+        since = request.args.get('since', None, type=int)
+        max_nodes = request.args.get('max_nodes', None, type=int)
+        expand = request.args.getlist('expand')
+        
+        if max_nodes is not None and max_nodes < 3:
+            return jsonify({'status': 'error', 'message': 'max_nodes must be at least 3'}), 400
+        
+        # Level-of-detail view: collapse the graph to the node budget, drilling into super-nodes along the expand path
+        if expand or (max_nodes is not None and graph_stats.num_nodes > max_nodes):
+            max_nodes = max_nodes or DEFAULT_MAX_VISIBLE_NODES
+            seq = change_log.seq
+            graph = graph_store.snapshot()
+            for super_node_id in expand:
+                graph = graph_processor.expand_super_node(graph, super_node_id, max_nodes)
+                if graph is None:
+                    return jsonify({'status': 'error', 'message': f'Super-node {super_node_id} not found'}), 404
+            graph_data = graph_processor.convert_to_d3_summary(graph, max_nodes)
+            graph_data.update({'delta': False, 'seq': seq, 'expand': expand})
+            return stream_response(graph_data, stream) if stream else jsonify(graph_data)
+        
+        # Read the sequence number before taking the snapshot: the snapshot then holds every
+        # change up to seq, and changes that land in between are sent again by the next delta
+        seq = change_log.seq
+        graph = graph_store.snapshot()
+        
+        if since is not None:
+            changes = change_log.changes_since(since, seq)
+            if changes is not None:
+                graph_data = graph_processor.convert_to_d3_delta(graph, *changes)
+                graph_data.update({'delta': True, 'since': since, 'seq': seq})
+                return stream_response(graph_data, stream) if stream else jsonify(graph_data)
+        
+        if stream:
+            # Node and link records are built while the response is written, never as full lists
+            graph_data = graph_processor.iter_d3_format(graph)
+            graph_data.update({'delta': False, 'seq': seq})
+            return stream_response(graph_data, stream)
+        
+        graph_data = graph_processor.convert_to_d3_format(graph)
+        graph_data.update({'delta': False, 'seq': seq})
         return jsonify(graph_data)
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)}), 400
@@ -164,13 +404,45 @@ def query_influence_chain():
         data = request.get_json()
         user = data.get('user')
         depth = int(data.get('depth', 3))
+        max_nodes = int(data['max_nodes']) if data.get('max_nodes') is not None else None
+        limit = int(data['limit']) if data.get('limit') is not None else None
+        cursor = int(data.get('cursor') or 0)
+        stream = requested_stream_format(data.get('stream'))
         
-        chain = influence_calc.get_influence_chain(influence_graph, user, depth)
+        graph = graph_store.snapshot()
+        chain = influence_calc.get_influence_chain(graph, user, depth, max_nodes, limit, cursor)
         
         if 'error' in chain:
-            return jsonify({'status': 'error', 'message': chain['error']}), 404
+            status_code = 404 if user not in graph else 400
+            return jsonify({'status': 'error', 'message': chain['error']}), status_code
         
-        return jsonify({'status': 'success', 'user': user, 'influence_chain': chain})
+        response = {'status': 'success', 'user': user, 'influence_chain': chain}
+        return stream_response(response, stream) if stream else jsonify(response)
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+
+@app.route('/api/query_influence_chains', methods=['POST'])
+def query_influence_chains():
+    """Query the influence chains of a batch of users in one request"""
+    try:
+        data = request.get_json()
+        users = data.get('users')
+        depth = int(data.get('depth', 3))
+        max_nodes = int(data['max_nodes']) if data.get('max_nodes') is not None else None
+        limit = int(data['limit']) if data.get('limit') is not None else None
+        stream = requested_stream_format(data.get('stream'))
+        
+        if not isinstance(users, list) or not users:
+            return jsonify({'status': 'error', 'message': 'users must be a non-empty list'}), 400
+        if len(users) > MAX_CHAIN_BATCH_USERS:
+            return jsonify({'status': 'error', 'message': f'At most {MAX_CHAIN_BATCH_USERS} users per batch'}), 400
+        
+        graph = graph_store.snapshot()
+        chains = influence_calc.get_influence_chains(graph, users, depth, max_nodes, limit, CHAIN_BATCH_WORKERS)
+        
+        # Streamed, each user's chain is sent as soon as its group has been searched
+        response = {'status': 'success', 'influence_chains': chains if stream else list(chains)}
+        return stream_response(response, stream) if stream else jsonify(response)
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)}), 400
 
@@ -180,9 +452,28 @@ def get_top_influencers():
     try:
         limit = int(request.args.get('limit', 10))
         niche = request.args.get('niche', None)
+        betweenness = request.args.get('betweenness', 'auto')
+        k = request.args.get('k', None, type=int)
+        stream = requested_stream_format(request.args.get('stream'))
+        
+        # Read the change log position first so the snapshot holds at least everything up to it
+        seq = change_log.seq
+        graph = graph_store.snapshot()
+        # Resolve up front so the response can say whether betweenness is an estimate
+        sample_size = resolve_betweenness_sample_size(graph.number_of_nodes(), betweenness, k)
         
-        influencers = influence_calc.get_top_influencers(influence_graph, limit, niche)
-        return jsonify({'status': 'success', 'top_influencers': influencers})
+        influencers = influence_calc.get_top_influencers(graph, limit, niche, betweenness, k, seq)
+        response = {
+            'status': 'success',
+            'top_influencers': influencers,
+            'betweenness': {
+                'mode': 'exact' if sample_size is None else 'approx',
+                'sample_size': sample_size
+            },
+            # The index reuses PageRank from its last full refresh until the next one
+            'ranking': influence_index.freshness()
+        }
+        return stream_response(response, stream) if stream else jsonify(response)
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)}), 400
 
@@ -192,51 +483,112 @@ def get_mutual_engagement():
     try:
         data = request.get_json()
         users = data.get('users', [])
+        matrix_format = data.get('matrix_format', 'dict')
+        neighbor_limit = int(data.get('neighbor_limit', COMMON_NEIGHBOR_LIMIT))
         
-        mutual_network = influence_calc.get_mutual_engagement(influence_graph, users)
+        mutual_network = influence_calc.get_mutual_engagement(graph_store.snapshot(), users, matrix_format,
+                                                              neighbor_limit)
         return jsonify({'status': 'success', 'mutual_engagement': mutual_network})
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)}), 400
 
+@app.route('/api/simulate_spread', methods=['POST'])
+def simulate_spread():
+    """Estimate the expected reach of a seed set with Independent Cascade or Linear Threshold"""
+    try:
+        data = request.get_json()
+        seeds = data.get('seeds', [])
+        model = data.get('model', 'ic')
+        runs = int(data.get('runs', DEFAULT_RUNS))
+        seed = int(data.get('seed', SIMULATION_SEED))
+        max_steps = int(data['max_steps']) if data.get('max_steps') is not None else None
+        probability = float(data.get('probability', DEFAULT_ACTIVATION_PROBABILITY))
+        confidence = float(data.get('confidence', 0.95))
+        
+        if not isinstance(seeds, list):
+            return jsonify({'status': 'error', 'message': 'seeds must be a list of users'}), 400
+        if runs > MAX_SIMULATION_RUNS:
+            return jsonify({'status': 'error', 'message': f'At most {MAX_SIMULATION_RUNS} runs per simulation'}), 400
+        
+        graph = graph_store.snapshot()
+        spread = influence_calc.simulate_spread(graph, seeds, model, runs, seed, max_steps, probability, confidence)
+        
+        if 'error' in spread:
+            status_code = 404 if seeds else 400
+            return jsonify({'status': 'error', 'message': spread['error']}), status_code
+        
+        return jsonify({'status': 'success', 'spread': spread})
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+
 @app.route('/api/get_analytics')
 def get_analytics():
     """Get network analytics"""
     try:
-        node_count = influence_graph.number_of_nodes()
-        edge_count = influence_graph.number_of_edges()
-        
-        if node_count == 0:
-            analytics = {'total_nodes': 0,'total_edges': 0,'density': 0.0,'is_connected': False,'average_clustering': 0.0,'pagerank': {}}
-        else:
-            density = nx.density(influence_graph) if edge_count > 0 else 0.0
-            is_conn = nx.is_weakly_connected(influence_graph) if node_count > 1 else True
-            try:
-                avg_clust = nx.average_clustering(influence_graph.to_undirected()) if node_count > 1 else 0.0
-            except:
-                avg_clust = 0.0
-            try:
-                pr = nx.pagerank(influence_graph) if edge_count > 0 else {}
-                top_pr = dict(list(pr.items())[:10])
-            except:
-                top_pr = {}
-            analytics = {'total_nodes': node_count,'total_edges': edge_count,'density': density,'is_connected': is_conn,'average_clustering': avg_clust,'pagerank': top_pr}
-        
+        analytics = influence_calc.get_analytics(graph_store.snapshot())
         return jsonify(analytics)
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)}), 400
 
+@app.route('/api/submit_job', methods=['POST'])
+def submit_job():
+    """Queue analytics, top influencers or community detection as a background job"""
+    try:
+        data = request.get_json()
+        kind = data.get('kind')
+        params = {}
+        if kind == 'top_influencers':
+            params['limit'] = int(data.get('limit', 10))
+            params['niche'] = data.get('niche')
+            params['betweenness'] = data.get('betweenness', 'auto')
+            params['k'] = int(data['k']) if data.get('k') is not None else None
+            # Reject bad sampling options now rather than in the worker
+            resolve_betweenness_sample_size(0, params['betweenness'], params['k'])
+        
+        job = job_queue.submit(kind, params)
+        return jsonify({'status': 'success', 'job': job}), 202
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+
+@app.route('/api/get_job/<job_id>')
+def get_job(job_id):
+    """Poll a background job; the result is included once it has finished"""
+    try:
+        job = job_queue.get(job_id)
+        if job is None:
+            return jsonify({'status': 'error', 'message': 'Job not found or expired'}), 404
+        return jsonify({'status': 'success', 'job': job})
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+
 @app.route('/api/clear_graph', methods=['POST'])
 def clear_graph():
     """Clear the entire graph"""
     try:
-        influence_graph.clear()
+        apply_logged('clear')
         return jsonify({'status': 'success','message': 'Graph cleared successfully'})
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)}), 400
 
+@app.route('/api/save_snapshot', methods=['POST'])
+def save_snapshot():
+    """Write the current graph to the binary snapshot file"""
+    try:
+        result = snapshot_writer.save()
+        return jsonify({'status': 'success', 'message': 'Snapshot saved', 'snapshot': result})
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+
+@app.route('/api/get_cache_stats')
+def get_cache_stats():
+    """Get metric cache hit/miss counters, graph store write counters, layout, snapshot, mutation log and influence index state"""
+    return jsonify({'status': 'success', 'cache': metric_cache.stats(), 'store': graph_store.stats(),
+                    'layout': layout_engine.stats(), 'snapshot': snapshot_writer.stats(),
+                    'mutation_log': mutation_log.stats(), 'influence_index': influence_index.stats()})
+
 def allowed_file(filename):
     """Check if file extension is allowed"""
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in {'csv', 'json'}
+    return upload_extension(filename) in ALLOWED_EXTENSIONS
 
 @app.route('/NetworkProxy/<path:subpath>')
 def handle_network_proxy(subpath):
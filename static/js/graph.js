@@ -12,6 +12,15 @@ class GraphVisualizer {
         this.linkElements = null;
         this.labelElements = null;
         this.tooltip = null;
+        // Sequence number of the server's change log that this.nodes/this.links reflect
+        this.seq = null;
+        // Node budget above which the server collapses the graph into super-nodes
+        this.maxNodes = 2000;
+        // Super-node ids drilled into, outermost first
+        this.expandPath = [];
+        this.aggregated = false;
+        // True when the server sent positions for every node, so no simulation has to run
+        this.staticLayout = false;
         
         this.init();
     }
@@ -197,6 +206,10 @@ class GraphVisualizer {
 
         this.nodes = data.nodes.map(d => ({ ...d }));
         this.links = data.links.map(d => ({ ...d }));
+        this.seq = data.seq !== undefined ? data.seq : null;
+        this.aggregated = !!data.aggregated;
+        const positioned = this.nodes.filter(d => this.placeNode(d)).length;
+        this.staticLayout = positioned > 0 && positioned === this.nodes.length;
 
         // Process links to handle multiple relationships between same nodes
         this.processMultipleLinks();
@@ -207,6 +220,120 @@ class GraphVisualizer {
         this.updateSimulation();
     }
 
+    async refresh() {
+        const params = new URLSearchParams({ max_nodes: this.maxNodes });
+        this.expandPath.forEach(id => params.append('expand', id));
+        // Ask only for what changed since the last load; the server falls back to a full graph if it can't tell.
+        // Aggregated views are always reloaded whole.
+        if (this.seq !== null && !this.aggregated) {
+            params.set('since', this.seq);
+        }
+        const response = await fetch(`/api/get_graph_data?${params}`);
+        const data = await response.json();
+        if (data.status === 'error') {
+            throw new Error(data.message);
+        }
+
+        if (data.delta) {
+            this.applyDelta(data);
+        } else {
+            this.updateGraph(data);
+        }
+        return data;
+    }
+
+    drillDown(superNodeId) {
+        this.expandPath.push(superNodeId);
+        return this.refresh();
+    }
+
+    drillUp() {
+        if (!this.expandPath.length) {
+            return Promise.resolve(null);
+        }
+        this.expandPath.pop();
+        return this.refresh();
+    }
+
+    applyDelta(delta) {
+        this.seq = delta.seq;
+
+        const changedNodes = delta.nodes || [];
+        const changedLinks = delta.links || [];
+        const removedNodes = new Set(delta.removed_nodes || []);
+        const removedLinks = new Set((delta.removed_links || []).map(d => this.linkPairKey(d)));
+
+        if (!changedNodes.length && !changedLinks.length && !removedNodes.size && !removedLinks.size) {
+            return;
+        }
+
+        // Patch existing node objects in place so they keep their simulated positions
+        const nodesById = new Map(this.nodes.map(d => [d.id, d]));
+        changedNodes.forEach(node => {
+            const existing = nodesById.get(node.id);
+            if (existing) {
+                Object.assign(existing, node);
+                this.placeNode(existing);
+            } else {
+                const added = { ...node };
+                this.placeNode(added);
+                nodesById.set(node.id, added);
+            }
+        });
+        removedNodes.forEach(id => nodesById.delete(id));
+        this.nodes = Array.from(nodesById.values());
+
+        const linksByKey = new Map(this.links.map(d => [this.linkPairKey(d), d]));
+        changedLinks.forEach(link => {
+            const key = this.linkPairKey(link);
+            const existing = linksByKey.get(key);
+            if (existing) {
+                Object.assign(existing, {
+                    relationship_type: link.relationship_type,
+                    weight: link.weight,
+                    color: link.color
+                });
+            } else {
+                linksByKey.set(key, { ...link });
+            }
+        });
+        removedLinks.forEach(key => linksByKey.delete(key));
+        this.links = Array.from(linksByKey.values())
+            .filter(d => nodesById.has(this.nodeId(d.source)) && nodesById.has(this.nodeId(d.target)));
+
+        this.processMultipleLinks();
+
+        this.updateLinks();
+        this.updateNodes();
+        this.updateLabels();
+        // Reheat gently so the existing layout is mostly kept
+        this.updateSimulation(0.3);
+    }
+
+    placeNode(node) {
+        // Map the server's unit-square layout position onto the canvas and pin the node there
+        if (!node.position) {
+            return false;
+        }
+        const margin = 40;
+        node.x = node.fx = margin + node.position[0] * Math.max(this.width - 2 * margin, 1);
+        node.y = node.fy = margin + node.position[1] * Math.max(this.height - 2 * margin, 1);
+        return true;
+    }
+
+    nodeId(endpoint) {
+        // Link endpoints are ids until the simulation replaces them with node objects
+        return typeof endpoint === 'object' ? endpoint.id : endpoint;
+    }
+
+    linkPairKey(link) {
+        return JSON.stringify([this.nodeId(link.source), this.nodeId(link.target)]);
+    }
+
+    linkKey(link) {
+        return `${this.linkPairKey(link)}-${link.relationship_type}`;
+    }
+
     processMultipleLinks() {
         // Initialize all links with no curve
         this.links.forEach(link => {
@@ -276,7 +403,7 @@ class GraphVisualizer {
         // Use paths instead of lines to support curves
         this.linkElements = this.linkGroup
             .selectAll('.link')
-            .data(this.links, d => `${d.source}-${d.target}-${d.relationship_type}`);
+            .data(this.links, d => this.linkKey(d));
 
         this.linkElements.exit().remove();
 
@@ -292,12 +419,13 @@ class GraphVisualizer {
 
         this.linkElements = linkEnter.merge(this.linkElements)
             .style('stroke', d => this.getLinkColor(d.relationship_type))
+            .style('stroke-width', d => Math.sqrt(d.weight) * 2)
             .attr('marker-end', d => `url(#${this.getArrowMarker(d.relationship_type)})`);
 
         // Add link labels for relationship types
         this.linkLabels = this.labelGroup
             .selectAll('.link-label')
-            .data(this.links, d => `${d.source}-${d.target}-${d.relationship_type}`);
+            .data(this.links, d => this.linkKey(d));
 
         this.linkLabels.exit().remove();
 
@@ -382,7 +510,9 @@ class GraphVisualizer {
                 this.handleNodeClick(d);
             });
 
-        this.nodeElements = nodeEnter.merge(this.nodeElements);
+        this.nodeElements = nodeEnter.merge(this.nodeElements)
+            .attr('r', d => d.size || 10)
+            .style('fill', d => d.color || '#4488ff');
     }
 
     updateLabels() {
@@ -406,7 +536,7 @@ class GraphVisualizer {
         this.labelElements = labelEnter.merge(this.labelElements);
     }
 
-    updateSimulation() {
+    updateSimulation(alpha = 1) {
         this.simulation
             .nodes(this.nodes)
             .on('tick', () => this.ticked());
@@ -415,7 +545,14 @@ class GraphVisualizer {
             .force('link')
             .links(this.links);
 
-        this.simulation.alpha(1).restart();
+        if (this.staticLayout) {
+            // Positions come from the server; draw them once instead of simulating
+            this.simulation.stop();
+            this.ticked();
+            return;
+        }
+
+        this.simulation.alpha(alpha).restart();
     }
 
     ticked() {
@@ -518,8 +655,11 @@ class GraphVisualizer {
             })
             .on('end', (event, d) => {
                 if (!event.active) this.simulation.alphaTarget(0);
-                d.fx = null;
-                d.fy = null;
+                // Server-positioned nodes stay where they are dropped
+                if (!this.staticLayout) {
+                    d.fx = null;
+                    d.fy = null;
+                }
             });
     }
 
@@ -590,6 +730,13 @@ class GraphVisualizer {
     }
 
     handleNodeClick(node) {
+        // Super-nodes open the users they stand for
+        if (node.aggregated) {
+            this.drillDown(node.id)
+                .catch(error => console.error('Error expanding group:', error));
+            return;
+        }
+
         // Fill the query form with the clicked node
         const queryUserInput = document.getElementById('query-user');
         if (queryUserInput) {
@@ -696,13 +843,7 @@ document.addEventListener('DOMContentLoaded', () => {
         window.graphVisualizer = new GraphVisualizer('fullscreen-network-graph');
         
         // Load initial graph data
-        fetch('/api/get_graph_data')
-            .then(response => response.json())
-            .then(data => {
-                if (window.graphVisualizer) {
-                    window.graphVisualizer.updateGraph(data);
-                }
-            })
+        window.graphVisualizer.refresh()
             .catch(error => console.error('Error loading graph data:', error));
             
         // Setup graph page controls
@@ -738,14 +879,21 @@ function setupGraphPageControls() {
     const refreshBtn = document.getElementById('refresh-graph');
     if (refreshBtn) {
         refreshBtn.addEventListener('click', () => {
-            fetch('/api/get_graph_data')
-                .then(response => response.json())
-                .then(data => {
-                    if (window.graphVisualizer) {
-                        window.graphVisualizer.updateGraph(data);
-                    }
-                })
-                .catch(error => console.error('Error refreshing graph:', error));
+            if (window.graphVisualizer) {
+                window.graphVisualizer.refresh()
+                    .catch(error => console.error('Error refreshing graph:', error));
+            }
+        });
+    }
+    
+    // Back out of the last expanded group
+    const drillUpBtn = document.getElementById('drill-up');
+    if (drillUpBtn) {
+        drillUpBtn.addEventListener('click', () => {
+            if (window.graphVisualizer) {
+                window.graphVisualizer.drillUp()
+                    .catch(error => console.error('Error leaving group:', error));
+            }
         });
     }
     
@@ -48,7 +48,8 @@ class InfluenceGraphApp {
         const userData = {
             user_handle: formData.get('user_handle'),
             follower_count: parseInt(formData.get('follower_count')) || 0,
-            engagement_score: parseFloat(formData.get('engagement_score')) || 0.0
+            engagement_score: parseFloat(formData.get('engagement_score')) || 0.0,
+            niche: formData.get('niche') || null
         };
 
         try {
@@ -191,11 +192,8 @@ class InfluenceGraphApp {
 
     async refreshGraph() {
         try {
-            const response = await fetch(`${this.apiBase}/get_graph_data`);
-            const graphData = await response.json();
-            
             if (window.graphVisualizer) {
-                window.graphVisualizer.updateGraph(graphData);
+                await window.graphVisualizer.refresh();
             }
             
             this.updateNetworkStats();
@@ -88,9 +88,12 @@ class FileUploadHandler {
             const result = await response.json();
             
             if (result.status === 'success') {
+                const rejected = result.edges_rejected > 0
+                    ? ` ${result.edges_rejected} edges were rejected because the ontology does not allow their relationship type between those nodes.`
+                    : '';
                 this.showMessage(
-                    `File uploaded successfully! Added ${result.nodes_added} nodes and ${result.edges_added} edges.`,
-                    'success'
+                    `File uploaded successfully! Added ${result.nodes_added} nodes and ${result.edges_added} edges.${rejected}`,
+                    result.edges_rejected > 0 ? 'warning' : 'success'
                 );
                 
                 // Reset form and refresh graph
@@ -113,20 +116,22 @@ class FileUploadHandler {
     }
 
     validateFile(file) {
-        const maxSize = 16 * 1024 * 1024; // 16MB
-        const allowedTypes = ['text/csv', 'application/json', 'text/json'];
-        const allowedExtensions = ['.csv', '.json'];
+        const maxSize = 4 * 1024 * 1024 * 1024; // 4GB, matches the server's default MAX_UPLOAD_MB
+        const allowedTypes = ['text/csv', 'application/json', 'text/json', 'application/x-ndjson'];
+        // The server lists the formats it can read in the input's accept attribute
+        const fileInput = document.getElementById('data-file');
+        const allowedExtensions = fileInput.accept.split(',');
 
         // Check file size
         if (file.size > maxSize) {
-            this.showMessage('File size exceeds 16MB limit', 'error');
+            this.showMessage('File size exceeds 4GB limit', 'error');
             return false;
         }
 
         // Check file type
         const fileExtension = '.' + file.name.split('.').pop().toLowerCase();
         if (!allowedExtensions.includes(fileExtension)) {
-            this.showMessage('Only CSV and JSON files are allowed', 'error');
+            this.showMessage(`Only ${allowedExtensions.join(', ')} files are allowed`, 'error');
             return false;
         }
 
@@ -0,0 +1,56 @@
+import networkx as nx
+import numpy as np
+import pytest
+
+from utils.csr_graph import CSRGraph
+from utils.parallel_centrality import CentralityEngine
+
+
+def weighted_graph(num_nodes=60, num_edges=240, seed=5):
+    graph = nx.gnm_random_graph(num_nodes, num_edges, seed=seed, directed=True)
+    rng = np.random.default_rng(seed)
+    for source, target in graph.edges():
+        graph[source][target]['weight'] = float(rng.choice([0.5, 1.0, 2.5]))
+    # An isolated node and a chain hanging off the main component
+    graph.add_node('isolated')
+    graph.add_edge(0, 'tail1', weight=1.0)
+    graph.add_edge('tail1', 'tail2', weight=1.0)
+    return graph
+
+
+@pytest.fixture(params=['serial', 'parallel'])
+def engine(request):
+    engine = CentralityEngine(max_workers=1) if request.param == 'serial' else CentralityEngine(max_workers=2,
+                                                                                                   min_nodes=0)
+    yield engine
+    engine.shutdown()
+
+
+def assert_matches(csr, values, expected):
+    scores = csr.to_dict(values)
+    assert scores.keys() == expected.keys()
+    for node, value in expected.items():
+        assert scores[node] == pytest.approx(value, abs=1.0e-12)
+
+
+@pytest.mark.parametrize('weighted', [False, True])
+def test_betweenness_matches_networkx(engine, weighted):
+    graph = weighted_graph()
+    csr = CSRGraph.from_networkx(graph)
+
+    assert_matches(csr, engine.betweenness(csr, weighted=weighted),
+                   nx.betweenness_centrality(graph, weight='weight' if weighted else None))
+
+
+def test_sampled_betweenness_matches_networkx(engine):
+    graph = weighted_graph()
+    csr = CSRGraph.from_networkx(graph)
+
+    assert_matches(csr, engine.betweenness(csr, k=20, seed=7), nx.betweenness_centrality(graph, k=20, seed=7))
+
+
+def test_closeness_matches_networkx(engine):
+    graph = weighted_graph()
+    csr = CSRGraph.from_networkx(graph)
+
+    assert_matches(csr, engine.closeness(csr), nx.closeness_centrality(graph))
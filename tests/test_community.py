@@ -0,0 +1,61 @@
+import networkx as nx
+import numpy as np
+import pytest
+
+from utils.community import CommunityEngine
+from utils.csr_graph import CSRGraph
+
+
+def planted_graph(groups=6, group_size=25, p_in=0.3, p_out=0.02, seed=11):
+    """Undirected planted partition graph and a directed copy with each edge stored once"""
+    undirected = nx.planted_partition_graph(groups, group_size, p_in, p_out, seed=seed)
+    rng = np.random.default_rng(seed)
+    for source, target in undirected.edges():
+        undirected[source][target]['weight'] = float(rng.choice([1.0, 2.0, 3.0]))
+    directed = nx.DiGraph()
+    directed.add_nodes_from(undirected)
+    directed.add_edges_from(undirected.edges(data=True))
+    return undirected, directed
+
+
+def communities(csr, labels):
+    return [{csr.nodes[i] for i in np.flatnonzero(labels == label)} for label in np.unique(labels)]
+
+
+@pytest.mark.parametrize('weighted', [True, False])
+def test_modularity_matches_networkx(weighted):
+    undirected, directed = planted_graph()
+    csr = CSRGraph.from_networkx(directed)
+    engine = CommunityEngine()
+
+    labels, modularity = engine.detect(csr, weighted=weighted)
+
+    expected = nx.community.modularity(undirected, communities(csr, labels), weight='weight' if weighted else None)
+    assert modularity == pytest.approx(expected, abs=1.0e-12)
+
+
+def test_louvain_reaches_networkx_modularity():
+    undirected, directed = planted_graph()
+    csr = CSRGraph.from_networkx(directed)
+
+    _, modularity = CommunityEngine().detect(csr)
+
+    planted = nx.community.modularity(undirected, undirected.graph['partition'])
+    greedy = nx.community.modularity(undirected, nx.community.greedy_modularity_communities(undirected,
+                                                                                           weight='weight'))
+    louvain = nx.community.modularity(undirected, nx.community.louvain_communities(undirected, seed=1))
+    assert modularity >= max(planted, greedy, louvain) - 0.01
+
+
+def test_warm_start_keeps_modularity_after_mutation():
+    undirected, directed = planted_graph()
+    engine = CommunityEngine()
+    _, cold = engine.detect(CSRGraph.from_networkx(directed))
+
+    directed.add_edge(0, 149, weight=1.0)
+    directed.add_edge('newcomer', 0, weight=1.0)
+    labels, warm = engine.detect(CSRGraph.from_networkx(directed))
+
+    assert engine.last_warm_start
+    assert warm >= cold - 0.01
+    assert len(labels) == directed.number_of_nodes()
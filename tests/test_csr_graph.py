@@ -0,0 +1,106 @@
+import networkx as nx
+import numpy as np
+import pytest
+
+from utils.change_log import GraphChangeLog
+from utils.csr_graph import CSRGraph
+from utils.graph_store import GraphStore
+from utils.metric_cache import MetricCache
+
+
+def social_graph(num_nodes=100, num_edges=400, seed=3):
+    rng = np.random.default_rng(seed)
+    graph = nx.DiGraph()
+    for i in range(num_nodes):
+        graph.add_node(f'user{i}', follower_count=int(rng.integers(0, 10000)),
+                       engagement_score=float(rng.random()), node_type='user',
+                       niche=['tech', 'music', None][i % 3])
+    nodes = list(graph)
+    while graph.number_of_edges() < num_edges:
+        source, target = rng.choice(nodes, size=2, replace=False)
+        graph.add_edge(source, target, relationship_type=['follows', 'likes'][int(rng.integers(2))],
+                       weight=float(rng.choice([0.5, 1.0, 2.0])))
+    return graph
+
+
+def assert_same_graph(csr, expected):
+    assert csr.nodes == expected.nodes
+    assert csr.node_index == expected.node_index
+    for direction in ('out', 'in'):
+        assert np.array_equal(getattr(csr, f'{direction}_indptr'), getattr(expected, f'{direction}_indptr'))
+        assert np.array_equal(getattr(csr, f'{direction}_indices'), getattr(expected, f'{direction}_indices'))
+        assert np.array_equal(getattr(csr, f'{direction}_weights'), getattr(expected, f'{direction}_weights'))
+        # Codes are assigned in first-seen order, so compare the decoded names
+        assert ([csr.relationship_types[code] for code in getattr(csr, f'{direction}_type_codes')] ==
+                [expected.relationship_types[code] for code in getattr(expected, f'{direction}_type_codes')])
+    assert np.array_equal(csr.follower_count, expected.follower_count)
+    assert np.array_equal(csr.engagement_score, expected.engagement_score)
+    assert [csr.node_types[code] for code in csr.node_type_codes] == \
+        [expected.node_types[code] for code in expected.node_type_codes]
+    assert [csr.niches[code] if code >= 0 else None for code in csr.niche_codes] == \
+        [expected.niches[code] if code >= 0 else None for code in expected.niche_codes]
+
+
+def test_patched_matches_rebuild():
+    graph = social_graph()
+    csr = CSRGraph.from_networkx(graph)
+
+    graph.nodes['user5']['follower_count'] = 123456
+    graph.nodes['user6']['niche'] = 'sports'
+    graph.add_node('newcomer', follower_count=10, engagement_score=0.5, node_type='user')
+    graph.add_node('post1', node_type='post')
+    graph.add_edge('newcomer', 'user1', relationship_type='follows', weight=1.0)
+    graph.add_edge('user2', 'newcomer', relationship_type='mentions', weight=3.0)
+    graph.add_edge('user3', 'post1', relationship_type='likes', weight=0.5)
+    source, target = next(iter(graph.edges()))
+    graph[source][target]['weight'] = 9.0
+    nodes = ['user5', 'user6', 'newcomer', 'post1']
+    links = [('newcomer', 'user1'), ('user2', 'newcomer'), ('user3', 'post1'), (source, target)]
+
+    assert_same_graph(csr.patched(graph, nodes, links), CSRGraph.from_networkx(graph))
+
+
+def test_patched_refuses_removed_nodes():
+    graph = social_graph()
+    csr = CSRGraph.from_networkx(graph)
+    graph.remove_node('user0')
+
+    assert csr.patched(graph, ['user0'], []) is None
+
+
+def test_snapshot_patches_previous_csr():
+    graph = social_graph()
+    metric_cache = MetricCache()
+    change_log = GraphChangeLog()
+    store = GraphStore(graph, metric_cache, change_log=change_log)
+    snapshot = store.snapshot()
+    metric_cache.get_or_compute(snapshot, 'csr_graph', lambda: CSRGraph.from_networkx(snapshot))
+
+    def add_follow(live):
+        live.add_node('newcomer', follower_count=1)
+        live.add_edge('newcomer', 'user7', relationship_type='follows', weight=1.0)
+        change_log.record(nodes=['newcomer'], links=[('newcomer', 'user7')])
+    store.apply(add_follow)
+
+    snapshot = store.snapshot()
+    csr = metric_cache.peek(snapshot, 'csr_graph')
+    assert store.csr_patches == 1
+    assert_same_graph(csr, CSRGraph.from_networkx(snapshot))
+
+
+@pytest.mark.parametrize('direction', ['out', 'in'])
+@pytest.mark.parametrize('max_nodes', [None, 0, 1, 7, 50])
+def test_multi_source_bfs_matches_bfs(direction, max_nodes):
+    graph = social_graph(num_nodes=300, num_edges=900)
+    csr = CSRGraph.from_networkx(graph)
+    # More sources than one lockstep group holds, with a repeated source
+    sources = np.array(list(range(0, 300, 3)) + [0], dtype=np.int32)
+
+    results = csr.multi_source_bfs(sources, 4, direction, max_nodes)
+
+    assert len(results) == len(sources)
+    for source, (node_ids, depths, truncated) in zip(sources.tolist(), results):
+        expected_ids, expected_depths, expected_truncated = csr.bfs(source, 4, direction, max_nodes)
+        assert node_ids.tolist() == expected_ids.tolist()
+        assert depths.tolist() == expected_depths.tolist()
+        assert truncated == expected_truncated
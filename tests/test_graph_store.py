@@ -0,0 +1,104 @@
+import networkx as nx
+import pytest
+
+from utils.change_log import GraphChangeLog
+from utils.graph_store import GraphStore
+
+
+def assert_same_graph(snapshot, graph):
+    assert list(snapshot.nodes(data=True)) == list(graph.nodes(data=True))
+    assert list(snapshot.edges(data=True)) == list(graph.edges(data=True))
+    assert [list(snapshot.predecessors(node)) for node in snapshot] == [list(graph.predecessors(node))
+                                                                       for node in graph]
+    # Successor and predecessor rows hold the same data dict per edge, as in a regular DiGraph
+    for source, target in snapshot.edges():
+        assert snapshot._succ[source][target] is snapshot._pred[target][source]
+
+
+@pytest.fixture
+def store():
+    change_log = GraphChangeLog()
+    graph = nx.DiGraph()
+    for i in range(20):
+        graph.add_node(f'user{i}', follower_count=i, node_type='user')
+    for i in range(19):
+        graph.add_edge(f'user{i}', f'user{i + 1}', relationship_type='follows', weight=1.0)
+    return GraphStore(graph, change_log=change_log)
+
+
+def add_edge(store, source, target, **data):
+    def mutation(graph):
+        new_nodes = [node for node in (source, target) if node not in graph]
+        graph.add_edge(source, target, **data)
+        store.change_log.record(nodes=new_nodes, links=[(source, target)])
+    store.apply(mutation)
+
+
+def test_snapshots_are_built_copy_on_write(store):
+    first = store.snapshot()
+    first_edges = list(first.edges(data=True))
+
+    add_edge(store, 'user3', 'user9', relationship_type='likes', weight=2.0)
+    add_edge(store, 'newcomer', 'user0', relationship_type='follows', weight=1.0)
+    add_edge(store, 'user0', 'user1', relationship_type='mentions', weight=5.0)
+
+    def set_niche(graph):
+        graph.nodes['user5']['niche'] = 'tech'
+        store.change_log.record(nodes=['user5'])
+    store.apply(set_niche)
+    second = store.snapshot()
+
+    assert store.full_copies == 1
+    assert store.incremental_snapshots == 1
+    assert nx.is_frozen(second)
+    assert_same_graph(second, store.graph)
+    # The previous snapshot is unchanged and untouched rows are shared with it
+    assert list(first.edges(data=True)) == first_edges
+    assert second._succ['user12'] is first._succ['user12']
+    assert second._succ['user0'] is not first._succ['user0']
+    assert second.nodes['user0'] is not store.graph.nodes['user0']
+
+
+def test_unlogged_changes_fall_back_to_full_copy(store):
+    store.snapshot()
+
+    def clear(graph):
+        graph.clear()
+        graph.add_node('alone')
+        store.change_log.reset()
+    store.apply(clear)
+
+    assert_same_graph(store.snapshot(), store.graph)
+    assert store.full_copies == 2
+
+
+def test_failed_mutation_falls_back_to_full_copy(store):
+    store.snapshot()
+
+    def fail(graph):
+        graph.add_node('half_written')
+        raise ValueError('failed part way')
+    with pytest.raises(ValueError):
+        store.apply(fail)
+
+    assert_same_graph(store.snapshot(), store.graph)
+    assert store.full_copies == 2
+
+
+def test_snapshot_with_excludes_writes_between_snapshot_and_capture(store):
+    snapshot = store.snapshot
+    raced = []
+
+    def racing_snapshot():
+        result = snapshot()
+        # A write lands after the snapshot was built but before the caller reads its state
+        if not raced:
+            raced.append(True)
+            add_edge(store, 'user0', 'user19', relationship_type='likes', weight=1.0)
+        return result
+    store.snapshot = racing_snapshot
+
+    graph, version = store.snapshot_with(lambda: store.version)
+
+    assert version == store.version == 1
+    assert graph.has_edge('user0', 'user19')
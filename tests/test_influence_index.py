@@ -0,0 +1,109 @@
+import networkx as nx
+import numpy as np
+import pytest
+
+from utils.change_log import GraphChangeLog
+from utils.influence_calc import InfluenceCalculator
+from utils.influence_index import InfluenceIndex, composite_influence_score
+from utils.metric_cache import MetricCache
+
+
+def social_graph(num_nodes=60, num_edges=240, seed=9):
+    rng = np.random.default_rng(seed)
+    graph = nx.DiGraph()
+    for i in range(num_nodes):
+        graph.add_node(f'user{i}', follower_count=int(rng.integers(0, 100000)),
+                       engagement_score=float(rng.random()), node_type='user', niche=['tech', 'music'][i % 2])
+    nodes = list(graph)
+    while graph.number_of_edges() < num_edges:
+        source, target = rng.choice(nodes, size=2, replace=False)
+        graph.add_edge(source, target, relationship_type='follows', weight=float(rng.choice([0.5, 1.0, 2.0])))
+    return graph
+
+
+@pytest.fixture
+def setup():
+    graph = social_graph()
+    change_log = GraphChangeLog()
+    index = InfluenceIndex(change_log, refresh_interval=3600)
+    # Both paths then share one PageRank vector per graph version
+    calc = InfluenceCalculator(MetricCache(graph), influence_index=index)
+    return graph, change_log, index, calc
+
+
+def ranking(influencers):
+    return [(record['user'], pytest.approx(record['influence_score'], abs=1.0e-12)) for record in influencers]
+
+
+def indexed(calc, graph, change_log, limit=20, niche=None):
+    return calc.get_top_influencers(graph, limit, niche, seq=change_log.seq)
+
+
+def full_rank(calc, graph, limit=20, niche=None):
+    return calc.get_top_influencers(graph, limit, niche)
+
+
+@pytest.mark.parametrize('niche', [None, 'music'])
+def test_index_matches_full_ranking(setup, niche):
+    graph, change_log, index, calc = setup
+    change_log.record(nodes=list(graph))
+
+    assert ranking(indexed(calc, graph, change_log, niche=niche)) == ranking(full_rank(calc, graph, niche=niche))
+    assert index.freshness()['pagerank_exact']
+
+
+def expected_ranking(graph, stored_pagerank, num_nodes, limit=20):
+    """Full recomputation with the PageRank and node count of the index's last refresh"""
+    scores = [(node, float(composite_influence_score(data['follower_count'], data['engagement_score'],
+                                                     graph.in_degree(node), graph.out_degree(node),
+                                                     stored_pagerank.get(node, 0.0), num_nodes)))
+              for node, data in graph.nodes(data=True)]
+    order = {node: i for i, node in enumerate(graph)}
+    scores.sort(key=lambda item: (-item[1], order[item[0]]))
+    return [(node, pytest.approx(score, abs=1.0e-12)) for node, score in scores[:limit]]
+
+
+@pytest.mark.parametrize('new_node', [False, True])
+def test_changes_rescore_with_stored_pagerank_and_node_count(setup, new_node):
+    graph, change_log, index, calc = setup
+    change_log.record(nodes=list(graph))
+    indexed(calc, graph, change_log)
+    num_nodes = graph.number_of_nodes()
+    stored_pagerank = {node: pagerank for node, _, pagerank in index.top(num_nodes)}
+
+    graph.add_edge('user3', 'user4', relationship_type='follows', weight=2.0)
+    graph.nodes['user5']['follower_count'] = 10 ** 6
+    change_log.record(nodes=['user5'], links=[('user3', 'user4')])
+    if new_node:
+        graph.add_node('newcomer', follower_count=10 ** 5, engagement_score=1.0, node_type='user', niche='tech')
+        graph.add_edge('newcomer', 'user1', relationship_type='follows', weight=1.0)
+        change_log.record(nodes=['newcomer'], links=[('newcomer', 'user1')])
+    calc.metric_cache.bump_version()
+    result = indexed(calc, graph, change_log)
+
+    # New nodes are rescored like any other change, without a full refresh
+    assert index.full_refreshes == 1
+    assert index.incremental_updates == 1
+    freshness = index.freshness()
+    assert not freshness['pagerank_exact']
+    assert freshness['refreshed_seq'] < freshness['seq']
+    assert freshness['num_nodes_at_refresh'] == num_nodes
+    assert ranking(result) == expected_ranking(graph, stored_pagerank, num_nodes)
+
+
+def test_older_snapshot_is_ranked_from_itself(setup):
+    graph, change_log, index, calc = setup
+    change_log.record(nodes=list(graph))
+    old_seq = change_log.seq
+    old_snapshot = nx.freeze(graph.copy())
+
+    graph.add_node('newcomer', follower_count=10 ** 7, engagement_score=1.0, node_type='user', niche='tech')
+    change_log.record(nodes=['newcomer'])
+    calc.metric_cache.bump_version()
+    indexed(calc, graph, change_log)
+
+    # The index is now ahead of the old snapshot and its top node is missing there
+    calc.metric_cache.bind(old_snapshot)
+    result = calc.get_top_influencers(old_snapshot, 20, seq=old_seq)
+    assert 'newcomer' not in [record['user'] for record in result]
+    assert ranking(result) == ranking(full_rank(calc, old_snapshot))
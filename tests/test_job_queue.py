@@ -0,0 +1,86 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import networkx as nx
+import pytest
+
+from utils.change_log import GraphChangeLog
+from utils.graph_store import GraphStore
+from utils.job_queue import AnalyticsJobQueue
+from utils.metric_cache import MetricCache
+
+
+def social_graph(num_nodes=30):
+    graph = nx.DiGraph()
+    for i in range(num_nodes):
+        graph.add_node(f'user{i}', follower_count=i * 10, engagement_score=0.5, node_type='user', niche='tech')
+    for i in range(num_nodes):
+        graph.add_edge(f'user{i}', f'user{(i + 1) % num_nodes}', relationship_type='follows', weight=1.0)
+    return graph
+
+
+@pytest.fixture
+def store():
+    return GraphStore(social_graph(), MetricCache(), change_log=GraphChangeLog())
+
+
+def wait(queue, job_id):
+    for _ in range(200):
+        job = queue.get(job_id)
+        if job['job_status'] not in ('queued', 'running'):
+            return job
+        time.sleep(0.05)
+    raise AssertionError('job did not finish')
+
+
+def add_user(store, user_handle):
+    def mutation(graph):
+        graph.add_node(user_handle, follower_count=0, engagement_score=0.0, node_type='user')
+        store.change_log.record(nodes=[user_handle])
+    store.apply(mutation)
+
+
+def test_workers_are_sent_a_snapshot_file_not_the_graph(store, tmp_path):
+    executor = ThreadPoolExecutor(max_workers=1)
+    submitted = []
+    submit = executor.submit
+
+    def recording_submit(fn, *args):
+        submitted.append(args)
+        return submit(fn, *args)
+    executor.submit = recording_submit
+    queue = AnalyticsJobQueue(store, executor=executor, snapshot_dir=str(tmp_path))
+
+    job = wait(queue, queue.submit('top_influencers', {'limit': 5})['job_id'])
+    queue.submit('analytics')
+
+    assert job['job_status'] == 'finished'
+    assert len(job['result']['top_influencers']) == 5
+    # Both jobs share the one file written for this graph version
+    (_, first, _), (_, second, _) = submitted
+    assert isinstance(first, str) and first == second
+    assert os.listdir(tmp_path) == [os.path.basename(first)]
+
+    # Once the version is superseded and its jobs are done, its file is removed
+    wait(queue, queue.submit('analytics')['job_id'])
+    add_user(store, 'newcomer')
+    queue.submit('analytics')
+    assert not os.path.exists(first)
+    assert queue.stats()['snapshot_files'] == 1
+    queue.shutdown()
+
+
+def test_finished_jobs_expire_without_graph_changes(store, tmp_path):
+    queue = AnalyticsJobQueue(store, executor=ThreadPoolExecutor(max_workers=1), max_jobs=3,
+                              snapshot_dir=str(tmp_path))
+    job_ids = [wait(queue, queue.submit('top_influencers', {'limit': limit})['job_id'])['job_id']
+               for limit in range(1, 6)]
+
+    # Only the newest jobs are kept, although the graph version never changed
+    assert [queue.get(job_id) is not None for job_id in job_ids] == [False, False, True, True, True]
+
+    queue.job_ttl = 0
+    assert queue.get(job_ids[-1]) is None
+    assert queue.stats()['jobs'] == 0
+    queue.shutdown()
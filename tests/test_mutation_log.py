@@ -0,0 +1,129 @@
+import time
+
+import networkx as nx
+
+from utils.graph_store import GraphStore
+from utils.mutation_log import MutationLog, archive_file
+from utils.snapshot import SnapshotWriter
+
+
+def add_user(graph, user_handle):
+    graph.add_node(user_handle, follower_count=0, engagement_score=0.0, node_type='user')
+
+
+def add_follow(graph, source, target):
+    graph.add_edge(source, target, relationship_type='follows', weight=1.0)
+
+
+MUTATIONS = {'add_user': add_user, 'add_follow': add_follow}
+
+
+class Server:
+    """One process lifetime: recover from disk, then serve logged mutations"""
+
+    def __init__(self, directory):
+        self.store = GraphStore(nx.DiGraph())
+        self.log = MutationLog(str(directory / 'mutations.log'))
+        self.writer = SnapshotWriter(self.store, str(directory / 'graph.snapshot'), mutation_log=self.log)
+        header = self.writer.load()
+        log_seq = header['metadata'].get('log_seq', 0) if header is not None else 0
+        self.replayed = list(self.log.replay(log_seq))
+        for record in self.replayed:
+            self.store.apply(lambda graph, record=record: MUTATIONS[record['op']](graph, **record['params']))
+
+    def apply(self, op, **params):
+        def mutation(graph):
+            result = MUTATIONS[op](graph, **params)
+            self.log.append(op, params)
+            return result
+        self.store.apply(mutation)
+        self.log.commit()
+
+    def stop(self):
+        self.log.close()
+
+
+def test_replay_restores_unsnapshotted_mutations(tmp_path):
+    server = Server(tmp_path)
+    server.apply('add_user', user_handle='a')
+    server.apply('add_user', user_handle='b')
+    server.apply('add_follow', source='a', target='b')
+    server.stop()
+
+    server = Server(tmp_path)
+    assert [record['seq'] for record in server.replayed] == [1, 2, 3]
+    assert set(server.store.graph.edges()) == {('a', 'b')}
+    server.stop()
+
+
+def test_compaction_keeps_only_records_after_snapshot(tmp_path):
+    server = Server(tmp_path)
+    server.apply('add_user', user_handle='a')
+    server.apply('add_user', user_handle='b')
+    result = server.writer.save()
+    server.apply('add_user', user_handle='c')
+
+    assert result['log_seq'] == 2
+    assert result['log_records_compacted'] == 2
+    assert [record['seq'] for record in server.log.replay()] == [3]
+    server.stop()
+
+
+def test_restarts_after_compaction_keep_new_mutations(tmp_path):
+    server = Server(tmp_path)
+    for user in ('a', 'b', 'c'):
+        server.apply('add_user', user_handle=user)
+    server.writer.save()
+    server.stop()
+
+    # The compacted log is empty, so numbering has to resume from the snapshot
+    server = Server(tmp_path)
+    assert server.log.seq == 3
+    server.apply('add_user', user_handle='d')
+    server.apply('add_follow', source='a', target='d')
+    server.stop()
+
+    server = Server(tmp_path)
+    assert [record['seq'] for record in server.replayed] == [4, 5]
+    assert set(server.store.graph.nodes()) == {'a', 'b', 'c', 'd'}
+    assert set(server.store.graph.edges()) == {('a', 'd')}
+    server.stop()
+
+
+def test_log_threshold_triggers_background_compaction(tmp_path):
+    server = Server(tmp_path)
+    server.writer.max_log_records = 3
+    server.writer.start()
+    try:
+        for user in ('a', 'b'):
+            server.apply('add_user', user_handle=user)
+            assert not server.writer.compact_if_needed()
+        server.apply('add_user', user_handle='c')
+        assert server.writer.compact_if_needed()
+
+        for _ in range(100):
+            if server.log.records_retained == 0:
+                break
+            time.sleep(0.05)
+        assert server.log.records_retained == 0
+        assert server.writer.last_save['log_seq'] == 3
+    finally:
+        server.writer.stop()
+        server.stop()
+
+
+def test_archived_files_cannot_be_replaced(tmp_path):
+    upload = tmp_path / 'upload.CSV'
+    upload.write_text('first')
+    first, first_digest = archive_file(str(upload), str(tmp_path / 'archive'))
+    # A later upload under the same name lands elsewhere and leaves the first one intact
+    upload.write_text('second')
+    second, _ = archive_file(str(upload), str(tmp_path / 'archive'))
+    upload.write_text('first')
+    again, _ = archive_file(str(upload), str(tmp_path / 'archive'))
+
+    assert first != second
+    assert again == first
+    assert first.endswith(f'{first_digest}.csv')
+    assert open(first).read() == 'first'
+    assert not upload.exists()
@@ -0,0 +1,66 @@
+import networkx as nx
+import numpy as np
+import pytest
+
+from utils.data_processor import DataProcessor
+from utils.ontology import OntologyValidator
+
+
+@pytest.fixture(scope='module')
+def validator():
+    return OntologyValidator.from_file('ontology.owl')
+
+
+@pytest.mark.parametrize('source_type, relation, target_type, allowed', [
+    ('User', 'follows', 'User', True),
+    ('User', 'mentions', 'User', True),
+    ('User', 'likes', 'Post', True),
+    # A like or share of a user stands for one of that user's posts
+    ('User', 'likes', 'User', True),
+    ('User', 'shares', 'User', True),
+    ('User', 'creates', 'Post', True),
+    ('Post', 'follows', 'User', False),
+    ('User', 'follows', 'Post', False),
+    ('User', 'unknown', 'User', False),
+])
+def test_validate(validator, source_type, relation, target_type, allowed):
+    assert validator.validate(source_type, relation, target_type) is allowed
+
+
+def test_valid_mask_matches_validate(validator):
+    node_types = ['user', 'post']
+    relations = ['follows', 'mentions', 'likes', 'shares', 'creates', 'unknown']
+    cases = [(s, r, t) for s in node_types for r in relations for t in node_types]
+
+    mask = validator.valid_mask(np.array([s for s, _, _ in cases], dtype=object),
+                                np.array([r for _, r, _ in cases], dtype=object),
+                                np.array([t for _, _, t in cases], dtype=object))
+
+    assert mask.tolist() == [validator.validate(s.capitalize(), r, t.capitalize()) for s, r, t in cases]
+
+
+def test_bundled_samples_are_accepted(validator):
+    processor = DataProcessor(validator=validator)
+
+    csv_result = processor.process_csv('static/data/sample.csv', nx.DiGraph())
+    assert csv_result['edges_rejected'] == 0
+    assert csv_result['edges_added'] == csv_result['total_rows_processed']
+
+    graph = nx.DiGraph()
+    json_result = processor.process_json('testing.json', graph)
+    assert json_result['edges_rejected'] == 0
+    assert json_result['edges_added'] == 7
+    assert graph.nodes['Post1']['node_type'] == 'post'
+
+
+def test_upload_rejects_edges_the_ontology_forbids(validator, tmp_path):
+    path = tmp_path / 'edges.jsonl'
+    path.write_text('{"id": "p", "type": "Post"}\n'
+                    '{"source": "p", "target": "u", "relation": "follows"}\n'
+                    '{"source": "u", "target": "v", "relation": "follows"}\n')
+    graph = nx.DiGraph()
+
+    result = DataProcessor(validator=validator).process_json_lines(str(path), graph)
+
+    assert result['edges_rejected'] == 1
+    assert list(graph.edges()) == [('v', 'u')]
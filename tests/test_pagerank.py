@@ -0,0 +1,51 @@
+import networkx as nx
+import numpy as np
+import pytest
+
+from utils.csr_graph import CSRGraph
+from utils.pagerank import PageRankEngine
+
+
+def weighted_graph(num_nodes=200, num_edges=1000, seed=1):
+    graph = nx.gnm_random_graph(num_nodes, num_edges, seed=seed, directed=True)
+    rng = np.random.default_rng(seed)
+    for source, target in graph.edges():
+        graph[source][target]['weight'] = float(rng.choice([0.5, 1.0, 2.5]))
+    # A dangling node, whose rank is spread uniformly
+    graph.add_node('dangling')
+    graph.add_edge(0, 'dangling', weight=1.0)
+    return graph
+
+
+@pytest.mark.parametrize('weighted', [True, False])
+def test_pagerank_matches_networkx(weighted):
+    graph = weighted_graph()
+    csr = CSRGraph.from_networkx(graph)
+
+    scores = csr.to_dict(PageRankEngine(tol=1.0e-10).compute(csr, weighted=weighted))
+    expected = nx.pagerank(graph, weight='weight' if weighted else None, tol=1.0e-10)
+
+    assert scores.keys() == expected.keys()
+    for node, value in expected.items():
+        assert scores[node] == pytest.approx(value, abs=1.0e-8)
+
+
+def test_warm_start_converges_to_the_same_vector():
+    graph = weighted_graph()
+    engine = PageRankEngine(tol=1.0e-10)
+    engine.compute(CSRGraph.from_networkx(graph))
+    cold_iterations = engine.last_iterations
+
+    graph.add_edge(1, 2, weight=3.0)
+    graph.add_edge('new', 1, weight=1.0)
+    csr = CSRGraph.from_networkx(graph)
+    warm = engine.compute(csr)
+
+    assert engine.last_warm_start
+    assert engine.last_iterations < cold_iterations
+    expected = nx.pagerank(graph, weight='weight', tol=1.0e-10)
+    assert np.allclose(warm, [expected[node] for node in csr.nodes], atol=1.0e-8)
+
+
+def test_empty_graph():
+    assert len(PageRankEngine().compute(CSRGraph.from_networkx(nx.DiGraph()))) == 0
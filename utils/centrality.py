@@ -0,0 +1,42 @@
+from typing import Optional
+
+# Graphs larger than this use sampled betweenness unless exact mode is requested
+APPROX_BETWEENNESS_NODE_THRESHOLD = 5000
+
+# Default number of pivot nodes sampled in approximate mode
+DEFAULT_BETWEENNESS_SAMPLE_SIZE = 512
+
+# Fixed seed so repeated approximate runs return the same estimate
+BETWEENNESS_SEED = 42
+
+BETWEENNESS_MODES = ('auto', 'exact', 'approx')
+
+
+def resolve_betweenness_sample_size(num_nodes: int, mode: str = 'auto', k: Optional[int] = None,
+                                    threshold: int = APPROX_BETWEENNESS_NODE_THRESHOLD) -> Optional[int]:
+    """
+    Decide how many pivot nodes betweenness centrality should sample
+
+    Args:
+        num_nodes: Number of nodes in the graph
+        mode: 'exact', 'approx', or 'auto' (approximate above the threshold)
+        k: Requested sample size for approximate mode
+        threshold: Node count above which 'auto' switches to approximation
+
+    Returns:
+        Sample size to pass as ``k``, or None when the exact algorithm should run
+    """
+    if mode not in BETWEENNESS_MODES:
+        raise ValueError(f"Invalid betweenness mode '{mode}', expected one of {', '.join(BETWEENNESS_MODES)}")
+    if k is not None and k < 1:
+        raise ValueError('Betweenness sample size k must be a positive integer')
+
+    if mode == 'exact' or (mode == 'auto' and num_nodes <= threshold):
+        return None
+
+    sample_size = k if k is not None else DEFAULT_BETWEENNESS_SAMPLE_SIZE
+    # Sampling every node is just the exact computation
+    if sample_size >= num_nodes:
+        return None
+    return sample_size
+
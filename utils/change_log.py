@@ -0,0 +1,84 @@
+import threading
+from collections import deque
+from typing import Deque, Hashable, Iterable, List, Optional, Set, Tuple
+
+# Node ids and links retained for delta queries before the oldest entries are dropped
+DEFAULT_MAX_CHANGES = 1000000
+
+
+class GraphChangeLog:
+    """Sequence-numbered log of the nodes and links each mutation touched
+
+    Every mutation records the node ids and (source, target) pairs it added or
+    changed under a new, monotonically increasing sequence number. A client
+    that has seen the graph up to some sequence number can then ask which keys
+    changed since; their current state is read from the graph, so keys that no
+    longer exist there are removals. Clearing the graph, or trimming the log
+    past a client's sequence number, means that client needs a full reload.
+    """
+
+    def __init__(self, max_changes: int = DEFAULT_MAX_CHANGES):
+        self.max_changes = max_changes
+        self.seq = 0
+        # Changes after this sequence number are fully retained
+        self.oldest_seq = 0
+        self._entries: Deque[Tuple[int, List[Hashable], List[Tuple[Hashable, Hashable]]]] = deque()
+        self._retained = 0
+        self._lock = threading.Lock()
+
+    def record(self, nodes: Iterable[Hashable] = (), links: Iterable[Tuple[Hashable, Hashable]] = ()) -> int:
+        """
+        Record one mutation
+
+        Args:
+            nodes: Ids of nodes added or changed
+            links: (source, target) pairs of edges added or changed
+
+        Returns:
+            The mutation's sequence number
+        """
+        nodes, links = list(nodes), list(links)
+        with self._lock:
+            self.seq += 1
+            self._entries.append((self.seq, nodes, links))
+            self._retained += len(nodes) + len(links)
+            while self._retained > self.max_changes and self._entries:
+                seq, dropped_nodes, dropped_links = self._entries.popleft()
+                self._retained -= len(dropped_nodes) + len(dropped_links)
+                self.oldest_seq = seq
+            return self.seq
+
+    def reset(self) -> int:
+        """Record that the whole graph was replaced or cleared"""
+        with self._lock:
+            self.seq += 1
+            self._entries.clear()
+            self._retained = 0
+            self.oldest_seq = self.seq
+            return self.seq
+
+    def changes_since(self, since: int, until: int = None) -> Optional[Tuple[Set[Hashable], Set[Tuple[Hashable, Hashable]]]]:
+        """
+        Keys touched after a sequence number
+
+        Args:
+            since: Sequence number the client is up to date with
+            until: Optional last sequence number to include
+
+        Returns:
+            (node ids, (source, target) pairs), or None if the log cannot
+            answer and a full reload is needed
+        """
+        with self._lock:
+            if since < self.oldest_seq or since > self.seq:
+                return None
+            nodes: Set[Hashable] = set()
+            links: Set[Tuple[Hashable, Hashable]] = set()
+            for seq, entry_nodes, entry_links in reversed(self._entries):
+                if seq <= since:
+                    break
+                if until is not None and seq > until:
+                    continue
+                nodes.update(entry_nodes)
+                links.update(entry_links)
+            return nodes, links
@@ -0,0 +1,583 @@
+from itertools import islice
+
+import networkx as nx
+import numpy as np
+import scipy.sparse as sp
+from typing import Dict, Hashable, List, Optional, Tuple, Iterable
+
+# Frontier nodes expanded per step of a budgeted breadth-first search
+BFS_BLOCK_SIZE = 4096
+
+# Sources searched together by a multi-source BFS, one bit each in a uint64 visited mask
+MULTI_BFS_WIDTH = 64
+
+
+class CSRGraph:
+    """Compact, integer-indexed, read-only view of an influence graph
+
+    Node handles are interned to int32 ids. Out-edges are stored in CSR form
+    (``out_indptr``/``out_indices``) and in-edges in CSC form
+    (``in_indptr``/``in_indices``), each with parallel weight and
+    relationship-type code arrays. Neighbor order matches the adjacency order
+    of the source ``nx.DiGraph``, so traversals visit nodes in the same order.
+
+    Only the attributes the application uses are kept: follower_count,
+    engagement_score, node_type and the optional niche on nodes,
+    relationship_type and weight on edges.
+    """
+
+    def __init__(self, nodes: List[str], out_indptr: np.ndarray, out_indices: np.ndarray,
+                 out_weights: np.ndarray, out_type_codes: np.ndarray, in_indptr: np.ndarray,
+                 in_indices: np.ndarray, in_weights: np.ndarray, in_type_codes: np.ndarray,
+                 relationship_types: List[str], follower_count: np.ndarray,
+                 engagement_score: np.ndarray, node_type_codes: np.ndarray, node_types: List[str],
+                 niche_codes: np.ndarray = None, niches: List[str] = None, node_index: Dict[str, int] = None):
+        self.nodes = nodes
+        self.node_index = node_index if node_index is not None else {node: i for i, node in enumerate(nodes)}
+        self.out_indptr = out_indptr
+        self.out_indices = out_indices
+        self.out_weights = out_weights
+        self.out_type_codes = out_type_codes
+        self.in_indptr = in_indptr
+        self.in_indices = in_indices
+        self.in_weights = in_weights
+        self.in_type_codes = in_type_codes
+        self.relationship_types = relationship_types
+        self.follower_count = follower_count
+        self.engagement_score = engagement_score
+        self.node_type_codes = node_type_codes
+        self.node_types = node_types
+        # -1 marks nodes without a niche
+        self.niche_codes = niche_codes if niche_codes is not None else np.full(len(nodes), -1, dtype=np.int32)
+        self.niches = niches if niches is not None else []
+
+    @classmethod
+    def from_networkx(cls, graph: nx.DiGraph) -> 'CSRGraph':
+        """
+        Build a CSR graph from a NetworkX DiGraph
+
+        Args:
+            graph: NetworkX DiGraph
+
+        Returns:
+            CSRGraph with the same nodes, edges and application attributes
+        """
+        nodes = list(graph.nodes())
+        node_index = {node: i for i, node in enumerate(nodes)}
+        num_nodes = len(nodes)
+        num_edges = graph.number_of_edges()
+
+        node_types: Dict[str, int] = {}
+        follower_count = np.fromiter((data.get('follower_count', 0) for _, data in graph.nodes(data=True)),
+                                     dtype=np.int64, count=num_nodes)
+        engagement_score = np.fromiter((data.get('engagement_score', 0.0) for _, data in graph.nodes(data=True)),
+                                       dtype=np.float64, count=num_nodes)
+        node_type_codes = np.fromiter((node_types.setdefault(data.get('node_type', 'user'), len(node_types))
+                                       for _, data in graph.nodes(data=True)),
+                                      dtype=np.int16, count=num_nodes)
+        niches: Dict[str, int] = {}
+        niche_codes = np.fromiter((niches.setdefault(data['niche'], len(niches)) if data.get('niche') is not None else -1
+                                   for _, data in graph.nodes(data=True)),
+                                  dtype=np.int32, count=num_nodes)
+
+        relationship_types: Dict[str, int] = {}
+
+        def adjacency_arrays(adjacency) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+            degrees = np.fromiter((len(adjacency[node]) for node in nodes), dtype=np.int64, count=num_nodes)
+            indptr = np.zeros(num_nodes + 1, dtype=np.int64)
+            np.cumsum(degrees, out=indptr[1:])
+            edges = [(neighbor, data) for node in nodes for neighbor, data in adjacency[node].items()]
+            indices = np.fromiter((node_index[neighbor] for neighbor, _ in edges), dtype=np.int32, count=num_edges)
+            weights = np.fromiter((data.get('weight', 1.0) for _, data in edges), dtype=np.float64, count=num_edges)
+            type_codes = np.fromiter((relationship_types.setdefault(data.get('relationship_type', 'unknown'),
+                                                                    len(relationship_types))
+                                      for _, data in edges),
+                                     dtype=np.int16, count=num_edges)
+            return indptr, indices, weights, type_codes
+
+        out_indptr, out_indices, out_weights, out_type_codes = adjacency_arrays(graph.succ)
+        in_indptr, in_indices, in_weights, in_type_codes = adjacency_arrays(graph.pred)
+
+        return cls(nodes, out_indptr, out_indices, out_weights, out_type_codes,
+                   in_indptr, in_indices, in_weights, in_type_codes,
+                   list(relationship_types), follower_count, engagement_score,
+                   node_type_codes, list(node_types), niche_codes, list(niches))
+
+    def to_networkx(self, graph: nx.DiGraph = None) -> nx.DiGraph:
+        """
+        Convert back to a NetworkX DiGraph
+
+        Args:
+            graph: Optional existing graph to add the nodes and edges to
+
+        Returns:
+            NetworkX DiGraph with the same nodes, edges and attributes
+        """
+        if graph is None:
+            graph = nx.DiGraph()
+        graph.add_nodes_from(
+            (node, {'follower_count': follower_count, 'engagement_score': engagement_score,
+                    'node_type': self.node_types[type_code],
+                    **({'niche': self.niches[niche_code]} if niche_code >= 0 else {})})
+            for node, follower_count, engagement_score, type_code, niche_code in zip(self.nodes,
+                                                                                     self.follower_count.tolist(),
+                                                                                     self.engagement_score.tolist(),
+                                                                                     self.node_type_codes.tolist(),
+                                                                                     self.niche_codes.tolist())
+        )
+        sources, targets = self.edge_arrays()
+        graph.add_edges_from(
+            (self.nodes[source], self.nodes[target],
+             {'relationship_type': self.relationship_types[type_code], 'weight': weight})
+            for source, target, type_code, weight in zip(sources.tolist(), targets.tolist(),
+                                                         self.out_type_codes.tolist(),
+                                                         self.out_weights.tolist())
+        )
+        return graph
+
+    def patched(self, graph: nx.DiGraph, nodes: Iterable[Hashable],
+                links: Iterable[Tuple[Hashable, Hashable]]) -> Optional['CSRGraph']:
+        """
+        CSR graph of a later version of the same graph, from the keys that changed
+
+        Only the attributes and adjacency rows of the changed nodes and link
+        endpoints are read from ``graph``; every other row is moved over as
+        array slices, so the cost is the touched rows in Python plus O(N + E)
+        NumPy copying instead of a full from_networkx pass. Nodes are only
+        appended between versions, so new nodes keep graph order.
+
+        Args:
+            graph: The changed graph
+            nodes: Node ids added or changed since this CSR graph was built
+            links: (source, target) pairs of edges added or changed since then
+
+        Returns:
+            CSRGraph equal to ``from_networkx(graph)``, or None if the change
+            cannot be applied incrementally (nodes were removed)
+        """
+        num_old = len(self.nodes)
+        num_nodes = graph.number_of_nodes()
+        if num_nodes < num_old:
+            return None
+        new_nodes = list(islice(graph, num_old, None))
+        node_index = dict(self.node_index)
+        for node in new_nodes:
+            if node in node_index:
+                return None
+            node_index[node] = len(node_index)
+
+        touched = set(nodes)
+        for source, target in links:
+            touched.add(source)
+            touched.add(target)
+        touched.update(new_nodes)
+        if any(node not in graph or node not in node_index for node in touched):
+            return None
+        touched_ids = np.array(sorted(node_index[node] for node in touched), dtype=np.int64)
+        touched_nodes = [self.nodes[i] if i < num_old else new_nodes[i - num_old] for i in touched_ids.tolist()]
+
+        # Node attributes: extend for new nodes, then overwrite the touched ones
+        relationship_types = {name: code for code, name in enumerate(self.relationship_types)}
+        node_types = {name: code for code, name in enumerate(self.node_types)}
+        niches = {name: code for code, name in enumerate(self.niches)}
+        padding = num_nodes - num_old
+        follower_count = np.concatenate((self.follower_count, np.zeros(padding, dtype=self.follower_count.dtype)))
+        engagement_score = np.concatenate((self.engagement_score, np.zeros(padding, dtype=self.engagement_score.dtype)))
+        node_type_codes = np.concatenate((self.node_type_codes, np.zeros(padding, dtype=self.node_type_codes.dtype)))
+        niche_codes = np.concatenate((self.niche_codes, np.full(padding, -1, dtype=self.niche_codes.dtype)))
+        for node_id, node in zip(touched_ids.tolist(), touched_nodes):
+            data = graph.nodes[node]
+            follower_count[node_id] = data.get('follower_count', 0)
+            engagement_score[node_id] = data.get('engagement_score', 0.0)
+            node_type_codes[node_id] = node_types.setdefault(data.get('node_type', 'user'), len(node_types))
+            niche_codes[node_id] = niches.setdefault(data['niche'], len(niches)) if data.get('niche') is not None else -1
+
+        def replace_rows(indptr, indices, weights, type_codes, adjacency):
+            rows = [adjacency[node] for node in touched_nodes]
+            lengths = np.fromiter(map(len, rows), dtype=np.int64, count=len(rows))
+            edges = [(neighbor, data) for row in rows for neighbor, data in row.items()]
+            new_indices = np.fromiter((node_index[neighbor] for neighbor, _ in edges), dtype=np.int32, count=len(edges))
+            new_weights = np.fromiter((data.get('weight', 1.0) for _, data in edges), dtype=np.float64, count=len(edges))
+            new_type_codes = np.fromiter((relationship_types.setdefault(data.get('relationship_type', 'unknown'),
+                                                                        len(relationship_types))
+                                          for _, data in edges),
+                                         dtype=np.int16, count=len(edges))
+
+            degrees = np.zeros(num_nodes, dtype=np.int64)
+            degrees[:num_old] = np.diff(indptr)
+            degrees[touched_ids] = lengths
+            result_indptr = np.zeros(num_nodes + 1, dtype=np.int64)
+            np.cumsum(degrees, out=result_indptr[1:])
+
+            # Untouched rows keep their entries, shifted to the rows' new offsets
+            replaced = np.zeros(num_old, dtype=bool)
+            replaced[touched_ids[touched_ids < num_old]] = True
+            entry_rows = np.repeat(np.arange(num_old), np.diff(indptr))
+            kept = np.flatnonzero(~replaced[entry_rows])
+            kept_rows = entry_rows[kept]
+            kept_targets = result_indptr[kept_rows] + (kept - indptr[kept_rows])
+            new_targets = (np.repeat(result_indptr[touched_ids], lengths) + np.arange(len(edges))
+                           - np.repeat(np.cumsum(lengths) - lengths, lengths))
+
+            arrays = []
+            for old, new in ((indices, new_indices), (weights, new_weights), (type_codes, new_type_codes)):
+                array = np.empty(result_indptr[-1], dtype=old.dtype)
+                array[kept_targets] = old[kept]
+                array[new_targets] = new
+                arrays.append(array)
+            return (result_indptr, *arrays)
+
+        out_arrays = replace_rows(self.out_indptr, self.out_indices, self.out_weights, self.out_type_codes, graph.succ)
+        in_arrays = replace_rows(self.in_indptr, self.in_indices, self.in_weights, self.in_type_codes, graph.pred)
+        # An edge change the delta missed would leave the two directions disagreeing
+        if out_arrays[0][-1] != in_arrays[0][-1]:
+            return None
+
+        return CSRGraph(self.nodes + new_nodes, *out_arrays, *in_arrays, list(relationship_types),
+                        follower_count, engagement_score, node_type_codes, list(node_types),
+                        niche_codes, list(niches), node_index)
+
+    def number_of_nodes(self) -> int:
+        return len(self.nodes)
+
+    def number_of_edges(self) -> int:
+        return len(self.out_indices)
+
+    def __contains__(self, node: str) -> bool:
+        return node in self.node_index
+
+    def in_degree(self) -> np.ndarray:
+        """In-degree of every node, indexed by node id"""
+        return np.diff(self.in_indptr)
+
+    def out_degree(self) -> np.ndarray:
+        """Out-degree of every node, indexed by node id"""
+        return np.diff(self.out_indptr)
+
+    def edge_arrays(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Source and target id of every out-edge, in CSR order"""
+        sources = np.repeat(np.arange(self.number_of_nodes(), dtype=np.int32), self.out_degree())
+        return sources, self.out_indices
+
+    def successors(self, node_id: int) -> np.ndarray:
+        return self.out_indices[self.out_indptr[node_id]:self.out_indptr[node_id + 1]]
+
+    def predecessors(self, node_id: int) -> np.ndarray:
+        return self.in_indices[self.in_indptr[node_id]:self.in_indptr[node_id + 1]]
+
+    def to_dict(self, values: np.ndarray) -> Dict[str, float]:
+        """Map a per-node vector back to a dictionary keyed by handle"""
+        return dict(zip(self.nodes, values.tolist()))
+
+    def in_degree_centrality(self) -> np.ndarray:
+        """In-degree centrality as computed by nx.in_degree_centrality"""
+        return self._scale_degree(self.in_degree())
+
+    def out_degree_centrality(self) -> np.ndarray:
+        """Out-degree centrality as computed by nx.out_degree_centrality"""
+        return self._scale_degree(self.out_degree())
+
+    def degree_centrality(self) -> np.ndarray:
+        """Degree centrality as computed by nx.degree_centrality"""
+        return self._scale_degree(self.in_degree() + self.out_degree())
+
+    def _scale_degree(self, degree: np.ndarray) -> np.ndarray:
+        num_nodes = self.number_of_nodes()
+        if num_nodes <= 1:
+            return np.ones(num_nodes, dtype=np.float64)
+        return degree * (1.0 / (num_nodes - 1))
+
+    def transition_matrix(self, weighted: bool = True) -> Tuple[sp.csr_matrix, np.ndarray]:
+        """
+        Column-oriented transition matrix for PageRank power iteration
+
+        Each edge weight is divided by its source's total out-weight, and the
+        matrix is transposed so that ``matrix @ x`` pushes rank along edges.
+
+        Args:
+            weighted: Use edge weights, otherwise every edge counts as 1
+
+        Returns:
+            Tuple of (sparse N x N matrix, boolean mask of dangling nodes)
+        """
+        num_nodes = self.number_of_nodes()
+        sources, targets = self.edge_arrays()
+        weights = self.out_weights if weighted else np.ones(self.number_of_edges(), dtype=np.float64)
+        out_weight = np.bincount(sources, weights=weights, minlength=num_nodes)
+        dangling = out_weight == 0
+        inverse_out_weight = np.zeros(num_nodes, dtype=np.float64)
+        inverse_out_weight[~dangling] = 1.0 / out_weight[~dangling]
+
+        matrix = sp.csr_matrix((weights * inverse_out_weight[sources], (targets, sources)),
+                               shape=(num_nodes, num_nodes))
+        return matrix, dangling
+
+    def bfs(self, node_id: int, max_depth: int, direction: str = 'out',
+            max_nodes: int = None) -> Tuple[np.ndarray, np.ndarray, bool]:
+        """
+        Level-synchronous breadth-first search from a node
+
+        Each level is expanded as a frontier array and nodes are marked visited
+        when they are discovered, so no node is queued twice. Nodes are
+        returned in first-discovery order, which is the order a FIFO queue
+        would visit them. Only depths 1 to ``max_depth - 1`` are returned,
+        matching the influence chain convention.
+
+        Args:
+            node_id: Start node id
+            max_depth: Exclusive depth limit
+            direction: 'out' follows successors, 'in' follows predecessors
+            max_nodes: Optional budget on the number of nodes returned
+
+        Returns:
+            Tuple of (node ids, depths, truncated) where truncated is True when
+            the budget stopped the search before it finished
+        """
+        indptr, indices = (self.out_indptr, self.out_indices) if direction == 'out' else (self.in_indptr, self.in_indices)
+
+        visited = np.zeros(self.number_of_nodes(), dtype=bool)
+        visited[node_id] = True
+        frontier = np.array([node_id], dtype=np.int32)
+        budget = self.number_of_nodes() if max_nodes is None else max_nodes
+        found = []
+        depths = []
+        truncated = False
+
+        for depth in range(1, max_depth):
+            level = []
+            # Expand in blocks so a hub's neighbors are only gathered while budget remains
+            for start in range(0, len(frontier), BFS_BLOCK_SIZE):
+                if budget == 0:
+                    truncated = True
+                    break
+                neighbors = self._gather(indptr, indices, frontier[start:start + BFS_BLOCK_SIZE])
+                neighbors = neighbors[~visited[neighbors]]
+                if len(neighbors) == 0:
+                    continue
+                # Keep the first occurrence of each neighbor, in discovery order
+                _, first = np.unique(neighbors, return_index=True)
+                discovered = neighbors[np.sort(first)]
+                if len(discovered) > budget:
+                    discovered = discovered[:budget]
+                    truncated = True
+                visited[discovered] = True
+                level.append(discovered)
+                budget -= len(discovered)
+
+            if not level:
+                break
+            frontier = np.concatenate(level)
+            found.append(frontier)
+            depths.append(np.full(len(frontier), depth, dtype=np.int32))
+            if budget == 0 and depth < max_depth - 1:
+                truncated = True
+                break
+
+        if not found:
+            return np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.int32), truncated
+        return np.concatenate(found), np.concatenate(depths), truncated
+
+    def multi_source_bfs(self, node_ids: np.ndarray, max_depth: int, direction: str = 'out',
+                         max_nodes: int = None) -> List[Tuple[np.ndarray, np.ndarray, bool]]:
+        """
+        Breadth-first searches from many nodes at once
+
+        Up to MULTI_BFS_WIDTH searches run in lockstep with one bit each in a
+        shared uint64 visited mask. Every level gathers the adjacency of each
+        distinct frontier node once, however many searches reached it, so
+        overlapping neighborhoods are expanded a single time. Each search
+        returns the same nodes, in the same order and with the same budget,
+        as ``bfs`` from its source would.
+
+        Args:
+            node_ids: Start node ids
+            max_depth: Exclusive depth limit
+            direction: 'out' follows successors, 'in' follows predecessors
+            max_nodes: Optional budget on the number of nodes returned per search
+
+        Returns:
+            List of (node ids, depths, truncated) tuples, one per start node
+        """
+        node_ids = np.asarray(node_ids, dtype=np.int32)
+        results = []
+        for start in range(0, len(node_ids), MULTI_BFS_WIDTH):
+            results.extend(self._bfs_group(node_ids[start:start + MULTI_BFS_WIDTH], max_depth, direction, max_nodes))
+        return results
+
+    def _bfs_group(self, sources: np.ndarray, max_depth: int, direction: str,
+                   max_nodes: int = None) -> List[Tuple[np.ndarray, np.ndarray, bool]]:
+        """Lockstep BFS for at most MULTI_BFS_WIDTH sources"""
+        indptr, indices = (self.out_indptr, self.out_indices) if direction == 'out' else (self.in_indptr, self.in_indices)
+        num_sources = len(sources)
+
+        visited = np.zeros(self.number_of_nodes(), dtype=np.uint64)
+        source_bits = np.left_shift(np.uint64(1), np.arange(num_sources, dtype=np.uint64))
+        np.bitwise_or.at(visited, sources, source_bits)
+        budget = np.full(num_sources, self.number_of_nodes() if max_nodes is None else max_nodes, dtype=np.int64)
+        truncated = np.zeros(num_sources, dtype=bool)
+
+        # Frontier as (search, node) pairs, grouped by search and in each search's discovery order
+        frontier_search = np.arange(num_sources, dtype=np.int64)
+        frontier = sources
+        found_search, found, depths = [], [], []
+
+        for depth in range(1, max_depth):
+            distinct, inverse = np.unique(frontier, return_inverse=True)
+            lengths = indptr[distinct + 1] - indptr[distinct]
+            neighbors = self._gather(indptr, indices, distinct)
+            if len(neighbors) == 0:
+                break
+
+            # Hand each pair the shared neighbor run of its node
+            pair_lengths = lengths[inverse]
+            total = int(pair_lengths.sum())
+            run_starts = (np.cumsum(lengths) - lengths)[inverse]
+            offsets = np.arange(total) - np.repeat(np.cumsum(pair_lengths) - pair_lengths, pair_lengths)
+            search = np.repeat(frontier_search, pair_lengths)
+            discovered = neighbors[np.repeat(run_starts, pair_lengths) + offsets]
+
+            unseen = (visited[discovered] & source_bits[search]) == 0
+            search, discovered = search[unseen], discovered[unseen]
+            if len(discovered) == 0:
+                break
+            # First occurrence of each (search, node), in discovery order
+            _, first = np.unique(search * self.number_of_nodes() + discovered, return_index=True)
+            first.sort()
+            search, discovered = search[first], discovered[first]
+
+            # Keep each search's first ``budget`` discoveries
+            counts = np.bincount(search, minlength=num_sources)
+            rank = np.arange(len(search)) - np.repeat(np.cumsum(counts) - counts, counts)
+            keep = rank < budget[search]
+            truncated |= counts > budget
+            search, discovered = search[keep], discovered[keep]
+            budget -= np.minimum(counts, budget)
+
+            np.bitwise_or.at(visited, discovered, source_bits[search])
+            found_search.append(search)
+            found.append(discovered)
+            depths.append(np.full(len(discovered), depth, dtype=np.int32))
+
+            # A search that spent its budget stops, as bfs does
+            exhausted = budget == 0
+            if depth < max_depth - 1:
+                truncated |= exhausted
+            active = ~exhausted[search]
+            frontier_search, frontier = search[active], discovered[active]
+            if len(frontier) == 0:
+                break
+
+        if not found:
+            empty = np.zeros(0, dtype=np.int32)
+            return [(empty, empty, bool(truncated[i])) for i in range(num_sources)]
+        # Levels were appended in order, so a stable sort by search keeps depth then discovery order
+        found_search = np.concatenate(found_search)
+        order = np.argsort(found_search, kind='stable')
+        found, depths = np.concatenate(found)[order], np.concatenate(depths)[order]
+        bounds = np.searchsorted(found_search[order], np.arange(num_sources + 1))
+        return [(found[bounds[i]:bounds[i + 1]], depths[bounds[i]:bounds[i + 1]], bool(truncated[i]))
+                for i in range(num_sources)]
+
+    def neighborhood(self, node_id: int, radius: int) -> np.ndarray:
+        """
+        Ids of all nodes within ``radius`` hops, ignoring edge direction
+
+        Args:
+            node_id: Center node id
+            radius: Number of hops
+
+        Returns:
+            Sorted array of node ids including the center
+        """
+        visited = np.zeros(self.number_of_nodes(), dtype=bool)
+        visited[node_id] = True
+        frontier = np.array([node_id], dtype=np.int32)
+
+        for _ in range(radius):
+            neighbors = np.concatenate((self._gather(self.out_indptr, self.out_indices, frontier),
+                                        self._gather(self.in_indptr, self.in_indices, frontier)))
+            frontier = np.unique(neighbors[~visited[neighbors]])
+            if len(frontier) == 0:
+                break
+            visited[frontier] = True
+
+        return np.flatnonzero(visited)
+
+    def nearest_seed(self, seed_ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Assign every node to its closest seed node, ignoring edge direction
+
+        All seeds are searched from at once, level by level; a node reached by
+        several seeds at the same depth goes to the one expanded first.
+
+        Args:
+            seed_ids: Array of seed node ids
+
+        Returns:
+            Tuple of (labels, depths): the position in ``seed_ids`` of each
+            node's seed and its hop distance, both -1 for unreachable nodes
+        """
+        labels = np.full(self.number_of_nodes(), -1, dtype=np.int32)
+        depths = np.full(self.number_of_nodes(), -1, dtype=np.int32)
+        frontier = np.asarray(seed_ids, dtype=np.int32)
+        labels[frontier] = np.arange(len(frontier), dtype=np.int32)
+        depths[frontier] = 0
+
+        depth = 0
+        while len(frontier):
+            depth += 1
+            owners = labels[frontier]
+            neighbors = np.concatenate((self._gather(self.out_indptr, self.out_indices, frontier),
+                                        self._gather(self.in_indptr, self.in_indices, frontier)))
+            neighbor_owners = np.concatenate((
+                np.repeat(owners, self.out_indptr[frontier + 1] - self.out_indptr[frontier]),
+                np.repeat(owners, self.in_indptr[frontier + 1] - self.in_indptr[frontier])))
+            unlabeled = labels[neighbors] < 0
+            frontier, first = np.unique(neighbors[unlabeled], return_index=True)
+            labels[frontier] = neighbor_owners[unlabeled][first]
+            depths[frontier] = depth
+
+        return labels, depths
+
+    def subgraph(self, node_ids: Iterable[int]) -> 'CSRGraph':
+        """
+        Induced subgraph on the given node ids
+
+        Args:
+            node_ids: Node ids to keep; order defines the new ids
+
+        Returns:
+            New CSRGraph with only the selected nodes and the edges between them
+        """
+        node_ids = np.asarray(list(node_ids) if not isinstance(node_ids, np.ndarray) else node_ids, dtype=np.int32)
+        remap = np.full(self.number_of_nodes(), -1, dtype=np.int64)
+        remap[node_ids] = np.arange(len(node_ids))
+
+        def induced(indptr, indices, weights, type_codes):
+            rows = self._gather(indptr, np.arange(len(indices), dtype=np.int64), node_ids)
+            keep = remap[indices[rows]] >= 0
+            rows = rows[keep]
+            row_owner = np.repeat(np.arange(len(node_ids)), indptr[node_ids + 1] - indptr[node_ids])[keep]
+            new_indptr = np.zeros(len(node_ids) + 1, dtype=np.int64)
+            np.cumsum(np.bincount(row_owner, minlength=len(node_ids)), out=new_indptr[1:])
+            return new_indptr, remap[indices[rows]].astype(np.int32), weights[rows], type_codes[rows]
+
+        out_arrays = induced(self.out_indptr, self.out_indices, self.out_weights, self.out_type_codes)
+        in_arrays = induced(self.in_indptr, self.in_indices, self.in_weights, self.in_type_codes)
+
+        return CSRGraph([self.nodes[i] for i in node_ids.tolist()], *out_arrays, *in_arrays,
+                        self.relationship_types, self.follower_count[node_ids],
+                        self.engagement_score[node_ids], self.node_type_codes[node_ids], self.node_types,
+                        self.niche_codes[node_ids], self.niches)
+
+    @staticmethod
+    def _gather(indptr: np.ndarray, indices: np.ndarray, rows: np.ndarray) -> np.ndarray:
+        """Concatenate indices[indptr[r]:indptr[r + 1]] for every r in rows, without a Python loop"""
+        starts = indptr[rows]
+        lengths = indptr[rows + 1] - starts
+        total = int(lengths.sum())
+        if total == 0:
+            return indices[:0]
+        # Position of each output slot relative to its row start
+        offsets = np.arange(total) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        return indices[np.repeat(starts, lengths) + offsets]
@@ -1,80 +1,291 @@
 import pandas as pd
+import numpy as np
 import json
 import networkx as nx
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Tuple, Iterable, Set
+from utils.json_stream import JsonStreamReader
+from utils.graph_stats import GraphStats
+from utils.change_log import GraphChangeLog
+from utils.ontology import OntologyValidator
+from utils.csr_graph import CSRGraph
+
+# Columnar formats are optional; without pyarrow only CSV and JSON uploads are accepted
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.ipc as ipc
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+PYARROW_AVAILABLE = pa is not None
+
+# Explicit column types for edge CSVs; other columns are not read
+CSV_COLUMN_DTYPES = {
+    'source_entity': str,
+    'target_entity': str,
+    'relationship_type': str,
+    'weight': np.float64,
+    'source_followers': np.float64,
+    'target_followers': np.float64,
+    'source_engagement': np.float64,
+    'target_engagement': np.float64
+}
+
+# Rows per chunk when streaming CSV files
+CSV_CHUNK_SIZE = 100000
+
+# Records per batch when streaming JSON and JSON Lines files
+JSON_BATCH_SIZE = 50000
 
 class DataProcessor:
     """Utility class for processing uploaded data files"""
     
-    def __init__(self):
-        pass
+    def __init__(self, graph_stats: GraphStats = None, validator: OntologyValidator = None,
+                 change_log: GraphChangeLog = None):
+        self.graph_stats = graph_stats
+        self.validator = validator
+        self.change_log = change_log
     
-    def process_csv(self, filepath: str, graph: nx.DiGraph) -> Dict[str, int]:
+    def process_csv(self, filepath: str, graph: nx.DiGraph, chunksize: int = CSV_CHUNK_SIZE) -> Dict[str, int]:
         """
         Process CSV file and add data to graph
         
         Expected CSV format:
         - source_entity, target_entity, relationship_type, weight, follower_count, engagement_score
         
+        The file is streamed in chunks of ``chunksize`` rows, each applied to
+        the graph as it is read, so memory use does not grow with file size.
+        
         Args:
             filepath: Path to CSV file
             graph: NetworkX graph to update
+            chunksize: Number of rows read per chunk
             
         Returns:
             Dictionary with counts of nodes and edges added
         """
         try:
-            df = pd.read_csv(filepath)
             nodes_added = 0
             edges_added = 0
-            
-            # Process each row
-            for _, row in df.iterrows():
-                source = str(row.get('source_entity', ''))
-                target = str(row.get('target_entity', ''))
-                relationship_type = str(row.get('relationship_type', 'unknown'))
-                weight = float(row.get('weight', 1.0))
-                
-                # Add source node if not exists
-                if source and source not in graph:
-                    graph.add_node(source,
-                                 follower_count=int(row.get('source_followers', 0)),
-                                 engagement_score=float(row.get('source_engagement', 0.0)),
-                                 node_type='user')
-                    nodes_added += 1
-                
-                # Add target node if not exists
-                if target and target not in graph:
-                    graph.add_node(target,
-                                 follower_count=int(row.get('target_followers', 0)),
-                                 engagement_score=float(row.get('target_engagement', 0.0)),
-                                 node_type='user')
-                    nodes_added += 1
-                
-                # Add edge if both nodes exist
-                if source and target:
-                    # For "follows" relationships, reverse the edge direction to represent influence flow
-                    # If A follows B, then B influences A, so edge should be B -> A
-                    if relationship_type == 'follows':
-                        graph.add_edge(target, source,
-                                     relationship_type=relationship_type,
-                                     weight=weight)
-                    else:
-                        # For other relationships, keep original direction
-                        graph.add_edge(source, target,
-                                     relationship_type=relationship_type,
-                                     weight=weight)
-                    edges_added += 1
+            edges_rejected = 0
+            total_rows = 0
+            
+            with pd.read_csv(filepath, dtype=CSV_COLUMN_DTYPES, usecols=lambda column: column in CSV_COLUMN_DTYPES,
+                             chunksize=chunksize) as reader:
+                for chunk in reader:
+                    chunk_nodes, chunk_edges, chunk_rejected = self._add_edge_frame(chunk, graph)
+                    nodes_added += chunk_nodes
+                    edges_added += chunk_edges
+                    edges_rejected += chunk_rejected
+                    total_rows += len(chunk)
             
             return {
                 'nodes_added': nodes_added,
                 'edges_added': edges_added,
-                'total_rows_processed': len(df)
+                'edges_rejected': edges_rejected,
+                'total_rows_processed': total_rows
             }
             
         except Exception as e:
             raise Exception(f"Error processing CSV file: {str(e)}")
     
+    def process_parquet(self, filepath: str, graph: nx.DiGraph, batch_size: int = CSV_CHUNK_SIZE) -> Dict[str, int]:
+        """
+        Process a Parquet file of edge rows and add data to graph
+        
+        Columns follow the CSV format. Only those columns are read, row group
+        by row group, and each batch goes from Arrow columns straight into
+        the bulk edge insert.
+        
+        Args:
+            filepath: Path to Parquet file
+            graph: NetworkX graph to update
+            batch_size: Maximum number of rows per batch
+            
+        Returns:
+            Dictionary with counts of nodes and edges added
+        """
+        try:
+            self._require_pyarrow()
+            parquet_file = pq.ParquetFile(filepath)
+            columns = [name for name in parquet_file.schema_arrow.names if name in CSV_COLUMN_DTYPES]
+            return self._add_arrow_batches(parquet_file.iter_batches(batch_size=batch_size, columns=columns), graph)
+            
+        except Exception as e:
+            raise Exception(f"Error processing Parquet file: {str(e)}")
+    
+    def process_arrow(self, filepath: str, graph: nx.DiGraph) -> Dict[str, int]:
+        """
+        Process an Arrow IPC file or stream of edge rows and add data to graph
+        
+        Columns follow the CSV format. The file is memory-mapped and applied
+        one record batch at a time; columns outside the CSV format are never
+        touched, so their pages are not read.
+        
+        Args:
+            filepath: Path to Arrow IPC file (.arrow, .feather) or stream (.arrows)
+            graph: NetworkX graph to update
+            
+        Returns:
+            Dictionary with counts of nodes and edges added
+        """
+        try:
+            self._require_pyarrow()
+            with pa.memory_map(filepath) as source:
+                try:
+                    reader = ipc.open_file(source)
+                    batches = (reader.get_batch(i) for i in range(reader.num_record_batches))
+                except pa.ArrowInvalid:
+                    source.seek(0)
+                    batches = ipc.open_stream(source)
+                return self._add_arrow_batches(batches, graph)
+            
+        except Exception as e:
+            raise Exception(f"Error processing Arrow file: {str(e)}")
+    
+    def _add_arrow_batches(self, batches: Iterable[Any], graph: nx.DiGraph) -> Dict[str, int]:
+        """Apply Arrow record batches of edge rows to the graph, one batch at a time"""
+        nodes_added = 0
+        edges_added = 0
+        edges_rejected = 0
+        total_rows = 0
+        for batch in batches:
+            batch_nodes, batch_edges, batch_rejected = self._add_edge_frame(self._arrow_frame(batch), graph)
+            nodes_added += batch_nodes
+            edges_added += batch_edges
+            edges_rejected += batch_rejected
+            total_rows += batch.num_rows
+        return {
+            'nodes_added': nodes_added,
+            'edges_added': edges_added,
+            'edges_rejected': edges_rejected,
+            'total_rows_processed': total_rows
+        }
+    
+    def _arrow_frame(self, batch: Any) -> pd.DataFrame:
+        """Convert the CSV-format columns of a record batch, typed as read_csv would type them"""
+        columns = {}
+        for name in batch.schema.names:
+            if name not in CSV_COLUMN_DTYPES:
+                continue
+            column = batch.column(name)
+            if CSV_COLUMN_DTYPES[name] is str:
+                # Missing cells become 'nan', as they do for CSV uploads
+                columns[name] = pc.fill_null(column.cast(pa.string()), 'nan').to_numpy(zero_copy_only=False)
+            else:
+                columns[name] = column.cast(pa.float64()).to_numpy(zero_copy_only=False)
+        return pd.DataFrame(columns, index=pd.RangeIndex(batch.num_rows))
+    
+    @staticmethod
+    def _require_pyarrow() -> None:
+        if pa is None:
+            raise ImportError("pyarrow is required for Parquet and Arrow files")
+    
+    def _add_edge_frame(self, df: pd.DataFrame, graph: nx.DiGraph) -> Tuple[int, int, int]:
+        """
+        Add a frame of edge rows to the graph in bulk
+        
+        Columns follow the CSV format; missing columns fall back to the same
+        defaults as a row-wise load. New nodes take their attributes from the
+        first row they appear in, and a later row for the same edge overwrites
+        its attributes. When a validator is configured, edges the ontology does
+        not allow are skipped; their endpoints are still added, as with
+        /api/add_relationship.
+        
+        Args:
+            df: DataFrame of edge rows
+            graph: NetworkX graph to update
+            
+        Returns:
+            Tuple of (nodes_added, edges_added, edges_rejected)
+        """
+        if len(df) == 0:
+            return 0, 0, 0
+        
+        sources = self._string_column(df, 'source_entity', '')
+        targets = self._string_column(df, 'target_entity', '')
+        relationship_types = self._string_column(df, 'relationship_type', 'unknown')
+        weights = self._float_column(df, 'weight', 1.0)
+        
+        # Interleave source/target per row so first-seen order matches the row order
+        candidates = pd.DataFrame({
+            'node': np.column_stack((sources, targets)).ravel(),
+            'follower_count': np.column_stack((self._float_column(df, 'source_followers', 0),
+                                               self._float_column(df, 'target_followers', 0))).ravel(),
+            'engagement_score': np.column_stack((self._float_column(df, 'source_engagement', 0.0),
+                                                 self._float_column(df, 'target_engagement', 0.0))).ravel()
+        })
+        candidates = candidates[candidates['node'] != ''].drop_duplicates('node', keep='first')
+        new_nodes = candidates[[node not in graph for node in candidates['node']]]
+        
+        graph.add_nodes_from(
+            (node, {'follower_count': follower_count, 'engagement_score': engagement_score, 'node_type': 'user'})
+            for node, follower_count, engagement_score in zip(new_nodes['node'].tolist(),
+                                                              new_nodes['follower_count'].astype('int64').tolist(),
+                                                              new_nodes['engagement_score'].tolist())
+        )
+        
+        # For "follows" relationships, reverse the edge direction to represent influence flow
+        # If A follows B, then B influences A, so edge should be B -> A
+        has_edge = (sources != '') & (targets != '')
+        edges_rejected = 0
+        if self.validator is not None:
+            valid = self._ontology_mask(graph, sources[has_edge], relationship_types[has_edge], targets[has_edge])
+            edges_rejected = int(np.count_nonzero(~valid))
+            has_edge[np.flatnonzero(has_edge)[~valid]] = False
+        
+        follows = relationship_types == 'follows'
+        edge_sources = np.where(follows, targets, sources)[has_edge].tolist()
+        edge_targets = np.where(follows, sources, targets)[has_edge].tolist()
+        edge_types = relationship_types[has_edge].tolist()
+        
+        if self.graph_stats is not None and self.graph_stats.tracks(graph):
+            self.graph_stats.node_added(len(new_nodes))
+            self._record_edge_stats(graph, edge_sources, edge_targets, edge_types)
+        
+        graph.add_edges_from(
+            (source, target, {'relationship_type': relationship_type, 'weight': weight})
+            for source, target, relationship_type, weight in zip(edge_sources, edge_targets, edge_types,
+                                                                 weights[has_edge].tolist())
+        )
+        if self.change_log is not None:
+            self.change_log.record(new_nodes['node'].tolist(), zip(edge_sources, edge_targets))
+        
+        return len(new_nodes), int(has_edge.sum()), edges_rejected
+    
+    def _ontology_mask(self, graph: nx.DiGraph, sources: np.ndarray, relationship_types: np.ndarray,
+                       targets: np.ndarray) -> np.ndarray:
+        """Validate edge rows against the ontology; all endpoints must already be in the graph"""
+        endpoints = pd.unique(np.concatenate((sources, targets)))
+        node_types = {node: graph.nodes[node].get('node_type', 'user') for node in endpoints}
+        return self.validator.valid_mask(pd.Series(sources, dtype=object).map(node_types).to_numpy(),
+                                         relationship_types,
+                                         pd.Series(targets, dtype=object).map(node_types).to_numpy())
+    
+    def _record_edge_stats(self, graph: nx.DiGraph, sources: List[str], targets: List[str],
+                           relationship_types: List[str]) -> None:
+        """Report a batch of edges to the graph statistics before it is inserted"""
+        # The last row for an edge determines its final relationship type
+        final_types = dict(zip(zip(sources, targets), relationship_types))
+        for (source, target), relationship_type in final_types.items():
+            existing = graph.succ[source].get(target) if source in graph else None
+            replaced_type = existing.get('relationship_type', 'unknown') if existing is not None else None
+            self.graph_stats.edge_added(relationship_type, replaced_type)
+    
+    def _string_column(self, df: pd.DataFrame, column: str, default: str) -> np.ndarray:
+        """Get a column as an object array of strings, or the default if it is absent"""
+        if column not in df.columns:
+            return np.full(len(df), default, dtype=object)
+        # Missing cells become 'nan', as str() of a missing value did in the row-wise loader
+        return df[column].astype(str).to_numpy(dtype=object, na_value='nan')
+    
+    def _float_column(self, df: pd.DataFrame, column: str, default: float) -> np.ndarray:
+        """Get a column as a float64 array, or the default if it is absent"""
+        if column not in df.columns:
+            return np.full(len(df), default, dtype=np.float64)
+        return df[column].to_numpy(dtype=np.float64)
+    
     def process_json(self, filepath: str, graph: nx.DiGraph) -> Dict[str, int]:
         """
         Process JSON file and add data to graph
@@ -85,7 +296,8 @@ class DataProcessor:
                 {
                     "id": "user1",
                     "follower_count": 1000,
-                    "engagement_score": 0.5
+                    "engagement_score": 0.5,
+                    "niche": "tech"
                 }
             ],
             "edges": [
@@ -98,6 +310,11 @@ class DataProcessor:
             ]
         }
         
+        Nodes may give their type as "node_type" or "type" and edges their
+        relationship as "relationship_type" or "relation". The document is
+        parsed incrementally and applied in batches, so the nodes and edges
+        arrays are never held in memory as a whole.
+        
         Args:
             filepath: Path to JSON file
             graph: NetworkX graph to update
@@ -107,61 +324,159 @@ class DataProcessor:
         """
         try:
             with open(filepath, 'r') as f:
-                data = json.load(f)
-            
-            nodes_added = 0
-            edges_added = 0
+                records = (('node' if key == 'nodes' else 'edge', record)
+                           for key, record in JsonStreamReader(f).iter_array_items(('nodes', 'edges')))
+                return self._add_record_stream(records, graph)
             
-            # Process nodes
-            if 'nodes' in data:
-                for node_data in data['nodes']:
-                    node_id = str(node_data.get('id', ''))
-                    if node_id and node_id not in graph:
-                        graph.add_node(node_id,
-                                     follower_count=int(node_data.get('follower_count', 0)),
-                                     engagement_score=float(node_data.get('engagement_score', 0.0)),
-                                     node_type=node_data.get('node_type', 'user'))
-                        nodes_added += 1
-            
-            # Process edges
-            if 'edges' in data:
-                for edge_data in data['edges']:
-                    source = str(edge_data.get('source', ''))
-                    target = str(edge_data.get('target', ''))
-                    relationship_type = str(edge_data.get('relationship_type', 'unknown'))
-                    weight = float(edge_data.get('weight', 1.0))
-                    
-                    if source and target:
-                        # Ensure both nodes exist
-                        if source not in graph:
-                            graph.add_node(source, follower_count=0, engagement_score=0.0, node_type='user')
-                            nodes_added += 1
-                        if target not in graph:
-                            graph.add_node(target, follower_count=0, engagement_score=0.0, node_type='user')
-                            nodes_added += 1
-                        
-                        # For "follows" relationships, reverse the edge direction to represent influence flow
-                        # If A follows B, then B influences A, so edge should be B -> A
-                        if relationship_type == 'follows':
-                            graph.add_edge(target, source,
-                                         relationship_type=relationship_type,
-                                         weight=weight)
-                        else:
-                            # For other relationships, keep original direction
-                            graph.add_edge(source, target,
-                                         relationship_type=relationship_type,
-                                         weight=weight)
-                        edges_added += 1
+        except Exception as e:
+            raise Exception(f"Error processing JSON file: {str(e)}")
+    
+    def process_json_lines(self, filepath: str, graph: nx.DiGraph) -> Dict[str, int]:
+        """
+        Process a JSON Lines file and add data to graph
+        
+        Each line holds one record in the same shape as the items of the JSON
+        format: records with a "source" or "target" are edges, all others are
+        nodes. Lines are applied to the graph in batches as they are read.
+        
+        Args:
+            filepath: Path to JSON Lines file
+            graph: NetworkX graph to update
             
-            return {
-                'nodes_added': nodes_added,
-                'edges_added': edges_added,
-                'total_nodes_in_file': len(data.get('nodes', [])),
-                'total_edges_in_file': len(data.get('edges', []))
-            }
+        Returns:
+            Dictionary with counts of nodes and edges added
+        """
+        try:
+            with open(filepath, 'r') as f:
+                records = (('edge' if 'source' in record or 'target' in record else 'node', record)
+                           for record in (json.loads(line) for line in f if line.strip()))
+                return self._add_record_stream(records, graph)
             
         except Exception as e:
-            raise Exception(f"Error processing JSON file: {str(e)}")
+            raise Exception(f"Error processing JSON Lines file: {str(e)}")
+    
+    def _add_record_stream(self, records: Iterable[Tuple[str, Dict[str, Any]]], graph: nx.DiGraph,
+                           batch_size: int = JSON_BATCH_SIZE) -> Dict[str, int]:
+        """
+        Apply a stream of ('node' | 'edge', record) pairs to the graph in batches
+        
+        Node records are applied before the edges that follow them. When edges
+        arrive before a node's own record, the node is created with default
+        attributes and the record later fills them in, matching a load that
+        processes all nodes first.
+        
+        Args:
+            records: Iterable of (kind, record) pairs
+            graph: NetworkX graph to update
+            batch_size: Number of records applied per batch
+            
+        Returns:
+            Dictionary with counts of nodes and edges added
+        """
+        nodes_added = 0
+        edges_added = 0
+        edges_rejected = 0
+        total_nodes = 0
+        total_edges = 0
+        
+        # Nodes created by edges before their own record was read; only
+        # tracked while node records may still follow
+        placeholders = set()
+        nodes_seen = False
+        
+        batch = []
+        batch_kind = None
+        
+        def flush():
+            nonlocal nodes_added, edges_added, edges_rejected
+            if batch_kind == 'node':
+                nodes_added += self._add_node_records(batch, graph, placeholders)
+            elif batch_kind == 'edge':
+                batch_nodes, batch_edges, batch_rejected = self._add_edge_records(
+                    batch, graph, None if nodes_seen else placeholders)
+                nodes_added += batch_nodes
+                edges_added += batch_edges
+                edges_rejected += batch_rejected
+            batch.clear()
+        
+        for kind, record in records:
+            if kind != batch_kind or len(batch) >= batch_size:
+                flush()
+                batch_kind = kind
+            
+            if kind == 'node':
+                nodes_seen = True
+                total_nodes += 1
+            else:
+                total_edges += 1
+            batch.append(record)
+        flush()
+        
+        return {
+            'nodes_added': nodes_added,
+            'edges_added': edges_added,
+            'edges_rejected': edges_rejected,
+            'total_nodes_in_file': total_nodes,
+            'total_edges_in_file': total_edges
+        }
+    
+    def _add_node_records(self, records: List[Dict[str, Any]], graph: nx.DiGraph, placeholders: Set[str]) -> int:
+        """Add a batch of JSON node records; the first record for a node wins"""
+        new_nodes = {}
+        filled_placeholders = []
+        
+        for node_data in records:
+            node_id = str(node_data.get('id', ''))
+            if not node_id or node_id in new_nodes:
+                continue
+            if node_id in placeholders:
+                placeholders.discard(node_id)
+            elif node_id in graph:
+                continue
+            
+            attributes = {
+                'follower_count': int(node_data.get('follower_count', 0)),
+                'engagement_score': float(node_data.get('engagement_score', 0.0)),
+                # "type" is accepted as an alias, with ontology class names such as "Post" lowercased
+                'node_type': str(node_data.get('node_type', node_data.get('type', 'user'))).lower()
+            }
+            if node_data.get('niche') is not None:
+                attributes['niche'] = str(node_data['niche'])
+            if node_id in graph:
+                # Placeholder created by an earlier edge, already counted
+                graph.nodes[node_id].update(attributes)
+                filled_placeholders.append(node_id)
+            else:
+                new_nodes[node_id] = attributes
+        
+        graph.add_nodes_from(new_nodes.items())
+        if self.graph_stats is not None and self.graph_stats.tracks(graph):
+            self.graph_stats.node_added(len(new_nodes))
+        if self.change_log is not None:
+            self.change_log.record(filled_placeholders + list(new_nodes))
+        return len(new_nodes)
+    
+    def _add_edge_records(self, records: List[Dict[str, Any]], graph: nx.DiGraph,
+                          placeholders: Set[str] = None) -> Tuple[int, int, int]:
+        """Add a batch of JSON edge records through the bulk edge path"""
+        sources = [str(edge_data.get('source', '')) for edge_data in records]
+        targets = [str(edge_data.get('target', '')) for edge_data in records]
+        
+        # Records missing either endpoint add neither nodes nor an edge
+        complete = [i for i, (source, target) in enumerate(zip(sources, targets)) if source and target]
+        df = pd.DataFrame({
+            'source_entity': [sources[i] for i in complete],
+            'target_entity': [targets[i] for i in complete],
+            'relationship_type': [str(records[i].get('relationship_type', records[i].get('relation', 'unknown')))
+                                  for i in complete],
+            'weight': [float(records[i].get('weight', 1.0)) for i in complete]
+        })
+        
+        if placeholders is not None:
+            placeholders.update(node for node in set(df['source_entity']) | set(df['target_entity'])
+                                if node not in graph)
+        
+        return self._add_edge_frame(df, graph)
     
     def validate_csv_format(self, filepath: str) -> Dict[str, Any]:
         """
@@ -328,4 +643,46 @@ class DataProcessor:
             
         except Exception as e:
             print(f"Error exporting to JSON: {e}")
-            return False 
\ No newline at end of file
+            return False 
+    
+    def export_graph_to_parquet(self, graph: nx.DiGraph, filepath: str) -> bool:
+        """
+        Export graph edges to Parquet in the CSV column format
+        
+        Columns are built from the graph's CSR arrays rather than row by row.
+        "follows" edges are written in the follower -> followed direction they
+        were uploaded in, so the file can be uploaded again as is.
+        
+        Args:
+            graph: NetworkX graph to export
+            filepath: Output file path
+            
+        Returns:
+            True if successful, False otherwise
+        """
+        try:
+            self._require_pyarrow()
+            csr = CSRGraph.from_networkx(graph)
+            nodes = np.array(csr.nodes, dtype=object)
+            edge_sources, edge_targets = csr.edge_arrays()
+            relationship_types = np.array(csr.relationship_types, dtype=object)[csr.out_type_codes]
+            follows = relationship_types == 'follows'
+            sources = np.where(follows, edge_targets, edge_sources)
+            targets = np.where(follows, edge_sources, edge_targets)
+            
+            table = pa.table({
+                'source_entity': pa.array(nodes[sources], type=pa.string()),
+                'target_entity': pa.array(nodes[targets], type=pa.string()),
+                'relationship_type': pa.array(relationship_types, type=pa.string()),
+                'weight': csr.out_weights,
+                'source_followers': csr.follower_count[sources],
+                'source_engagement': csr.engagement_score[sources],
+                'target_followers': csr.follower_count[targets],
+                'target_engagement': csr.engagement_score[targets]
+            })
+            pq.write_table(table, filepath, row_group_size=CSV_CHUNK_SIZE)
+            return True
+            
+        except Exception as e:
+            print(f"Error exporting to Parquet: {e}")
+            return False
@@ -0,0 +1,286 @@
+import os
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor
+from multiprocessing import shared_memory
+from statistics import NormalDist
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from utils.csr_graph import CSRGraph, MULTI_BFS_WIDTH
+from utils.parallel_centrality import CHUNKS_PER_WORKER, ArrayLayout, _share_arrays
+
+# Independent Cascade and Linear Threshold
+SPREAD_MODELS = ('ic', 'lt')
+
+# Monte Carlo runs per simulation unless the caller asks for more or fewer
+DEFAULT_RUNS = 1000
+
+# Fixed seed so repeated simulations on the same graph return the same estimate
+SIMULATION_SEED = 42
+
+# Independent Cascade activation probability of an edge with weight 1
+DEFAULT_ACTIVATION_PROBABILITY = 0.1
+
+# Below this many runs x edges the cost of starting tasks outweighs the parallel speedup
+PARALLEL_MIN_WORK = 10_000_000
+
+# Salts that keep the edge draws of one model independent of the node draws of the other
+_IC_SALT = np.uint64(0x9E3779B97F4A7C15)
+_LT_SALT = np.uint64(0xD1B54A32D192ED03)
+
+
+def _uniform(seed: int, salt: np.uint64, runs: np.ndarray, keys: np.ndarray) -> np.ndarray:
+    """
+    Counter-based uniform draws in [0, 1), one per (run, key) pair
+
+    A splitmix64 hash of seed, run and key, so a draw does not depend on
+    which process computes it or in what order.
+    """
+    with np.errstate(over='ignore'):
+        x = (np.uint64(seed & 0xFFFFFFFFFFFFFFFF) * np.uint64(0xBF58476D1CE4E5B9) + salt
+             + runs.astype(np.uint64) * np.uint64(0x94D049BB133111EB) + keys.astype(np.uint64))
+        x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        x = x ^ (x >> np.uint64(31))
+    return (x >> np.uint64(11)).astype(np.float64) * (1.0 / (1 << 53))
+
+
+def activation_probabilities(weights: np.ndarray, probability: float = DEFAULT_ACTIVATION_PROBABILITY) -> np.ndarray:
+    """
+    Independent Cascade probability per edge from its weight
+
+    An edge of weight w fires with 1 - (1 - probability) ** w, as if it were
+    w independent attempts at the base probability: weight 1 gives
+    ``probability``, heavier edges approach 1 and weight 0 never fires.
+    """
+    return 1.0 - np.power(1.0 - probability, np.maximum(weights, 0.0))
+
+
+def threshold_intervals(csr: CSRGraph) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Linear Threshold live-edge intervals per out-edge
+
+    Each node's incoming weights are normalized to sum to 1 and laid end to
+    end on [0, 1). In a run the node keeps the in-edge whose interval holds
+    its draw, which activates it exactly when Linear Threshold with a uniform
+    random threshold would (Kempe, Kleinberg and Tardos).
+
+    Returns:
+        Tuple of (interval start, interval end) aligned with the CSR out-edges
+    """
+    weights = np.maximum(csr.out_weights, 0.0)
+    targets = csr.out_indices
+    order = np.argsort(targets, kind='stable')
+    sorted_weights = weights[order]
+    strength = np.bincount(targets, weights=weights, minlength=csr.number_of_nodes())
+
+    # Running weight before each edge within its target's group
+    running = np.cumsum(sorted_weights) - sorted_weights
+    group_starts = np.searchsorted(targets[order], targets[order], side='left')
+    before = running - running[group_starts]
+
+    totals = strength[targets[order]]
+    scale = np.divide(1.0, totals, out=np.zeros_like(totals), where=totals > 0)
+    low = np.empty(len(weights))
+    high = np.empty(len(weights))
+    low[order] = before * scale
+    high[order] = (before + sorted_weights) * scale
+    return low, high
+
+
+def _cascade(indptr: np.ndarray, indices: np.ndarray, low: np.ndarray, high: Optional[np.ndarray],
+             seeds: np.ndarray, runs: Sequence[int], seed: int, max_steps: Optional[int]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Run cascades from the same seed nodes, up to MULTI_BFS_WIDTH runs in lockstep
+
+    Like CSRGraph.multi_source_bfs, the runs share a uint64 visited mask and
+    each step expands the newly active (run, node) pairs of all runs as one
+    set of arrays. An edge is live in a run when its Independent Cascade draw is below
+    ``low`` (``high`` is None), or when the Linear Threshold draw of its
+    target falls in [low, high).
+
+    Returns:
+        Tuple of (activated count per run, new activations per step summed over runs)
+    """
+    num_nodes = len(indptr) - 1
+    counts = np.zeros(len(runs), dtype=np.int64)
+    by_step: List[int] = []
+    for start in range(0, len(runs), MULTI_BFS_WIDTH):
+        group = np.asarray(runs[start:start + MULTI_BFS_WIDTH], dtype=np.int64)
+        width = len(group)
+        bits = np.left_shift(np.uint64(1), np.arange(width, dtype=np.uint64))
+        visited = np.zeros(num_nodes, dtype=np.uint64)
+        visited[seeds] = np.bitwise_or.reduce(bits)
+        group_counts = np.full(width, len(seeds), dtype=np.int64)
+
+        # Newly active (run, node) pairs
+        frontier_run = np.repeat(np.arange(width), len(seeds))
+        frontier = np.tile(seeds, width)
+        step = 0
+        while len(frontier) and (max_steps is None or step < max_steps):
+            pair_lengths = indptr[frontier + 1] - indptr[frontier]
+            total = int(pair_lengths.sum())
+            if total == 0:
+                break
+            offsets = np.arange(total) - np.repeat(np.cumsum(pair_lengths) - pair_lengths, pair_lengths)
+            edges = np.repeat(indptr[frontier], pair_lengths) + offsets
+            run = np.repeat(frontier_run, pair_lengths)
+            targets = indices[edges]
+
+            unseen = (visited[targets] & bits[run]) == 0
+            run, edges, targets = run[unseen], edges[unseen], targets[unseen]
+            if high is None:
+                live = _uniform(seed, _IC_SALT, group[run], edges) < low[edges]
+            else:
+                draw = _uniform(seed, _LT_SALT, group[run], targets)
+                live = (low[edges] <= draw) & (draw < high[edges])
+            run, targets = run[live], targets[live]
+
+            _, first = np.unique(run * num_nodes + targets, return_index=True)
+            run, targets = run[first], targets[first]
+            np.bitwise_or.at(visited, targets, bits[run])
+            group_counts += np.bincount(run, minlength=width)
+
+            step += 1
+            if len(by_step) < step:
+                by_step.append(0)
+            by_step[step - 1] += len(targets)
+            frontier_run, frontier = run, targets
+        counts[start:start + width] = group_counts
+    return counts, np.array(by_step, dtype=np.int64)
+
+
+def _cascade_task(block_name: str, layout: ArrayLayout, lt: bool, seeds: List[int], runs: List[int],
+                  seed: int, max_steps: Optional[int]) -> Tuple[np.ndarray, np.ndarray]:
+    block = shared_memory.SharedMemory(name=block_name)
+    try:
+        arrays = [np.ndarray(length, dtype=dtype, buffer=block.buf, offset=start) for dtype, length, start in layout]
+        result = _cascade(arrays[0], arrays[1], arrays[2], arrays[3] if lt else None,
+                          np.asarray(seeds, dtype=np.int64), runs, seed, max_steps)
+        # No views may outlive the block
+        del arrays
+        return result
+    finally:
+        block.close()
+
+
+class SpreadSimulator:
+    """Monte Carlo influence spread under Independent Cascade or Linear Threshold
+
+    Spread follows the direction edges are stored in, which is already the
+    direction influence flows: "follows" edges are reversed on ingestion, so a
+    followed account reaches its followers. Both models are simulated as
+    reachability over randomly live edges, with many runs advanced together
+    as NumPy frontier arrays. Every random draw is a hash of the seed, the
+    run number and the edge or node, so an estimate is reproducible and does
+    not depend on how runs are split across worker processes. Large
+    simulations are spread over a ProcessPoolExecutor, with the graph handed
+    to workers once through shared memory as CentralityEngine does.
+    """
+
+    def __init__(self, max_workers: int = None, min_work: int = PARALLEL_MIN_WORK):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.min_work = min_work
+        self.total_runs = 0
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> Executor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            return self._executor
+
+    def simulate(self, csr: CSRGraph, seed_ids: Sequence[int], model: str = 'ic', runs: int = DEFAULT_RUNS,
+                 seed: int = SIMULATION_SEED, max_steps: int = None,
+                 probability: float = DEFAULT_ACTIVATION_PROBABILITY, confidence: float = 0.95) -> Dict[str, Any]:
+        """
+        Estimate the expected number of nodes a seed set activates
+
+        Args:
+            csr: Graph in CSR form
+            seed_ids: Node ids active at step 0
+            model: 'ic' for Independent Cascade, 'lt' for Linear Threshold
+            runs: Number of Monte Carlo runs
+            seed: Random seed; the same seed gives the same estimate
+            max_steps: Optional limit on propagation steps
+            probability: Independent Cascade activation probability of a weight 1 edge
+            confidence: Confidence level of the interval
+
+        Returns:
+            Expected activated count (seeds included), its standard deviation,
+            standard error and normal-approximation confidence interval, and
+            the expected cumulative count after each step
+        """
+        if model not in SPREAD_MODELS:
+            raise ValueError(f"model must be one of {', '.join(SPREAD_MODELS)}")
+        if runs < 1:
+            raise ValueError('runs must be positive')
+        if not 0 <= probability <= 1 or not 0 < confidence < 1:
+            raise ValueError('probability must be in [0, 1] and confidence in (0, 1)')
+        if max_steps is not None and max_steps < 0:
+            raise ValueError('max_steps must not be negative')
+
+        seeds = np.unique(np.asarray(seed_ids, dtype=np.int64))
+        lt = model == 'lt'
+        if lt:
+            low, high = threshold_intervals(csr)
+        else:
+            low, high = activation_probabilities(csr.out_weights, probability), None
+
+        if self.max_workers > 1 and runs > MULTI_BFS_WIDTH and runs * csr.number_of_edges() >= self.min_work:
+            # Chunks of whole lockstep groups, interleaved so every worker gets a similar share
+            groups = [list(range(start, min(start + MULTI_BFS_WIDTH, runs))) for start in range(0, runs, MULTI_BFS_WIDTH)]
+            num_chunks = min(len(groups), self.max_workers * CHUNKS_PER_WORKER)
+            chunks = [[run for group in groups[i::num_chunks] for run in group] for i in range(num_chunks)]
+            block, layout = _share_arrays((csr.out_indptr, csr.out_indices, low) + ((high,) if lt else ()))
+            try:
+                executor = self._get_executor()
+                futures = [executor.submit(_cascade_task, block.name, layout, lt, seeds.tolist(), chunk, seed, max_steps)
+                           for chunk in chunks]
+                partials = [future.result() for future in futures]
+            finally:
+                block.close()
+                block.unlink()
+            counts = np.concatenate([partial[0] for partial in partials])
+            by_step = np.zeros(max((len(partial[1]) for partial in partials), default=0), dtype=np.int64)
+            for _, steps in partials:
+                by_step[:len(steps)] += steps
+        else:
+            counts, by_step = _cascade(csr.out_indptr, csr.out_indices, low, high, seeds, list(range(runs)),
+                                       seed, max_steps)
+
+        with self._lock:
+            self.total_runs += runs
+
+        mean = float(counts.mean())
+        std = float(counts.std(ddof=1)) if runs > 1 else 0.0
+        stderr = std / float(np.sqrt(runs))
+        margin = NormalDist().inv_cdf((1 + confidence) / 2) * stderr
+        return {
+            'model': model,
+            'runs': runs,
+            'seed': seed,
+            'seed_count': len(seeds),
+            'expected_activated': mean,
+            'std': std,
+            'stderr': stderr,
+            'confidence': confidence,
+            'confidence_interval': [max(mean - margin, float(len(seeds))), mean + margin],
+            'min_activated': int(counts.min()),
+            'max_activated': int(counts.max()),
+            'expected_by_step': (len(seeds) + np.cumsum(by_step) / runs).tolist()
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        """Worker count and runs simulated so far"""
+        with self._lock:
+            return {'max_workers': self.max_workers, 'total_runs': self.total_runs}
+
+    def shutdown(self) -> None:
+        """Stop the worker processes"""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
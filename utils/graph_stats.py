@@ -0,0 +1,111 @@
+import threading
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+import networkx as nx
+
+
+class GraphStats:
+    """Running node, edge and degree counters for the influence graph
+
+    Mutating code paths report each change so that counts, density and
+    average degrees are served without walking the graph. Like MetricCache,
+    the counters describe one tracked graph object, plus any aliases (frozen
+    snapshots) registered since the last mutation.
+    """
+
+    def __init__(self, graph: nx.DiGraph = None):
+        self.graph = graph
+        self._aliases: List[nx.DiGraph] = []
+        self._lock = threading.Lock()
+        self.reset()
+        if graph is not None:
+            self.rebuild(graph)
+
+    def tracks(self, graph: nx.DiGraph) -> bool:
+        """Check whether these counters describe the given graph object"""
+        if graph is None:
+            return False
+        return graph is self.graph or any(graph is alias for alias in self._aliases)
+
+    def alias(self, graph: nx.DiGraph) -> None:
+        """Register an unchanged copy of the tracked graph until the next mutation"""
+        with self._lock:
+            self._aliases = [graph]
+
+    def metrics_for(self, graph: nx.DiGraph) -> Optional[Dict[str, Any]]:
+        """Basic metrics if the counters describe this graph, otherwise None"""
+        with self._lock:
+            if not self.tracks(graph):
+                return None
+            return self._basic_metrics()
+
+    def reset(self) -> None:
+        """Zero all counters, e.g. after the graph was cleared"""
+        with self._lock:
+            self._aliases = []
+            self.num_nodes = 0
+            self.num_edges = 0
+            self.in_degree_sum = 0
+            self.out_degree_sum = 0
+            self.edge_type_counts: Counter = Counter()
+
+    def rebuild(self, graph: nx.DiGraph) -> None:
+        """Recount everything from the graph; O(N + E)"""
+        edge_type_counts = Counter(data.get('relationship_type', 'unknown') for _, _, data in graph.edges(data=True))
+        with self._lock:
+            self._aliases = []
+            self.num_nodes = graph.number_of_nodes()
+            self.num_edges = graph.number_of_edges()
+            self.in_degree_sum = self.num_edges
+            self.out_degree_sum = self.num_edges
+            self.edge_type_counts = edge_type_counts
+
+    def node_added(self, count: int = 1) -> None:
+        """Record new nodes"""
+        with self._lock:
+            self._aliases = []
+            self.num_nodes += count
+
+    def edge_added(self, relationship_type: str, replaced_type: Optional[str] = None) -> None:
+        """
+        Record an add_edge call
+
+        Args:
+            relationship_type: Relationship type of the edge after the call
+            replaced_type: Previous relationship type if the edge already existed
+        """
+        with self._lock:
+            self._aliases = []
+            if replaced_type is None:
+                self.num_edges += 1
+                self.in_degree_sum += 1
+                self.out_degree_sum += 1
+            else:
+                self.edge_type_counts[replaced_type] -= 1
+                if self.edge_type_counts[replaced_type] <= 0:
+                    del self.edge_type_counts[replaced_type]
+            self.edge_type_counts[relationship_type] += 1
+
+    def density(self) -> float:
+        """Directed density, as nx.density"""
+        if self.num_nodes <= 1:
+            return 0.0
+        return self.num_edges / (self.num_nodes * (self.num_nodes - 1))
+
+    def basic_metrics(self) -> Dict[str, Any]:
+        """Counts, density and average degrees in O(1)"""
+        with self._lock:
+            return self._basic_metrics()
+
+    def _basic_metrics(self) -> Dict[str, Any]:
+        num_nodes = self.num_nodes
+        return {
+            'num_nodes': num_nodes,
+            'num_edges': self.num_edges,
+            'density': self.density(),
+            'avg_degree': (self.in_degree_sum + self.out_degree_sum) / num_nodes if num_nodes else 0.0,
+            'avg_in_degree': self.in_degree_sum / num_nodes if num_nodes else 0.0,
+            'avg_out_degree': self.out_degree_sum / num_nodes if num_nodes else 0.0,
+            'edge_type_counts': dict(self.edge_type_counts)
+        }
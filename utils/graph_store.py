@@ -0,0 +1,297 @@
+import threading
+from concurrent.futures import Future
+from contextlib import contextmanager
+from itertools import islice
+from typing import Any, Callable, Dict, Hashable, Iterator, List, Optional, Tuple
+
+import networkx as nx
+
+from utils.change_log import GraphChangeLog
+from utils.csr_graph import CSRGraph
+from utils.graph_stats import GraphStats
+from utils.metric_cache import MetricCache
+
+
+class ReadWriteLock:
+    """Many concurrent readers or one writer; waiting writers block new readers"""
+
+    def __init__(self):
+        self._condition = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = False
+        self._writers_waiting = 0
+
+    @contextmanager
+    def read_locked(self) -> Iterator[None]:
+        with self._condition:
+            while self._writer or self._writers_waiting:
+                self._condition.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._readers -= 1
+                if self._readers == 0:
+                    self._condition.notify_all()
+
+    @contextmanager
+    def write_locked(self) -> Iterator[None]:
+        with self._condition:
+            self._writers_waiting += 1
+            while self._writer or self._readers:
+                self._condition.wait()
+            self._writers_waiting -= 1
+            self._writer = True
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._writer = False
+                self._condition.notify_all()
+
+
+class GraphStore:
+    """Thread-safe owner of the live influence graph
+
+    Mutations are submitted as callables through ``apply``. Pending
+    mutations are applied in batches under one exclusive lock acquisition
+    and each batch produces a new graph version. Readers never touch the live
+    graph directly: ``snapshot`` returns a frozen copy for the current
+    version, built once and shared until the next write, so long-running
+    analytics neither block ingestion nor see a graph that changes under
+    them.
+
+    When mutations are recorded in a change log, a new snapshot is built
+    copy-on-write from the previous one: only the attributes and adjacency
+    rows of the nodes the log reports are copied out of the live graph
+    under the read lock, every other row is shared, and the CSR view cached
+    for the previous snapshot is patched the same way. A full copy is made
+    only for the first snapshot and when the log cannot answer (the graph
+    was cleared, the log was trimmed, or a mutation failed part way).
+    """
+
+    def __init__(self, graph: nx.DiGraph = None, metric_cache: MetricCache = None, graph_stats: GraphStats = None,
+                 change_log: GraphChangeLog = None):
+        self.graph = graph if graph is not None else nx.DiGraph()
+        self.metric_cache = metric_cache
+        self.graph_stats = graph_stats
+        self.change_log = change_log
+        self.csr_patches = 0
+        self.full_copies = 0
+        self.incremental_snapshots = 0
+        self.version = 0
+        self.batches_committed = 0
+        self.mutations_applied = 0
+        self._lock = ReadWriteLock()
+        self._pending: List[Tuple[Callable[[nx.DiGraph], Any], Future]] = []
+        self._pending_lock = threading.Lock()
+        self._snapshot = None
+        self._snapshot_version = -1
+        self._snapshot_seq = None
+        # Set when a failed mutation may have changed the graph without recording it
+        self._unlogged_changes = False
+        self._snapshot_lock = threading.Lock()
+
+    def apply(self, mutation: Callable[[nx.DiGraph], Any]) -> Any:
+        """
+        Apply a mutation to the live graph
+
+        Args:
+            mutation: Callable receiving the live graph; its return value is
+                passed back to the caller and its exceptions are re-raised
+
+        Returns:
+            The mutation's return value
+        """
+        future = Future()
+        with self._pending_lock:
+            self._pending.append((mutation, future))
+
+        # Whoever gets the lock first applies every queued mutation in one batch
+        if not future.done():
+            with self._lock.write_locked():
+                self._apply_pending()
+        return future.result()
+
+    def _apply_pending(self) -> None:
+        with self._pending_lock:
+            batch, self._pending = self._pending, []
+        if not batch:
+            return
+
+        for mutation, future in batch:
+            try:
+                future.set_result(mutation(self.graph))
+            except Exception as e:
+                self._unlogged_changes = True
+                future.set_exception(e)
+
+        # A failed mutation may still have changed the graph, so always advance the version
+        self.version += 1
+        self.batches_committed += 1
+        self.mutations_applied += len(batch)
+
+    @contextmanager
+    def read(self) -> Iterator[nx.DiGraph]:
+        """Shared access to the live graph for short reads"""
+        with self._lock.read_locked():
+            yield self.graph
+
+    def snapshot(self) -> nx.DiGraph:
+        """
+        Frozen copy of the graph at the current version
+
+        Returns:
+            Read-only nx.DiGraph shared by all readers until the next write
+        """
+        snapshot, snapshot_version = self._snapshot, self._snapshot_version
+        if snapshot_version == self.version:
+            return snapshot
+
+        with self._snapshot_lock:
+            # Another reader may have built it while this one waited
+            if self._snapshot_version == self.version:
+                return self._snapshot
+            previous, previous_seq = self._snapshot, self._snapshot_seq
+            changes = None
+            with self._lock.read_locked():
+                version = self.version
+                seq = self.change_log.seq if self.change_log is not None else None
+                patchable, self._unlogged_changes = not self._unlogged_changes, False
+                if patchable and previous is not None and previous_seq is not None:
+                    changes = self.change_log.changes_since(previous_seq, seq)
+                rows = self._changed_rows(previous, *changes) if changes is not None else None
+                if rows is None:
+                    changes = None
+                    snapshot = nx.freeze(self.graph.copy())
+                    self.full_copies += 1
+                    if self.graph_stats is not None:
+                        self.graph_stats.alias(snapshot)
+
+            if rows is not None:
+                # Every row the writers did not touch is shared with the previous snapshot
+                snapshot = self._copy_on_write(previous, *rows)
+                self.incremental_snapshots += 1
+                with self._lock.read_locked():
+                    if self.graph_stats is not None and self.version == version:
+                        self.graph_stats.alias(snapshot)
+
+            if self.metric_cache is not None:
+                previous_csr = self.metric_cache.peek(previous, 'csr_graph') if previous is not None else None
+                self.metric_cache.bind(snapshot, version)
+                if previous_csr is not None and changes is not None:
+                    self._patch_csr(previous_csr, snapshot, changes)
+            self._snapshot, self._snapshot_version, self._snapshot_seq = snapshot, version, seq
+            return snapshot
+
+    def snapshot_with(self, capture: Callable[[], Any]) -> Tuple[nx.DiGraph, Any]:
+        """
+        Snapshot together with state read under the same read lock
+
+        Args:
+            capture: Callable reading state that must match the snapshot,
+                such as the store version or a log position
+
+        Returns:
+            Tuple of (snapshot, capture's result) where no write landed
+            between the two
+        """
+        while True:
+            snapshot = self.snapshot()
+            with self._lock.read_locked():
+                # Writers are excluded here, so a current snapshot still is when capture runs
+                if snapshot is self._snapshot and self._snapshot_version == self.version:
+                    return snapshot, capture()
+
+    def _changed_rows(self, previous: nx.DiGraph, nodes, links) -> Optional[Tuple]:
+        """
+        Copy what changed since the previous snapshot out of the live graph
+
+        Called under the read lock; reads only the touched nodes, so the
+        lock is held for time proportional to the change, not the graph.
+
+        Args:
+            previous: Snapshot the changes are relative to
+            nodes: Node ids added or changed since
+            links: (source, target) pairs added or changed since
+
+        Returns:
+            Tuple of (new nodes in graph order, node attributes, successor
+            rows, predecessor rows) for the touched nodes, or None if the
+            change cannot be applied incrementally (nodes were removed)
+        """
+        graph = self.graph
+        num_new = graph.number_of_nodes() - previous.number_of_nodes()
+        if num_new < 0:
+            return None
+        # Nodes are only appended between versions, so the new ones are the newest in graph order
+        new_nodes = list(islice(reversed(graph._node), num_new))[::-1]
+        if any(node in previous._node for node in new_nodes):
+            return None
+
+        touched = set(nodes)
+        for source, target in links:
+            touched.add(source)
+            touched.add(target)
+        touched.update(new_nodes)
+        if any(node not in graph._node for node in touched):
+            return None
+
+        # Unchanged edges keep the previous snapshot's data dicts; changed ones get one copy
+        # shared by the successor and predecessor rows, as in a regular DiGraph
+        changed = set(links)
+        edge_data = {}
+
+        def edge(source, target, data):
+            key = (source, target)
+            if key not in edge_data:
+                if key not in changed and source in previous._succ and target in previous._succ[source]:
+                    edge_data[key] = previous._succ[source][target]
+                else:
+                    edge_data[key] = dict(data)
+            return edge_data[key]
+
+        node_attributes = {node: dict(graph._node[node]) for node in touched}
+        succ = {node: {target: edge(node, target, data) for target, data in graph._succ[node].items()}
+                for node in touched}
+        pred = {node: {source: edge(source, node, data) for source, data in graph._pred[node].items()}
+                for node in touched}
+        return new_nodes, node_attributes, succ, pred
+
+    @staticmethod
+    def _copy_on_write(previous: nx.DiGraph, new_nodes: List[Hashable], node_attributes: Dict,
+                       succ: Dict, pred: Dict) -> nx.DiGraph:
+        """Frozen graph sharing untouched rows with the previous snapshot; runs without the lock"""
+        snapshot = nx.DiGraph()
+        snapshot.graph.update(previous.graph)
+        # Shallow copies of the outer dicts keep node order; new nodes are appended in graph order
+        snapshot._node = previous._node.copy()
+        snapshot._adj = previous._succ.copy()
+        snapshot._pred = previous._pred.copy()
+        for node in new_nodes:
+            snapshot._node[node] = None
+            snapshot._succ[node] = None
+            snapshot._pred[node] = None
+        snapshot._node.update(node_attributes)
+        snapshot._succ.update(succ)
+        snapshot._pred.update(pred)
+        return nx.freeze(snapshot)
+
+    def _patch_csr(self, previous: CSRGraph, snapshot: nx.DiGraph, changes) -> None:
+        csr = previous.patched(snapshot, *changes)
+        if csr is not None:
+            self.metric_cache.put(snapshot, 'csr_graph', csr)
+            self.csr_patches += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Version and write batching counters"""
+        return {
+            'graph_version': self.version,
+            'batches_committed': self.batches_committed,
+            'mutations_applied': self.mutations_applied,
+            'snapshot_version': self._snapshot_version,
+            'full_copies': self.full_copies,
+            'incremental_snapshots': self.incremental_snapshots,
+            'csr_patches': self.csr_patches
+        }
@@ -1,60 +1,361 @@
 import networkx as nx
+import numpy as np
 import json
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Callable, Hashable, Iterable, Optional, Tuple
+from utils.metric_cache import MetricCache
+from utils.centrality import resolve_betweenness_sample_size
+from utils.csr_graph import CSRGraph
+from utils.pagerank import PageRankEngine
+from utils.graph_stats import GraphStats
+from utils.parallel_centrality import CentralityEngine
+from utils.layout import LayoutEngine
+
+# Node budget of the aggregated graph view when none is requested
+DEFAULT_MAX_VISIBLE_NODES = 2000
+
+# Id prefix of super-nodes; the rest of the id is the anchor node, empty for unconnected nodes
+SUPER_NODE_PREFIX = 'group:'
 
 class GraphProcessor:
     """Utility class for processing and converting graph data"""
     
-    def __init__(self):
-        pass
+    def __init__(self, metric_cache: MetricCache = None, pagerank_engine: PageRankEngine = None,
+                 graph_stats: GraphStats = None, centrality_engine: CentralityEngine = None,
+                 layout_engine: LayoutEngine = None):
+        self.metric_cache = metric_cache
+        self.pagerank_engine = pagerank_engine or PageRankEngine()
+        self.graph_stats = graph_stats
+        self.centrality_engine = centrality_engine or CentralityEngine()
+        self.layout_engine = layout_engine or LayoutEngine()
+    
+    def _metric(self, graph: nx.DiGraph, name: str, compute: Callable[[], Any], **params) -> Any:
+        """Look a graph-wide metric up in the metric cache, computing it on a miss"""
+        if self.metric_cache is None:
+            return compute()
+        return self.metric_cache.get_or_compute(graph, name, compute, **params)
+    
+    def _csr(self, graph: nx.DiGraph) -> CSRGraph:
+        """Compact array view of the graph, built once per graph version"""
+        return self._metric(graph, 'csr_graph', lambda: CSRGraph.from_networkx(graph))
+    
+    def _basic_stats(self, graph: nx.DiGraph) -> Dict[str, Any]:
+        """Counts, density and average degrees, from the running counters when they track this graph"""
+        stats = self.graph_stats.metrics_for(graph) if self.graph_stats is not None else None
+        return stats if stats is not None else GraphStats(graph).basic_metrics()
+    
+    def node_positions(self, graph: nx.DiGraph) -> np.ndarray:
+        """
+        Layout coordinates in the unit square, one row per CSR node id
+        
+        The tracked graph is laid out incrementally by the shared layout
+        engine, once per graph version. Any other graph (subgraphs, copies)
+        gets a layout of its own so it does not disturb the shared one.
+        
+        Args:
+            graph: NetworkX DiGraph object
+            
+        Returns:
+            Array of shape (num_nodes, 2) with x, y in [0, 1], indexed like
+            the graph's CSR node ids
+        """
+        csr = self._csr(graph)
+        if self.metric_cache is not None and not self.metric_cache.tracks(graph):
+            engine = self.layout_engine
+            return LayoutEngine(engine.iterations, engine.incremental_iterations, engine.sample_size, engine.seed).update(csr)
+        return self._metric(graph, 'layout', lambda: self.layout_engine.update(csr))
     
     def convert_to_d3_format(self, graph: nx.DiGraph) -> Dict[str, Any]:
         """
         Convert NetworkX graph to D3.js compatible format
         
+        Every node carries a precomputed layout position in the unit square,
+        so clients can draw the graph without running a force simulation.
+        
         Args:
             graph: NetworkX DiGraph object
             
         Returns:
             Dictionary with nodes and links for D3.js visualization
         """
-        nodes = []
-        links = []
+        graph_data = self.iter_d3_format(graph)
+        graph_data['nodes'] = list(graph_data['nodes'])
+        graph_data['links'] = list(graph_data['links'])
+        return graph_data
+    
+    def iter_d3_format(self, graph: nx.DiGraph) -> Dict[str, Any]:
+        """
+        Same payload as convert_to_d3_format, with lazily built node and link records
+        
+        The nodes and links values are iterators that build each record from
+        the graph only when it is drawn, so a streaming response never holds
+        the full lists.
         
-        # Convert nodes
-        for node, data in graph.nodes(data=True):
-            node_data = {
-                'id': node,
-                'name': node,
-                'follower_count': data.get('follower_count', 0),
-                'engagement_score': data.get('engagement_score', 0.0),
-                'node_type': data.get('node_type', 'user'),
-                'size': self._calculate_node_size(data),
-                'color': self._get_node_color(data)
+        Args:
+            graph: NetworkX DiGraph object
+            
+        Returns:
+            Dictionary with node and link iterators and metadata
+        """
+        positions = self.node_positions(graph)
+        return {
+            'nodes': (self._d3_node(node, data, position.tolist())
+                      for (node, data), position in zip(graph.nodes(data=True), positions)),
+            'links': (self._d3_link(source, target, data) for source, target, data in graph.edges(data=True)),
+            'metadata': {
+                'node_count': graph.number_of_nodes(),
+                'edge_count': graph.number_of_edges(),
+                'density': self._basic_stats(graph)['density']
             }
-            nodes.append(node_data)
-        
-        # Convert edges
-        for source, target, data in graph.edges(data=True):
-            link_data = {
-                'source': source,
-                'target': target,
-                'relationship_type': data.get('relationship_type', 'unknown'),
-                'weight': data.get('weight', 1.0),
-                'color': self._get_edge_color(data.get('relationship_type', 'unknown'))
+        }
+    
+    def convert_to_d3_delta(self, graph: nx.DiGraph, nodes: Iterable[Hashable],
+                            links: Iterable[Tuple[Hashable, Hashable]]) -> Dict[str, Any]:
+        """
+        D3.js records for the given nodes and links only
+        
+        Keys still in the graph are returned in the same format as
+        convert_to_d3_format; keys that are gone are listed as removed. The
+        endpoints of changed links are returned as well, since only nodes
+        whose links changed are moved by an incremental relayout.
+        
+        Args:
+            graph: NetworkX DiGraph object
+            nodes: Node ids that changed, e.g. from GraphChangeLog.changes_since
+            links: (source, target) pairs that changed
+            
+        Returns:
+            Dictionary with changed nodes and links, removed_nodes and removed_links
+        """
+        links = list(links)
+        csr = self._csr(graph)
+        positions = self.node_positions(graph)
+        
+        changed_nodes = []
+        removed_nodes = []
+        for node in dict.fromkeys([*nodes, *(node for link in links for node in link)]):
+            if node in graph:
+                changed_nodes.append(self._d3_node(node, graph.nodes[node], positions[csr.node_index[node]].tolist()))
+            else:
+                removed_nodes.append(node)
+        
+        changed_links = []
+        removed_links = []
+        for source, target in links:
+            data = graph.succ[source].get(target) if source in graph else None
+            if data is not None:
+                changed_links.append(self._d3_link(source, target, data))
+            else:
+                removed_links.append({'source': source, 'target': target})
+        
+        return {
+            'nodes': changed_nodes,
+            'links': changed_links,
+            'removed_nodes': removed_nodes,
+            'removed_links': removed_links,
+            'metadata': {
+                'node_count': graph.number_of_nodes(),
+                'edge_count': graph.number_of_edges(),
+                'density': self._basic_stats(graph)['density']
             }
-            links.append(link_data)
+        }
+    
+    def convert_to_d3_summary(self, graph: nx.DiGraph, max_nodes: int = DEFAULT_MAX_VISIBLE_NODES) -> Dict[str, Any]:
+        """
+        Level-of-detail D3.js view with at most ``max_nodes`` nodes
+        
+        Graphs within the budget are returned in full. Otherwise the highest
+        PageRank nodes are kept as they are and every other node is collapsed
+        into a super-node around its nearest kept node (ignoring direction),
+        with nodes unconnected to any of them in one more super-node. Links
+        between the same visible pair are merged, summing their weights.
+        
+        Args:
+            graph: NetworkX DiGraph object
+            max_nodes: Node budget of the view
+            
+        Returns:
+            Dictionary in the convert_to_d3_format layout plus 'aggregated'
+        """
+        if graph.number_of_nodes() <= max_nodes:
+            graph_data = self.convert_to_d3_format(graph)
+            graph_data['aggregated'] = False
+            return graph_data
+        
+        csr, kept, labels, _ = self._level_of_detail(graph, max_nodes)
+        num_nodes = csr.number_of_nodes()
+        num_anchors = len(kept)
+        
+        # Visible index of every node: kept nodes are themselves, others their group
+        is_kept = np.zeros(num_nodes, dtype=bool)
+        is_kept[kept] = True
+        groups = np.where(labels >= 0, labels, num_anchors)
+        visible = np.where(is_kept, np.arange(num_nodes), num_nodes + groups)
+        
+        def visible_id(index: int) -> str:
+            if index < num_nodes:
+                return csr.nodes[index]
+            group = index - num_nodes
+            return f'{SUPER_NODE_PREFIX}{csr.nodes[kept[group]] if group < num_anchors else ""}'
+        
+        positions = self.node_positions(graph)
+        nodes = [self._d3_node(csr.nodes[node_id], graph.nodes[csr.nodes[node_id]], positions[node_id].tolist())
+                 for node_id in kept.tolist()]
+        
+        collapsed = ~is_kept
+        member_counts = np.bincount(groups[collapsed], minlength=num_anchors + 1)
+        follower_sums = np.bincount(groups[collapsed], weights=csr.follower_count[collapsed], minlength=num_anchors + 1)
+        engagement_sums = np.bincount(groups[collapsed], weights=csr.engagement_score[collapsed], minlength=num_anchors + 1)
+        # Super-nodes sit at the centroid of their members
+        centroids = np.column_stack([np.bincount(groups[collapsed], weights=positions[collapsed, axis],
+                                                 minlength=num_anchors + 1) for axis in range(2)])
+        for group in np.flatnonzero(member_counts).tolist():
+            anchor = csr.nodes[kept[group]] if group < num_anchors else None
+            member_count = int(member_counts[group])
+            nodes.append({
+                'id': visible_id(num_nodes + group),
+                'name': f'{member_count} users near {anchor}' if anchor is not None else f'{member_count} unconnected users',
+                'follower_count': int(follower_sums[group]),
+                'engagement_score': float(engagement_sums[group] / member_count),
+                'node_type': 'group',
+                'size': int(min(10 + 2 * np.sqrt(member_count), 40)),
+                'color': '#9e9e9e',
+                'position': (centroids[group] / member_count).tolist(),
+                'aggregated': True,
+                'member_count': member_count,
+                'anchor': anchor
+            })
+        
+        links = self._aggregate_links(csr, visible, num_nodes + num_anchors + 1, visible_id)
         
         return {
             'nodes': nodes,
             'links': links,
+            'aggregated': True,
             'metadata': {
                 'node_count': len(nodes),
                 'edge_count': len(links),
-                'density': nx.density(graph) if len(nodes) > 1 else 0
+                'total_nodes': num_nodes,
+                'total_edges': csr.number_of_edges(),
+                'density': self._basic_stats(graph)['density']
             }
         }
     
+    def expand_super_node(self, graph: nx.DiGraph, super_node_id: str,
+                          max_nodes: int = DEFAULT_MAX_VISIBLE_NODES) -> Optional[nx.DiGraph]:
+        """
+        Subgraph behind a super-node of convert_to_d3_summary
+        
+        The members of an anchored super-node all lie within their largest
+        distance from the anchor, so the neighborhood from get_subgraph is
+        cut down to the members plus the anchor itself.
+        
+        Args:
+            graph: Graph the summary was built from
+            super_node_id: Id of the super-node
+            max_nodes: Node budget the summary was built with
+            
+        Returns:
+            Subgraph of the members, or None if there is no such super-node
+        """
+        if not super_node_id.startswith(SUPER_NODE_PREFIX) or graph.number_of_nodes() <= max_nodes:
+            return None
+        anchor = super_node_id[len(SUPER_NODE_PREFIX):]
+        
+        csr, kept, labels, depths = self._level_of_detail(graph, max_nodes)
+        is_kept = np.zeros(csr.number_of_nodes(), dtype=bool)
+        is_kept[kept] = True
+        
+        if anchor == '':
+            members = np.flatnonzero(labels < 0)
+            return graph.subgraph([csr.nodes[node_id] for node_id in members.tolist()]).copy()
+        
+        if anchor not in csr.node_index or not is_kept[csr.node_index[anchor]]:
+            return None
+        anchor_id = csr.node_index[anchor]
+        members = np.flatnonzero((labels == labels[anchor_id]) & ~is_kept)
+        if len(members) == 0:
+            return None
+        
+        neighborhood = self.get_subgraph(graph, anchor, int(depths[members].max()))
+        return neighborhood.subgraph([anchor] + [csr.nodes[node_id] for node_id in members.tolist()]).copy()
+    
+    def _aggregate_links(self, csr: CSRGraph, visible: np.ndarray, num_visible: int,
+                         visible_id: Callable[[int], str]) -> List[Dict[str, Any]]:
+        """Merge edges by the visible nodes they connect, dropping edges inside a group"""
+        sources, targets = csr.edge_arrays()
+        visible_sources = visible[sources].astype(np.int64)
+        visible_targets = visible[targets].astype(np.int64)
+        between = visible_sources != visible_targets
+        pair_keys = visible_sources[between] * num_visible + visible_targets[between]
+        pairs, inverse = np.unique(pair_keys, return_inverse=True)
+        
+        edge_counts = np.bincount(inverse, minlength=len(pairs))
+        weight_sums = np.bincount(inverse, weights=csr.out_weights[between], minlength=len(pairs))
+        # Most common relationship type per pair
+        num_types = max(len(csr.relationship_types), 1)
+        type_counts = np.bincount(inverse * num_types + csr.out_type_codes[between],
+                                  minlength=len(pairs) * num_types).reshape(len(pairs), num_types)
+        dominant_types = type_counts.argmax(axis=1)
+        
+        links = []
+        for pair, edge_count, weight, type_code in zip(pairs.tolist(), edge_counts.tolist(), weight_sums.tolist(),
+                                                       dominant_types.tolist()):
+            relationship_type = csr.relationship_types[type_code]
+            links.append({
+                'source': visible_id(pair // num_visible),
+                'target': visible_id(pair % num_visible),
+                'relationship_type': relationship_type,
+                'weight': weight,
+                'color': self._get_edge_color(relationship_type),
+                'edge_count': edge_count
+            })
+        return links
+    
+    def _level_of_detail(self, graph: nx.DiGraph, max_nodes: int) -> Tuple[CSRGraph, np.ndarray, np.ndarray, np.ndarray]:
+        """Kept node ids, highest PageRank first, and each node's nearest kept node and distance to it"""
+        def compute():
+            csr = self._csr(graph)
+            pagerank = self._metric(graph, 'pagerank', lambda: csr.to_dict(self.pagerank_engine.compute(csr)), weight='weight')
+            scores = np.fromiter((pagerank[node] for node in csr.nodes), dtype=np.float64, count=csr.number_of_nodes())
+            # Half the budget for individual nodes, the rest for their groups
+            kept = np.argsort(-scores, kind='stable')[:max(1, (max_nodes - 1) // 2)].astype(np.int32)
+            labels, depths = csr.nearest_seed(kept)
+            return csr, kept, labels, depths
+        return self._metric(graph, 'level_of_detail', compute, max_nodes=max_nodes)
+    
+    def _d3_node(self, node: Hashable, data: Dict, position: List[float] = None) -> Dict[str, Any]:
+        """
+        D3.js record for one node
+        
+        Args:
+            node: Node id
+            data: Node attributes
+            position: Precomputed [x, y] layout position, if any
+            
+        Returns:
+            Dictionary with the node's id, attributes, size, color and position
+        """
+        return {
+            'id': node,
+            'name': node,
+            'follower_count': data.get('follower_count', 0),
+            'engagement_score': data.get('engagement_score', 0.0),
+            'node_type': data.get('node_type', 'user'),
+            'size': self._calculate_node_size(data),
+            'color': self._get_node_color(data),
+            'position': position
+        }
+    
+    def _d3_link(self, source: Hashable, target: Hashable, data: Dict) -> Dict[str, Any]:
+        """D3.js record for one edge"""
+        return {
+            'source': source,
+            'target': target,
+            'relationship_type': data.get('relationship_type', 'unknown'),
+            'weight': data.get('weight', 1.0),
+            'color': self._get_edge_color(data.get('relationship_type', 'unknown'))
+        }
+    
     def _calculate_node_size(self, node_data: Dict) -> int:
         """Calculate node size based on influence metrics"""
         follower_count = node_data.get('follower_count', 0)
@@ -107,41 +408,42 @@ class GraphProcessor:
         if center_node not in graph:
             return nx.DiGraph()
         
-        # Get nodes within radius
-        nodes_in_radius = set([center_node])
-        current_nodes = set([center_node])
-        
-        for _ in range(radius):
-            next_nodes = set()
-            for node in current_nodes:
-                # Add predecessors and successors
-                next_nodes.update(graph.predecessors(node))
-                next_nodes.update(graph.successors(node))
-            
-            nodes_in_radius.update(next_nodes)
-            current_nodes = next_nodes - nodes_in_radius
+        # Get nodes within radius (predecessors and successors) from the CSR arrays
+        csr = self._csr(graph)
+        node_ids = csr.neighborhood(csr.node_index[center_node], radius)
+        nodes_in_radius = [csr.nodes[node_id] for node_id in node_ids.tolist()]
         
         return graph.subgraph(nodes_in_radius).copy()
     
-    def calculate_centrality_metrics(self, graph: nx.DiGraph) -> Dict[str, Dict[str, float]]:
+    def calculate_centrality_metrics(self, graph: nx.DiGraph, betweenness: str = 'auto',
+                                     k: int = None) -> Dict[str, Dict[str, float]]:
         """
         Calculate various centrality metrics for all nodes
         
         Args:
             graph: NetworkX DiGraph
+            betweenness: Betweenness mode, 'exact', 'approx' or 'auto'
+            k: Pivot sample size for approximate betweenness
             
         Returns:
             Dictionary with centrality metrics for each node
         """
         metrics = {}
+        betweenness_k = resolve_betweenness_sample_size(graph.number_of_nodes(), betweenness, k)
         
         try:
             # Calculate different centrality measures
-            degree_centrality = nx.degree_centrality(graph)
-            in_degree_centrality = nx.in_degree_centrality(graph)
-            out_degree_centrality = nx.out_degree_centrality(graph)
-            betweenness_centrality = nx.betweenness_centrality(graph)
-            pagerank = nx.pagerank(graph)
+            csr = self._csr(graph)
+            degree_centrality = self._metric(graph, 'degree_centrality',
+                                             lambda: csr.to_dict(csr.degree_centrality()))
+            in_degree_centrality = self._metric(graph, 'in_degree_centrality',
+                                                lambda: csr.to_dict(csr.in_degree_centrality()))
+            out_degree_centrality = self._metric(graph, 'out_degree_centrality',
+                                                 lambda: csr.to_dict(csr.out_degree_centrality()))
+            betweenness_scores = self._metric(graph, 'betweenness_centrality',
+                                              lambda: csr.to_dict(self.centrality_engine.betweenness(csr, betweenness_k)),
+                                              weight=None, k=betweenness_k)
+            pagerank = self._metric(graph, 'pagerank', lambda: csr.to_dict(self.pagerank_engine.compute(csr)), weight='weight')
             
             # Combine metrics for each node
             for node in graph.nodes():
@@ -149,7 +451,7 @@ class GraphProcessor:
                     'degree_centrality': degree_centrality.get(node, 0),
                     'in_degree_centrality': in_degree_centrality.get(node, 0),
                     'out_degree_centrality': out_degree_centrality.get(node, 0),
-                    'betweenness_centrality': betweenness_centrality.get(node, 0),
+                    'betweenness_centrality': betweenness_scores.get(node, 0),
                     'pagerank': pagerank.get(node, 0)
                 }
         except Exception as e:
@@ -1,76 +1,189 @@
 import networkx as nx
 import numpy as np
-from typing import Dict, List, Any, Tuple
-from collections import defaultdict
+import scipy.sparse as sp
+from typing import Dict, Iterator, List, Any, Tuple, Callable
+from concurrent.futures import ThreadPoolExecutor
+from utils.metric_cache import MetricCache
+from utils.centrality import resolve_betweenness_sample_size
+from utils.csr_graph import CSRGraph, MULTI_BFS_WIDTH
+from utils.pagerank import PageRankEngine
+from utils.graph_stats import GraphStats
+from utils.parallel_centrality import CentralityEngine
+from utils.community import CommunityEngine
+from utils.influence_index import InfluenceIndex, composite_influence_score
+from utils.diffusion import SpreadSimulator, DEFAULT_ACTIVATION_PROBABILITY, DEFAULT_RUNS, SIMULATION_SEED
+
+# Engagement matrix encodings for get_mutual_engagement
+MATRIX_FORMATS = ('dict', 'dense', 'csr')
+
+# Common neighbors listed per user pair by default; the counts are always complete
+COMMON_NEIGHBOR_LIMIT = 20
 
 class InfluenceCalculator:
     """Utility class for calculating influence metrics and analyzing networks"""
     
-    def __init__(self):
-        pass
+    def __init__(self, metric_cache: MetricCache = None, pagerank_engine: PageRankEngine = None,
+                 graph_stats: GraphStats = None, centrality_engine: CentralityEngine = None,
+                 community_engine: CommunityEngine = None, influence_index: InfluenceIndex = None,
+                 spread_simulator: SpreadSimulator = None):
+        self.metric_cache = metric_cache
+        self.pagerank_engine = pagerank_engine or PageRankEngine()
+        self.graph_stats = graph_stats
+        self.centrality_engine = centrality_engine or CentralityEngine()
+        self.community_engine = community_engine or CommunityEngine()
+        # Maintained ranking for the tracked graph; without it every query scores all nodes
+        self.influence_index = influence_index
+        self.spread_simulator = spread_simulator or SpreadSimulator()
+    
+    def _metric(self, graph: nx.DiGraph, name: str, compute: Callable[[], Any], **params) -> Any:
+        """Look a graph-wide metric up in the metric cache, computing it on a miss"""
+        if self.metric_cache is None:
+            return compute()
+        return self.metric_cache.get_or_compute(graph, name, compute, **params)
+    
+    def _csr(self, graph: nx.DiGraph) -> CSRGraph:
+        """Compact array view of the graph, built once per graph version"""
+        return self._metric(graph, 'csr_graph', lambda: CSRGraph.from_networkx(graph))
     
-    def get_influence_chain(self, graph: nx.DiGraph, user: str, depth: int = 3) -> Dict[str, Any]:
+    def _basic_stats(self, graph: nx.DiGraph) -> Dict[str, Any]:
+        """Counts, density and average degrees, from the running counters when they track this graph"""
+        stats = self.graph_stats.metrics_for(graph) if self.graph_stats is not None else None
+        return stats if stats is not None else GraphStats(graph).basic_metrics()
+    
+    def pagerank(self, graph: nx.DiGraph) -> Dict[str, float]:
+        """Weighted PageRank shared by every ranking method"""
+        def compute():
+            csr = self._csr(graph)
+            return csr.to_dict(self.pagerank_engine.compute(csr))
+        return self._metric(graph, 'pagerank', compute, weight='weight')
+    
+    def get_influence_chain(self, graph: nx.DiGraph, user: str, depth: int = 3, max_nodes: int = None,
+                            limit: int = None, cursor: int = 0) -> Dict[str, Any]:
         """
         Get the influence chain of a specific user
         
+        Both directions are searched level by level with an optional node
+        budget, and only the requested page of each list is materialized.
+        
         Args:
             graph: NetworkX DiGraph
             user: User to analyze
             depth: Maximum depth to explore
+            max_nodes: Optional budget on nodes found per direction
+            limit: Optional page size for the influenced_by/influences lists
+            cursor: Offset of the page, from a previous next_cursor
             
         Returns:
             Dictionary containing influence chain information
         """
         if user not in graph:
             return {'error': f'User {user} not found in graph'}
+        if cursor < 0 or (limit is not None and limit < 1) or (max_nodes is not None and max_nodes < 1):
+            return {'error': 'limit and max_nodes must be positive and cursor must not be negative'}
         
-        # Get nodes within specified depth
-        influenced_by = []  # Users who influence this user
-        influences = []     # Users influenced by this user
+        csr = self._csr(graph)
+        node_id = csr.node_index[user]
         
-        # BFS to find influence chain
-        def bfs_influence(start_node, direction='out', max_depth=depth):
-            visited = set()
-            queue = [(start_node, 0)]  # (node, current_depth)
-            result = []
+        # BFS over the CSR arrays: users who influence this user, and users influenced by this user
+        search_in = csr.bfs(node_id, depth, 'in', max_nodes)
+        search_out = csr.bfs(node_id, depth, 'out', max_nodes)
+        
+        return self._chain_record(graph, csr, user, self._calculate_influence_score(graph, user),
+                                  search_in, search_out, limit, cursor)
+    
+    def get_influence_chains(self, graph: nx.DiGraph, users: List[str], depth: int = 3, max_nodes: int = None,
+                             limit: int = None, max_workers: int = 1) -> Iterator[Dict[str, Any]]:
+        """
+        Get the influence chains of many users at once
+        
+        The batch shares its work: one influence score vector serves every
+        user, and each group of users is searched with a multi-source BFS
+        that expands overlapping neighborhoods once. Groups run on up to
+        ``max_workers`` threads and chains are yielded in request order as
+        soon as their group finishes, so they can be streamed.
+        
+        Args:
+            graph: NetworkX DiGraph
+            users: Users to analyze
+            depth: Maximum depth to explore
+            max_nodes: Optional budget on nodes found per direction and user
+            limit: Optional page size for each user's influenced_by/influences lists
+            max_workers: Threads searching groups in parallel
             
-            while queue:
-                current_node, current_depth = queue.pop(0)
-                
-                if current_depth >= max_depth or current_node in visited:
+        Returns:
+            Iterator of influence chains as returned by get_influence_chain,
+            with 'user' and 'error' for users that are not in the graph
+        """
+        if (limit is not None and limit < 1) or (max_nodes is not None and max_nodes < 1):
+            raise ValueError('limit and max_nodes must be positive')
+        if not users:
+            return iter(())
+        
+        csr = self._csr(graph)
+        try:
+            pagerank_scores = self.pagerank(graph)
+        except:
+            pagerank_scores = {}
+        scores = self._influence_score_vector(graph, pagerank_scores)
+        
+        def search(group: List[str]) -> List[Dict[str, Any]]:
+            node_ids = np.array([csr.node_index[user] for user in group if user in csr], dtype=np.int32)
+            searches = zip(csr.multi_source_bfs(node_ids, depth, 'in', max_nodes),
+                           csr.multi_source_bfs(node_ids, depth, 'out', max_nodes))
+            chains = []
+            for user in group:
+                if user not in csr:
+                    chains.append({'user': user, 'error': f'User {user} not found in graph'})
                     continue
-                
-                visited.add(current_node)
-                
-                if current_node != start_node:
-                    node_data = graph.nodes[current_node]
-                    result.append({
-                        'user': current_node,
-                        'depth': current_depth,
-                        'follower_count': node_data.get('follower_count', 0),
-                        'engagement_score': node_data.get('engagement_score', 0.0)
-                    })
-                
-                # Get neighbors based on direction
-                if direction == 'out':
-                    neighbors = list(graph.successors(current_node))
-                else:
-                    neighbors = list(graph.predecessors(current_node))
-                
-                for neighbor in neighbors:
-                    if neighbor not in visited:
-                        queue.append((neighbor, current_depth + 1))
-            
-            return result
+                search_in, search_out = next(searches)
+                chains.append(self._chain_record(graph, csr, user, float(scores[csr.node_index[user]]),
+                                                 search_in, search_out, limit))
+            return chains
+        
+        groups = [users[i:i + MULTI_BFS_WIDTH] for i in range(0, len(users), MULTI_BFS_WIDTH)]
+        
+        def iter_chains() -> Iterator[Dict[str, Any]]:
+            if max_workers <= 1 or len(groups) == 1:
+                for group in groups:
+                    yield from search(group)
+                return
+            executor = ThreadPoolExecutor(max_workers=min(max_workers, len(groups)))
+            try:
+                for chains in executor.map(search, groups):
+                    yield from chains
+            finally:
+                # A client that stops reading leaves the remaining groups unsearched
+                executor.shutdown(wait=False, cancel_futures=True)
         
-        influenced_by = bfs_influence(user, direction='in', max_depth=depth)
-        influences = bfs_influence(user, direction='out', max_depth=depth)
+        return iter_chains()
+    
+    @staticmethod
+    def _chain_record(graph: nx.DiGraph, csr: CSRGraph, user: str, influence_score: float,
+                      search_in: Tuple[np.ndarray, np.ndarray, bool], search_out: Tuple[np.ndarray, np.ndarray, bool],
+                      limit: int = None, cursor: int = 0) -> Dict[str, Any]:
+        """Influence chain response for one user from its two BFS results, materializing one page"""
+        end = None if limit is None else cursor + limit
+        
+        def page(node_ids, depths):
+            page_ids = node_ids[cursor:end]
+            return [
+                {
+                    'user': csr.nodes[node_id],
+                    'depth': node_depth,
+                    'follower_count': follower_count,
+                    'engagement_score': engagement_score
+                }
+                for node_id, node_depth, follower_count, engagement_score in zip(
+                    page_ids.tolist(), depths[cursor:end].tolist(),
+                    csr.follower_count[page_ids].tolist(), csr.engagement_score[page_ids].tolist())
+            ]
         
-        # Calculate influence score
-        user_data = graph.nodes[user]
-        influence_score = self._calculate_influence_score(graph, user)
+        total_influenced_by = len(search_in[0])
+        total_influences = len(search_out[0])
+        has_more = end is not None and (end < total_influenced_by or end < total_influences)
         
         # Calculate effective follower count (combination of stored value and network connections)
+        user_data = graph.nodes[user]
         stored_followers = user_data.get('follower_count', 0)
         network_followers = graph.in_degree(user)  # Incoming edges represent followers
         
@@ -83,144 +196,270 @@ class InfluenceCalculator:
             'influence_score': influence_score,
             'follower_count': effective_followers,
             'engagement_score': user_data.get('engagement_score', 0.0),
-            'influenced_by': influenced_by,
-            'influences': influences,
-            'total_influenced_by': len(influenced_by),
-            'total_influences': len(influences)
+            'influenced_by': page(*search_in[:2]),
+            'influences': page(*search_out[:2]),
+            'total_influenced_by': total_influenced_by,
+            'total_influences': total_influences,
+            'truncated': search_in[2] or search_out[2],
+            'next_cursor': end if has_more else None
         }
     
-    def get_top_influencers(self, graph: nx.DiGraph, limit: int = 10, niche: str = None) -> List[Dict[str, Any]]:
+    def get_top_influencers(self, graph: nx.DiGraph, limit: int = 10, niche: str = None,
+                            betweenness: str = 'auto', k: int = None, seq: int = None) -> List[Dict[str, Any]]:
         """
         Get top influencers in the network
         
+        With an InfluenceIndex and the change log sequence number of the
+        snapshot, the ranking comes from the maintained index; otherwise all
+        nodes are scored and only the top ``limit`` are selected. Either way
+        result records are built for the selected nodes only.
+        
         Args:
             graph: NetworkX DiGraph
             limit: Number of top influencers to return
-            niche: Optional niche filter (not implemented in basic version)
+            niche: Optional niche; only nodes with this niche attribute are ranked
+            betweenness: Betweenness mode, 'exact', 'approx' or 'auto'
+            k: Pivot sample size for approximate betweenness
+            seq: Change log sequence number read before the snapshot was taken
             
         Returns:
             List of top influencers with their metrics
         """
-        if graph.number_of_nodes() == 0:
+        if graph.number_of_nodes() == 0 or limit < 1:
             return []
         
-        influencers = []
-        
-        # Calculate PageRank
-        try:
-            pagerank_scores = nx.pagerank(graph, weight='weight')
-        except:
-            pagerank_scores = {node: 0 for node in graph.nodes()}
+        betweenness_k = resolve_betweenness_sample_size(graph.number_of_nodes(), betweenness, k)
+        csr = self._csr(graph)
+        
+        if self.influence_index is not None and seq is not None and (self.metric_cache is None or
+                                                                     self.metric_cache.tracks(graph)):
+            def full_scores():
+                pagerank_scores = self._pagerank_or_empty(graph)
+                pagerank = np.fromiter((pagerank_scores.get(node, 0) for node in csr.nodes), dtype=np.float64,
+                                       count=csr.number_of_nodes())
+                return csr.nodes, self._influence_score_vector(graph, pagerank_scores), pagerank
+            self.influence_index.update(graph, seq, full_scores)
+            ranked = self.influence_index.top(limit, niche, seq)
+        else:
+            ranked = None
+        # Without an index, or when it has moved past this snapshot, rank the snapshot itself
+        if ranked is None:
+            ranked = self._rank(graph, csr, limit, niche)
+        # A clear between reading seq and taking the snapshot can leave indexed nodes it does not hold
+        ranked = [entry for entry in ranked if entry[0] in csr.node_index]
         
         # Calculate other centrality measures
         try:
-            betweenness_scores = nx.betweenness_centrality(graph, weight='weight')
-            in_degree_scores = nx.in_degree_centrality(graph)
-            out_degree_scores = nx.out_degree_centrality(graph)
+            betweenness_scores = self._metric(graph, 'betweenness_centrality',
+                                              lambda: csr.to_dict(self.centrality_engine.betweenness(csr, betweenness_k, weighted=True)),
+                                              weight='weight', k=betweenness_k)
+            in_degree_centrality = csr.in_degree_centrality()
+            out_degree_centrality = csr.out_degree_centrality()
         except:
-            betweenness_scores = {node: 0 for node in graph.nodes()}
-            in_degree_scores = {node: 0 for node in graph.nodes()}
-            out_degree_scores = {node: 0 for node in graph.nodes()}
+            betweenness_scores = {}
+            in_degree_centrality = out_degree_centrality = np.zeros(csr.number_of_nodes())
         
-        # Compile influencer data
-        for node in graph.nodes():
+        # Compile influencer data for the selected nodes only
+        in_degree = csr.in_degree()
+        out_degree = csr.out_degree()
+        influencers = []
+        for node, influence_score, pagerank in ranked:
+            node_id = csr.node_index[node]
             node_data = graph.nodes[node]
-            
-            influence_score = self._calculate_influence_score(graph, node)
-            
-            # Calculate effective follower count
-            stored_followers = node_data.get('follower_count', 0)
-            network_followers = graph.in_degree(node)
-            effective_followers = max(stored_followers, network_followers)
-            
-            influencer_data = {
+            influencers.append({
                 'user': node,
                 'influence_score': influence_score,
-                'pagerank': pagerank_scores.get(node, 0),
+                'pagerank': pagerank,
                 'betweenness_centrality': betweenness_scores.get(node, 0),
-                'in_degree_centrality': in_degree_scores.get(node, 0),
-                'out_degree_centrality': out_degree_scores.get(node, 0),
-                'follower_count': effective_followers,
+                'in_degree_centrality': float(in_degree_centrality[node_id]),
+                'out_degree_centrality': float(out_degree_centrality[node_id]),
+                # Effective follower count
+                'follower_count': max(node_data.get('follower_count', 0), int(in_degree[node_id])),
                 'engagement_score': node_data.get('engagement_score', 0.0),
-                'in_degree': graph.in_degree(node),
-                'out_degree': graph.out_degree(node)
-            }
-            
-            influencers.append(influencer_data)
+                'niche': node_data.get('niche'),
+                'in_degree': int(in_degree[node_id]),
+                'out_degree': int(out_degree[node_id])
+            })
         
-        # Sort by influence score (combination of multiple metrics)
-        influencers.sort(key=lambda x: x['influence_score'], reverse=True)
+        return influencers
+    
+    def _pagerank_or_empty(self, graph: nx.DiGraph) -> Dict[str, float]:
+        try:
+            return self.pagerank(graph)
+        except:
+            return {}
+    
+    def _rank(self, graph: nx.DiGraph, csr: CSRGraph, limit: int, niche: str = None) -> List[Tuple[str, float, float]]:
+        """Score every node and select the top ``limit`` with a partial sort"""
+        pagerank_scores = self._pagerank_or_empty(graph)
+        scores = self._influence_score_vector(graph, pagerank_scores)
+        if niche is None:
+            candidates = np.arange(csr.number_of_nodes())
+        elif niche in csr.niches:
+            candidates = np.flatnonzero(csr.niche_codes == csr.niches.index(niche))
+        else:
+            return []
         
-        return influencers[:limit]
+        if limit < len(candidates):
+            candidates = candidates[np.argpartition(-scores[candidates], limit - 1)[:limit]]
+        # Ties keep graph order, as a stable sort would
+        top = candidates[np.lexsort((candidates, -scores[candidates]))]
+        return [(csr.nodes[node_id], score, pagerank_scores.get(csr.nodes[node_id], 0))
+                for node_id, score in zip(top.tolist(), scores[top].tolist())]
     
-    def get_mutual_engagement(self, graph: nx.DiGraph, users: List[str]) -> Dict[str, Any]:
+    def get_mutual_engagement(self, graph: nx.DiGraph, users: List[str], matrix_format: str = 'dict',
+                              neighbor_limit: int = COMMON_NEIGHBOR_LIMIT) -> Dict[str, Any]:
         """
         Get mutual engagement networks between specified users
         
+        Works on sparse matrices rather than per-pair graph lookups: the k x k
+        block of the adjacency matrix gives the direct connections, and one
+        product of the k x N neighbor incidence matrix with its transpose
+        gives the common neighbor count of every pair.
+        
         Args:
             graph: NetworkX DiGraph
-            users: List of users to analyze
+            users: List of users to analyze; duplicates are ignored
+            matrix_format: 'dict' for nested {user: {user: value}} matrices,
+                'dense' for lists of rows in ``users`` order, 'csr' for
+                {'indptr', 'indices', 'data'} triplets of the nonzero entries
+            neighbor_limit: Common neighbors listed per pair, lowest graph
+                position first; 0 leaves the lists out and only counts them
             
         Returns:
             Dictionary containing mutual engagement information
         """
+        if matrix_format not in MATRIX_FORMATS:
+            raise ValueError(f"matrix_format must be one of {', '.join(MATRIX_FORMATS)}")
         if not users:
             return {'error': 'No users provided'}
         
         # Filter users that exist in graph
-        valid_users = [user for user in users if user in graph]
+        csr = self._csr(graph)
+        valid_users = [user for user in dict.fromkeys(users) if user in csr]
         
         if not valid_users:
             return {'error': 'None of the specified users found in graph'}
         
-        mutual_connections = []
-        engagement_matrix = defaultdict(dict)
-        
-        # Analyze connections between each pair of users
-        for i, user1 in enumerate(valid_users):
-            for j, user2 in enumerate(valid_users):
-                if i != j:
-                    # Check if there's a direct connection
-                    if graph.has_edge(user1, user2):
-                        edge_data = graph[user1][user2]
-                        connection = {
-                            'from': user1,
-                            'to': user2,
-                            'relationship_type': edge_data.get('relationship_type', 'unknown'),
-                            'weight': edge_data.get('weight', 1.0)
-                        }
-                        mutual_connections.append(connection)
-                        engagement_matrix[user1][user2] = edge_data.get('weight', 1.0)
-                    else:
-                        engagement_matrix[user1][user2] = 0
+        ids = np.array([csr.node_index[user] for user in valid_users], dtype=np.int64)
+        num_users = len(ids)
+        num_nodes = csr.number_of_nodes()
+        
+        # Direct connections: the users' block of a matrix holding edge positions, so zero weights survive
+        edge_ids = sp.csr_matrix((np.arange(1, csr.number_of_edges() + 1), csr.out_indices, csr.out_indptr),
+                                 shape=(num_nodes, num_nodes))
+        block = edge_ids[ids][:, ids].tocoo()
+        off_diagonal = block.row != block.col
+        rows, cols, edges = block.row[off_diagonal], block.col[off_diagonal], block.data[off_diagonal] - 1
+        order = np.lexsort((cols, rows))
+        rows, cols, edges = rows[order], cols[order], edges[order]
+        weights = csr.out_weights[edges]
+        
+        # Connections report the stored edge values, not their float64 CSR copies
+        mutual_connections = [
+            {
+                'from': valid_users[row],
+                'to': valid_users[col],
+                'relationship_type': csr.relationship_types[type_code],
+                'weight': graph[valid_users[row]][valid_users[col]].get('weight', 1.0)
+            }
+            for row, col, type_code in zip(rows.tolist(), cols.tolist(), csr.out_type_codes[edges].tolist())
+        ]
+        engagement = sp.csr_matrix((weights, (rows, cols)), shape=(num_users, num_users))
+        
+        # Common neighbors: binary k x N incidence of successors and predecessors, then one product
+        incidence = (sp.csr_matrix((np.ones(csr.number_of_edges()), csr.out_indices, csr.out_indptr),
+                                   shape=(num_nodes, num_nodes))[ids] +
+                     sp.csr_matrix((np.ones(csr.number_of_edges()), csr.in_indices, csr.in_indptr),
+                                   shape=(num_nodes, num_nodes))[ids]).tocsr()
+        incidence.data[:] = 1
+        incidence.sort_indices()
+        counts = (incidence @ incidence.T).tocsr()
+        counts.setdiag(0)
+        counts.eliminate_zeros()
         
-        # Find common neighbors (users they both interact with)
         common_neighbors = {}
-        for i, user1 in enumerate(valid_users):
-            for j, user2 in enumerate(valid_users):
-                if i < j:  # Avoid duplicates
-                    neighbors1 = set(graph.successors(user1)) | set(graph.predecessors(user1))
-                    neighbors2 = set(graph.successors(user2)) | set(graph.predecessors(user2))
-                    common = neighbors1 & neighbors2
-                    
-                    if common:
-                        common_neighbors[f"{user1}-{user2}"] = list(common)
+        if neighbor_limit > 0:
+            # Pairs sharing anyone, each listed once; truncated lists come from the sorted incidence rows
+            pairs = sp.triu(counts, k=1).tocoo()
+            for i, j in zip(pairs.row.tolist(), pairs.col.tolist()):
+                common = np.intersect1d(incidence.indices[incidence.indptr[i]:incidence.indptr[i + 1]],
+                                        incidence.indices[incidence.indptr[j]:incidence.indptr[j + 1]],
+                                        assume_unique=True)[:neighbor_limit]
+                common_neighbors[f"{valid_users[i]}-{valid_users[j]}"] = [csr.nodes[node_id] for node_id in common.tolist()]
         
         # Calculate mutual engagement score
-        total_possible_connections = len(valid_users) * (len(valid_users) - 1)
+        total_possible_connections = num_users * (num_users - 1)
         actual_connections = len(mutual_connections)
         mutual_engagement_score = actual_connections / total_possible_connections if total_possible_connections > 0 else 0
         
+        if matrix_format == 'dict':
+            engagement_matrix = {user1: {user2: 0 for user2 in valid_users if user2 != user1} for user1 in valid_users}
+            for connection in mutual_connections:
+                engagement_matrix[connection['from']][connection['to']] = connection['weight']
+            pairs = sp.triu(counts, k=1).tocoo()
+            common_neighbor_counts = {f"{valid_users[i]}-{valid_users[j]}": count
+                                      for i, j, count in zip(pairs.row.tolist(), pairs.col.tolist(),
+                                                             pairs.data.astype(np.int64).tolist())}
+        else:
+            engagement_matrix = self._matrix(engagement, matrix_format)
+            common_neighbor_counts = self._matrix(counts.astype(np.int64), matrix_format)
+        
         return {
             'users': valid_users,
             'mutual_connections': mutual_connections,
             'common_neighbors': common_neighbors,
-            'engagement_matrix': dict(engagement_matrix),
+            'common_neighbor_counts': common_neighbor_counts,
+            'engagement_matrix': engagement_matrix,
+            'matrix_format': matrix_format,
             'mutual_engagement_score': mutual_engagement_score,
             'total_connections': actual_connections,
             'possible_connections': total_possible_connections
         }
     
+    @staticmethod
+    def _matrix(matrix: sp.csr_matrix, matrix_format: str) -> Any:
+        """A sparse matrix as lists of rows or as CSR triplets"""
+        if matrix_format == 'dense':
+            return matrix.toarray().tolist()
+        matrix = matrix.tocsr()
+        matrix.sort_indices()
+        return {'indptr': matrix.indptr.tolist(), 'indices': matrix.indices.tolist(), 'data': matrix.data.tolist()}
+    
+    def simulate_spread(self, graph: nx.DiGraph, seeds: List[str], model: str = 'ic', runs: int = DEFAULT_RUNS,
+                        seed: int = SIMULATION_SEED, max_steps: int = None,
+                        probability: float = DEFAULT_ACTIVATION_PROBABILITY, confidence: float = 0.95) -> Dict[str, Any]:
+        """
+        Estimate how far influence spreads from a seed set
+        
+        Args:
+            graph: NetworkX DiGraph
+            seeds: Users active at the start
+            model: 'ic' for Independent Cascade, 'lt' for Linear Threshold
+            runs: Number of Monte Carlo runs
+            seed: Random seed; the same seed gives the same estimate
+            max_steps: Optional limit on propagation steps
+            probability: Independent Cascade activation probability of a weight 1 edge
+            confidence: Confidence level of the interval
+            
+        Returns:
+            Dictionary containing the expected activated count and its confidence interval
+        """
+        if not seeds:
+            return {'error': 'No seed users provided'}
+        
+        csr = self._csr(graph)
+        missing = [user for user in seeds if user not in csr]
+        if missing:
+            return {'error': f"Users not found in graph: {', '.join(map(str, missing[:10]))}"}
+        
+        result = self.spread_simulator.simulate(csr, [csr.node_index[user] for user in seeds], model, runs, seed,
+                                                max_steps, probability, confidence)
+        result['seeds'] = list(dict.fromkeys(seeds))
+        result['node_count'] = csr.number_of_nodes()
+        result['expected_fraction'] = result['expected_activated'] / csr.number_of_nodes()
+        return result
+    
     def _calculate_influence_score(self, graph: nx.DiGraph, node: str) -> float:
         """
         Calculate a composite influence score for a node
@@ -249,7 +488,7 @@ class InfluenceCalculator:
         
         # Calculate PageRank if possible
         try:
-            pagerank_scores = nx.pagerank(graph, weight='weight')
+            pagerank_scores = self.pagerank(graph)
             pagerank = pagerank_scores.get(node, 0)
         except:
             pagerank = 0
@@ -269,12 +508,53 @@ class InfluenceCalculator:
         
         return min(influence_score, 1.0)  # Cap at 1.0
     
-    def detect_communities(self, graph: nx.DiGraph) -> Dict[str, Any]:
+    def calculate_influence_scores(self, graph: nx.DiGraph, pagerank_scores: Dict[str, float] = None) -> Dict[str, float]:
+        """
+        Calculate the composite influence score for every node at once
+        
+        The graph-wide inputs (PageRank, degree vectors, node count) are computed
+        a single time and the score is evaluated as a NumPy vector expression, so
+        a ranking pass costs one PageRank solve instead of one per node.
+        
+        Args:
+            graph: NetworkX DiGraph
+            pagerank_scores: Optional precomputed weighted PageRank scores
+            
+        Returns:
+            Dictionary mapping each node to its composite influence score
+        """
+        if graph.number_of_nodes() == 0:
+            return {}
+        return self._csr(graph).to_dict(self._influence_score_vector(graph, pagerank_scores))
+    
+    def _influence_score_vector(self, graph: nx.DiGraph, pagerank_scores: Dict[str, float] = None) -> np.ndarray:
+        """Composite influence score per CSR node id, as calculate_influence_scores computes it"""
+        num_nodes = graph.number_of_nodes()
+        if pagerank_scores is None:
+            try:
+                pagerank_scores = self.pagerank(graph)
+            except:
+                pagerank_scores = {}
+        
+        # Per-node inputs as aligned vectors from the CSR arrays; same weighting as _calculate_influence_score
+        csr = self._csr(graph)
+        pagerank = np.fromiter((pagerank_scores.get(node, 0) for node in csr.nodes), dtype=np.float64, count=num_nodes)
+        return composite_influence_score(csr.follower_count.astype(np.float64), csr.engagement_score,
+                                         csr.in_degree().astype(np.float64), csr.out_degree().astype(np.float64),
+                                         pagerank, num_nodes)
+    
+    def detect_communities(self, graph: nx.DiGraph, top_k: int = 3) -> Dict[str, Any]:
         """
         Detect communities in the influence network
         
+        Communities come from the shared CommunityEngine (multilevel Louvain
+        on edge weights, warm-started from its previous partition) and are
+        cached per graph version. Every community's top influencers are
+        picked from one influence score vector with a single sort.
+        
         Args:
             graph: NetworkX DiGraph
+            top_k: Number of top influencers listed per community
             
         Returns:
             Dictionary containing community information
@@ -283,69 +563,46 @@ class InfluenceCalculator:
             return {'communities': [], 'modularity': 0}
         
         try:
-            # Convert to undirected for community detection
-            undirected_graph = graph.to_undirected()
-            
-            # Use Louvain method for community detection
-            import networkx.algorithms.community as nx_comm
-            communities = list(nx_comm.greedy_modularity_communities(undirected_graph))
+            csr = self._csr(graph)
+            labels, modularity = self._metric(graph, 'communities', lambda: self.community_engine.detect(csr))
+            scores = self._influence_score_vector(graph)
             
-            # Calculate modularity
-            modularity = nx_comm.modularity(undirected_graph, communities)
+            # Members of each community in node id order, and in decreasing score order
+            sizes = np.bincount(labels)
+            starts = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+            members = np.argsort(labels, kind='stable')
+            ranked = np.lexsort((-scores, labels))
             
-            # Format communities
             community_data = []
-            for i, community in enumerate(communities):
-                community_nodes = list(community)
-                community_info = {
+            for i, (start, size) in enumerate(zip(starts.tolist(), sizes.tolist())):
+                top_ids = ranked[start:start + min(size, top_k)]
+                community_data.append({
                     'id': i,
-                    'nodes': community_nodes,
-                    'size': len(community_nodes),
-                    'top_influencers': self._get_top_nodes_in_community(graph, community_nodes, 3)
-                }
-                community_data.append(community_info)
+                    'nodes': [csr.nodes[node_id] for node_id in members[start:start + size].tolist()],
+                    'size': size,
+                    'top_influencers': [
+                        {
+                            'user': csr.nodes[node_id],
+                            'influence_score': score,
+                            'follower_count': follower_count,
+                            'engagement_score': engagement_score
+                        }
+                        for node_id, score, follower_count, engagement_score in zip(
+                            top_ids.tolist(), scores[top_ids].tolist(),
+                            csr.follower_count[top_ids].tolist(), csr.engagement_score[top_ids].tolist())
+                    ]
+                })
             
             return {
                 'communities': community_data,
                 'modularity': modularity,
-                'num_communities': len(communities)
+                'num_communities': len(community_data)
             }
             
         except Exception as e:
             print(f"Error in community detection: {e}")
             return {'communities': [], 'modularity': 0, 'error': str(e)}
     
-    def _get_top_nodes_in_community(self, graph: nx.DiGraph, nodes: List[str], limit: int = 3) -> List[Dict[str, Any]]:
-        """
-        Get top influencers within a community
-        
-        Args:
-            graph: NetworkX DiGraph
-            nodes: List of nodes in the community
-            limit: Number of top nodes to return
-            
-        Returns:
-            List of top influencers in the community
-        """
-        node_scores = []
-        
-        for node in nodes:
-            if node in graph:
-                score = self._calculate_influence_score(graph, node)
-                node_data = graph.nodes[node]
-                
-                node_scores.append({
-                    'user': node,
-                    'influence_score': score,
-                    'follower_count': node_data.get('follower_count', 0),
-                    'engagement_score': node_data.get('engagement_score', 0.0)
-                })
-        
-        # Sort by influence score
-        node_scores.sort(key=lambda x: x['influence_score'], reverse=True)
-        
-        return node_scores[:limit]
-    
     def calculate_network_metrics(self, graph: nx.DiGraph) -> Dict[str, Any]:
         """
         Calculate comprehensive network metrics
@@ -360,32 +617,36 @@ class InfluenceCalculator:
             return {'error': 'Empty graph'}
         
         try:
+            stats = self._basic_stats(graph)
+            is_connected = self._metric(graph, 'is_weakly_connected', lambda: nx.is_weakly_connected(graph))
             metrics = {
                 'basic_metrics': {
-                    'num_nodes': graph.number_of_nodes(),
-                    'num_edges': graph.number_of_edges(),
-                    'density': nx.density(graph),
-                    'is_connected': nx.is_weakly_connected(graph)
+                    'num_nodes': stats['num_nodes'],
+                    'num_edges': stats['num_edges'],
+                    'density': stats['density'],
+                    'is_connected': is_connected,
+                    'edge_type_counts': stats['edge_type_counts']
                 },
                 'centrality_metrics': {
-                    'avg_degree': sum(dict(graph.degree()).values()) / graph.number_of_nodes(),
-                    'avg_in_degree': sum(dict(graph.in_degree()).values()) / graph.number_of_nodes(),
-                    'avg_out_degree': sum(dict(graph.out_degree()).values()) / graph.number_of_nodes()
+                    'avg_degree': stats['avg_degree'],
+                    'avg_in_degree': stats['avg_in_degree'],
+                    'avg_out_degree': stats['avg_out_degree']
                 }
             }
             
             # Add clustering coefficient for undirected version
             try:
-                undirected = graph.to_undirected()
                 metrics['clustering'] = {
-                    'avg_clustering': nx.average_clustering(undirected),
-                    'transitivity': nx.transitivity(undirected)
+                    'avg_clustering': self._metric(graph, 'average_clustering',
+                                                   lambda: nx.average_clustering(graph.to_undirected())),
+                    'transitivity': self._metric(graph, 'transitivity',
+                                                 lambda: nx.transitivity(graph.to_undirected()))
                 }
             except:
                 metrics['clustering'] = {'avg_clustering': 0, 'transitivity': 0}
             
             # Add path metrics if graph is connected
-            if nx.is_weakly_connected(graph):
+            if is_connected:
                 try:
                     metrics['path_metrics'] = {
                         'avg_shortest_path': nx.average_shortest_path_length(graph),
@@ -397,4 +658,35 @@ class InfluenceCalculator:
             return metrics
             
         except Exception as e:
-            return {'error': f'Error calculating network metrics: {str(e)}'} 
\ No newline at end of file
+            return {'error': f'Error calculating network metrics: {str(e)}'}     
+    
+    def get_analytics(self, graph: nx.DiGraph) -> Dict[str, Any]:
+        """
+        Dashboard summary: counts, density, connectivity, clustering and top PageRank
+        
+        Args:
+            graph: NetworkX DiGraph
+            
+        Returns:
+            Dictionary served by /api/get_analytics
+        """
+        # Counts and density come from the running counters, not the graph
+        stats = self._basic_stats(graph)
+        node_count = stats['num_nodes']
+        edge_count = stats['num_edges']
+        
+        if node_count == 0:
+            return {'total_nodes': 0,'total_edges': 0,'density': 0.0,'avg_degree': 0.0,'edge_type_counts': {},'is_connected': False,'average_clustering': 0.0,'pagerank': {}}
+        
+        is_conn = self._metric(graph, 'is_weakly_connected', lambda: nx.is_weakly_connected(graph)) if node_count > 1 else True
+        try:
+            avg_clust = self._metric(graph, 'average_clustering',
+                                     lambda: nx.average_clustering(graph.to_undirected())) if node_count > 1 else 0.0
+        except:
+            avg_clust = 0.0
+        try:
+            pr = self.pagerank(graph) if edge_count > 0 else {}
+            top_pr = dict(list(pr.items())[:10])
+        except:
+            top_pr = {}
+        return {'total_nodes': node_count,'total_edges': edge_count,'density': stats['density'],'avg_degree': stats['avg_degree'],'edge_type_counts': stats['edge_type_counts'],'is_connected': is_conn,'average_clustering': avg_clust,'pagerank': top_pr,'pagerank_solver': self.pagerank_engine.stats()}
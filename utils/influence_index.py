@@ -0,0 +1,252 @@
+import heapq
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+import networkx as nx
+import numpy as np
+
+from utils.change_log import GraphChangeLog
+
+# Seconds between full rescoring passes with a fresh PageRank vector
+PAGERANK_REFRESH_INTERVAL = 60.0
+
+# Fraction of nodes rescored incrementally after which a full refresh is cheaper and fresher
+REFRESH_FRACTION = 0.1
+
+# Heap entries allowed per live node before stale entries are compacted away
+MAX_STALE_RATIO = 2
+
+
+def composite_influence_score(follower_count, engagement_score, in_degree, out_degree, pagerank, num_nodes):
+    """
+    Composite influence score, for scalars or aligned NumPy arrays
+
+    Args:
+        follower_count: Stored follower count
+        engagement_score: Engagement score in [0, 1]
+        in_degree: Number of incoming edges
+        out_degree: Number of outgoing edges
+        pagerank: Weighted PageRank
+        num_nodes: Number of nodes in the graph
+
+    Returns:
+        Score capped at 1.0
+    """
+    # The network follower count stands in when the stored one is lower
+    followers = np.maximum(follower_count, in_degree)
+    normalized_followers = np.log10(followers + 1) / 6
+    score = (
+        normalized_followers * 0.3 +
+        engagement_score * 0.2 +
+        (in_degree / num_nodes) * 0.2 +
+        (out_degree / num_nodes) * 0.1 +
+        pagerank * 0.2
+    )
+    return np.minimum(score, 1.0)
+
+
+class InfluenceIndex:
+    """Maintained top-k ranking of composite influence scores
+
+    Scores live in one max-heap over all nodes plus one per niche. Between
+    graph versions only the nodes the GraphChangeLog reports, and the
+    endpoints of changed links, are rescored from their current attributes
+    and degrees; each rescore pushes a new heap entry and leaves the old one
+    to be discarded lazily. Those rescores reuse the PageRank values and
+    the node count (which normalizes the degree terms) of the last full
+    refresh, so every score in the index stays on one scale. A full refresh
+    recomputes everything from a fresh PageRank vector when the log cannot
+    answer, when PAGERANK_REFRESH_INTERVAL has passed, or when more than
+    REFRESH_FRACTION of the nodes were rescored, new nodes included.
+    Between refreshes rankings can differ from a full recomputation by
+    those two terms; ``freshness`` reports how far behind they are. A top-k
+    query pops k live entries, O(k log N), instead of sorting.
+    """
+
+    def __init__(self, change_log: GraphChangeLog, refresh_interval: float = PAGERANK_REFRESH_INTERVAL,
+                 refresh_fraction: float = REFRESH_FRACTION):
+        self.change_log = change_log
+        self.refresh_interval = refresh_interval
+        self.refresh_fraction = refresh_fraction
+        self.seq: Optional[int] = None
+        # Change log position of the last full refresh, which the PageRank values reflect
+        self.refreshed_seq: Optional[int] = None
+        self.refreshed_at = 0.0
+        self.full_refreshes = 0
+        self.incremental_updates = 0
+        self.nodes_rescored = 0
+        self._rescored_since_refresh = 0
+        self._num_nodes = 0
+        self._scores: Dict[Hashable, float] = {}
+        self._pagerank: Dict[Hashable, float] = {}
+        self._niches: Dict[Hashable, Optional[str]] = {}
+        # First-seen order breaks score ties, as a stable sort over graph order would
+        self._order: Dict[Hashable, int] = {}
+        self._stamps: Dict[Hashable, int] = {}
+        self._next_stamp = 0
+        self._heaps: Dict[Optional[str], List[Tuple[float, int, int, Hashable]]] = {}
+        self._lock = threading.Lock()
+
+    def update(self, graph: nx.DiGraph, seq: int,
+               full_scores: Callable[[], Tuple[List[Hashable], np.ndarray, np.ndarray]]) -> None:
+        """
+        Bring the index up to a graph version
+
+        Args:
+            graph: Snapshot holding every change up to ``seq``
+            seq: Change log sequence number read before the snapshot was taken
+            full_scores: Callable returning (node handles, scores, PageRank) for
+                every node, used for a full refresh
+        """
+        with self._lock:
+            # A snapshot older than the index cannot be served from it; ``top`` checks the version
+            if self.seq is not None and seq <= self.seq:
+                return
+            changes = self.change_log.changes_since(self.seq, seq) if self.seq is not None else None
+            touched = None
+            if changes is not None:
+                nodes, links = changes
+                touched = set(nodes)
+                touched.update(node for link in links for node in link)
+
+            num_nodes = graph.number_of_nodes()
+            if (touched is None
+                    or time.time() - self.refreshed_at > self.refresh_interval
+                    or self._rescored_since_refresh + len(touched) > self.refresh_fraction * max(num_nodes, 1)):
+                self._refresh(graph, *full_scores())
+                self.refreshed_seq = seq
+            else:
+                self._rescore(graph, touched)
+            self.seq = seq
+
+    def top(self, limit: int, niche: str = None, seq: int = None) -> Optional[List[Tuple[Hashable, float, float]]]:
+        """
+        Highest scoring nodes, optionally within one niche
+
+        Args:
+            limit: Number of nodes to return
+            niche: Optional niche; None ranks all nodes
+            seq: Change log sequence number the caller's snapshot was taken
+                at; None accepts whatever version the index is at
+
+        Returns:
+            List of (node, influence score, PageRank) by decreasing score, or
+            None if the index has moved past ``seq`` and the caller has to
+            rank its snapshot itself
+        """
+        with self._lock:
+            if seq is not None and seq != self.seq:
+                return None
+            heap = self._heaps.get(niche, [])
+            found = []
+            live = []
+            while heap and len(found) < limit:
+                entry = heapq.heappop(heap)
+                node = entry[3]
+                if self._stamps.get(node) != entry[2]:
+                    continue
+                live.append(entry)
+                found.append((node, self._scores[node], self._pagerank.get(node, 0.0)))
+            for entry in live:
+                heapq.heappush(heap, entry)
+            return found
+
+    def _refresh(self, graph: nx.DiGraph, nodes: List[Hashable], scores: np.ndarray, pagerank: np.ndarray) -> None:
+        """Rebuild every heap from freshly computed scores"""
+        self._scores = dict(zip(nodes, scores.tolist()))
+        self._pagerank = dict(zip(nodes, pagerank.tolist()))
+        self._niches = {node: data.get('niche') for node, data in graph.nodes(data=True)}
+        self._order = {node: i for i, node in enumerate(nodes)}
+        self._stamps = dict.fromkeys(nodes, 0)
+        self._next_stamp = 1
+
+        heaps: Dict[Optional[str], List[Tuple[float, int, int, Hashable]]] = {None: []}
+        for node, score in self._scores.items():
+            entry = (-score, self._order[node], 0, node)
+            heaps[None].append(entry)
+            niche = self._niches[node]
+            if niche is not None:
+                heaps.setdefault(niche, []).append(entry)
+        for heap in heaps.values():
+            heapq.heapify(heap)
+        self._heaps = heaps
+
+        self.refreshed_at = time.time()
+        self._rescored_since_refresh = 0
+        self._num_nodes = graph.number_of_nodes()
+        self.full_refreshes += 1
+
+    def _rescore(self, graph: nx.DiGraph, nodes) -> None:
+        """Recompute the scores of the given nodes from the graph, dropping removed ones"""
+        for node in nodes:
+            stamp = self._next_stamp
+            self._next_stamp += 1
+            if node not in graph:
+                self._scores.pop(node, None)
+                self._niches.pop(node, None)
+                self._stamps.pop(node, None)
+                continue
+
+            data = graph.nodes[node]
+            score = float(composite_influence_score(data.get('follower_count', 0), data.get('engagement_score', 0.0),
+                                                    graph.in_degree(node), graph.out_degree(node),
+                                                    self._pagerank.get(node, 0.0), self._num_nodes))
+            niche = data.get('niche')
+            order = self._order.setdefault(node, len(self._order))
+            self._scores[node] = score
+            self._niches[node] = niche
+            self._stamps[node] = stamp
+
+            entry = (-score, order, stamp, node)
+            heapq.heappush(self._heaps[None], entry)
+            if niche is not None:
+                heapq.heappush(self._heaps.setdefault(niche, []), entry)
+
+        self._rescored_since_refresh += len(nodes)
+        self.nodes_rescored += len(nodes)
+        self.incremental_updates += 1
+        self._compact()
+
+    def _compact(self) -> None:
+        """Rebuild heaps that are mostly stale entries"""
+        for niche, heap in list(self._heaps.items()):
+            if len(heap) > MAX_STALE_RATIO * len(self._stamps) + 1024:
+                live = [entry for entry in heap
+                        if self._stamps.get(entry[3]) == entry[2] and (niche is None or self._niches[entry[3]] == niche)]
+                heapq.heapify(live)
+                self._heaps[niche] = live
+
+    def freshness(self) -> Dict[str, Any]:
+        """
+        How far the ranking's PageRank and node count terms may lag the graph
+
+        Returns:
+            Dictionary with the change log position of the ranking and of the
+            last full refresh, seconds since that refresh, the refresh
+            interval, nodes rescored since, the node count scores are
+            normalized by, and whether PageRank is current
+        """
+        with self._lock:
+            return {
+                'seq': self.seq,
+                'refreshed_seq': self.refreshed_seq,
+                'seconds_since_refresh': time.time() - self.refreshed_at if self.refreshed_at else None,
+                'refresh_interval': self.refresh_interval,
+                'nodes_rescored_since_refresh': self._rescored_since_refresh,
+                'num_nodes_at_refresh': self._num_nodes,
+                'pagerank_exact': self.seq is not None and self.seq == self.refreshed_seq
+            }
+
+    def stats(self) -> Dict[str, Any]:
+        """Index size, refresh age and update counters"""
+        with self._lock:
+            return {
+                'nodes': len(self._scores),
+                'niches': len(self._heaps) - 1 if self._heaps else 0,
+                'seq': self.seq,
+                'seconds_since_refresh': time.time() - self.refreshed_at if self.refreshed_at else None,
+                'full_refreshes': self.full_refreshes,
+                'incremental_updates': self.incremental_updates,
+                'nodes_rescored': self.nodes_rescored
+            }
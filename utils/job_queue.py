@@ -0,0 +1,313 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+import networkx as nx
+
+from utils.centrality import resolve_betweenness_sample_size
+from utils.csr_graph import CSRGraph
+from utils.graph_store import GraphStore
+from utils.influence_calc import InfluenceCalculator
+from utils.parallel_centrality import CentralityEngine
+from utils.snapshot import read_snapshot, write_snapshot
+
+# Analytics that can be run as background jobs
+JOB_KINDS = ('analytics', 'top_influencers', 'communities')
+
+# Seconds a finished job's result is kept after submission, whatever the graph version
+JOB_TTL = 3600
+
+# Jobs retained at once; the oldest finished jobs are dropped first, and submits
+# are refused while this many are still queued or running
+MAX_RETAINED_JOBS = 256
+
+# Graph of the most recently loaded snapshot file in a worker process
+_worker_graph: Dict[str, nx.DiGraph] = {}
+
+
+def _load_graph(filepath: str) -> nx.DiGraph:
+    """Graph of a job snapshot file, loaded once per worker process"""
+    if filepath not in _worker_graph:
+        csr, _ = read_snapshot(filepath)
+        graph = nx.freeze(csr.to_networkx())
+        _worker_graph.clear()
+        _worker_graph[filepath] = graph
+    return _worker_graph[filepath]
+
+
+def run_analytics_job(kind: str, filepath: str, params: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Compute one analytics job; runs in a worker process
+
+    Args:
+        kind: One of JOB_KINDS
+        filepath: Snapshot file of the graph version the job was submitted at
+        params: Keyword parameters of the job
+
+    Returns:
+        The same payload the synchronous endpoint would return
+    """
+    graph = _load_graph(filepath)
+    # Jobs already run in parallel with each other, so each one computes serially
+    influence_calc = InfluenceCalculator(centrality_engine=CentralityEngine(max_workers=1))
+    if kind == 'analytics':
+        return influence_calc.get_analytics(graph)
+    if kind == 'top_influencers':
+        betweenness = params.get('betweenness', 'auto')
+        k = params.get('k')
+        sample_size = resolve_betweenness_sample_size(graph.number_of_nodes(), betweenness, k)
+        return {
+            'top_influencers': influence_calc.get_top_influencers(graph, params.get('limit', 10),
+                                                                  params.get('niche'), betweenness, k),
+            'betweenness': {
+                'mode': 'exact' if sample_size is None else 'approx',
+                'sample_size': sample_size
+            }
+        }
+    if kind == 'communities':
+        return influence_calc.detect_communities(graph)
+    raise ValueError(f"Unknown job kind '{kind}', expected one of {', '.join(JOB_KINDS)}")
+
+
+class AnalyticsJobQueue:
+    """Runs expensive analytics off the request thread
+
+    Jobs are computed on a snapshot from the GraphStore by a process pool, so
+    they neither hold a request open nor compete with request threads for the
+    GIL. The snapshot is not pickled into every job: each graph version is
+    written once as a binary snapshot file, and workers are sent its path
+    and memory-map it. Each job remembers the graph version it was submitted
+    at; finished results are kept until that version is superseded, until
+    ``job_ttl`` seconds after submission, or until ``max_jobs`` newer jobs
+    push them out, whichever comes first. Submitting an identical job for
+    the same version returns the existing job.
+    """
+
+    def __init__(self, graph_store: GraphStore, max_workers: int = None, executor: Executor = None,
+                 job_ttl: float = JOB_TTL, max_jobs: int = MAX_RETAINED_JOBS, snapshot_dir: str = None):
+        self.graph_store = graph_store
+        self.max_workers = max_workers
+        self.job_ttl = job_ttl
+        self.max_jobs = max_jobs
+        self._executor = executor
+        self._snapshot_dir = snapshot_dir
+        self._owns_snapshot_dir = snapshot_dir is None
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._job_ids: Dict[tuple, str] = {}
+        # Snapshot file per graph version that jobs were submitted at
+        self._snapshot_files: Dict[int, str] = {}
+        # (graph version, future) of expired jobs that were already running when cancelled
+        self._orphans: List[Tuple[int, Future]] = []
+        self._lock = threading.Lock()
+        # Serializes snapshot file writes; taken before _lock, never while holding it
+        self._snapshot_lock = threading.Lock()
+
+    def _get_executor(self) -> Executor:
+        # Created on first use so importing the app does not start worker processes
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._executor
+
+    def submit(self, kind: str, params: Dict[str, Any] = None) -> Dict[str, Any]:
+        """
+        Queue an analytics job
+
+        Args:
+            kind: One of JOB_KINDS
+            params: Keyword parameters of the job, e.g. {'limit': 10}
+
+        Returns:
+            Status of the new (or identical already queued) job
+        """
+        if kind not in JOB_KINDS:
+            raise ValueError(f"Unknown job kind '{kind}', expected one of {', '.join(JOB_KINDS)}")
+        params = dict(params or {})
+
+        graph, version = self.graph_store.snapshot_with(lambda: self.graph_store.version)
+        key = (kind, tuple(sorted(params.items())), version)
+
+        with self._lock:
+            self._expire()
+            existing = self._existing(key)
+            if existing is not None:
+                return existing
+
+        # Written outside the job lock so polling is not blocked by a large graph
+        filepath = self._snapshot_file(graph, version)
+
+        with self._lock:
+            self._expire(room=1)
+            existing = self._existing(key)
+            if existing is not None:
+                return existing
+            if len(self._jobs) >= self.max_jobs:
+                raise RuntimeError(f'{len(self._jobs)} analytics jobs are already queued or running, retry later')
+
+            job_id = uuid.uuid4().hex
+            self._jobs[job_id] = {
+                'kind': kind,
+                'params': params,
+                'graph_version': version,
+                'submitted_at': time.time(),
+                'future': self._get_executor().submit(run_analytics_job, kind, filepath, params),
+                'key': key
+            }
+            self._job_ids[key] = job_id
+            return self._describe(job_id)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Status of a job, with its result once finished
+
+        Args:
+            job_id: Id returned by submit
+
+        Returns:
+            Job description, or None if the job is unknown or expired
+        """
+        with self._lock:
+            self._expire()
+            if job_id not in self._jobs:
+                return None
+            return self._describe(job_id, include_result=True)
+
+    def stats(self) -> Dict[str, Any]:
+        """Number of retained jobs by status"""
+        with self._lock:
+            self._expire()
+            counts: Dict[str, int] = {}
+            for job_id in self._jobs:
+                status = self._status(self._jobs[job_id]['future'])
+                counts[status] = counts.get(status, 0) + 1
+            return {'jobs': len(self._jobs), 'by_status': counts,
+                    'snapshot_files': len(self._snapshot_files)}
+
+    def shutdown(self) -> None:
+        """Stop the worker processes and remove the job snapshot files"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        with self._snapshot_lock, self._lock:
+            for filepath in self._snapshot_files.values():
+                self._remove(filepath)
+            self._snapshot_files.clear()
+            self._orphans.clear()
+            if self._owns_snapshot_dir and self._snapshot_dir is not None:
+                shutil.rmtree(self._snapshot_dir, ignore_errors=True)
+                self._snapshot_dir = None
+
+    def _snapshot_file(self, graph: nx.DiGraph, version: int) -> str:
+        """
+        Snapshot file of a graph version, written on the first job submitted for it
+
+        Args:
+            graph: Frozen snapshot of the graph at ``version``
+            version: GraphStore version of the snapshot
+
+        Returns:
+            Path of the snapshot file
+        """
+        with self._snapshot_lock:
+            with self._lock:
+                filepath = self._snapshot_files.get(version)
+            if filepath is not None:
+                return filepath
+            if self._snapshot_dir is None:
+                self._snapshot_dir = tempfile.mkdtemp(prefix='analytics-jobs-')
+            metric_cache = self.graph_store.metric_cache
+            if metric_cache is not None:
+                # The store keeps a patched CSR for the current snapshot, so usually nothing is rebuilt
+                csr = metric_cache.get_or_compute(graph, 'csr_graph', lambda: CSRGraph.from_networkx(graph))
+            else:
+                csr = CSRGraph.from_networkx(graph)
+            filepath = os.path.join(self._snapshot_dir, f'graph-{version}.snapshot')
+            write_snapshot(csr, filepath, {'graph_version': version})
+            with self._lock:
+                self._snapshot_files[version] = filepath
+            return filepath
+
+    def _existing(self, key: tuple) -> Optional[Dict[str, Any]]:
+        """Identical job that has not failed, if one is retained; caller holds the lock"""
+        job_id = self._job_ids.get(key)
+        if job_id is not None and not self._failed(self._jobs[job_id]['future']):
+            return self._describe(job_id)
+        return None
+
+    def _expire(self, room: int = 0) -> None:
+        """
+        Drop superseded, old and excess jobs; caller holds the lock
+
+        Jobs for a superseded graph version are cancelled. Finished jobs are
+        also dropped once older than ``job_ttl``, and the oldest finished jobs
+        beyond ``max_jobs``, so results do not pile up while the graph is not
+        changing. Snapshot files no unfinished job needs are then removed.
+
+        Args:
+            room: Number of jobs about to be added, to make space for
+        """
+        version = self.graph_store.version
+        expired = [job_id for job_id, job in self._jobs.items() if job['graph_version'] != version]
+        cutoff = time.time() - self.job_ttl
+        finished = sorted((job_id for job_id, job in self._jobs.items()
+                           if job['graph_version'] == version and job['future'].done()),
+                          key=lambda job_id: self._jobs[job_id]['submitted_at'])
+        excess = len(self._jobs) - len(expired) + room - self.max_jobs
+        for i, job_id in enumerate(finished):
+            if i < excess or self._jobs[job_id]['submitted_at'] < cutoff:
+                expired.append(job_id)
+        for job_id in expired:
+            job = self._jobs.pop(job_id)
+            if not job['future'].cancel() and not job['future'].done():
+                self._orphans.append((job['graph_version'], job['future']))
+            if self._job_ids.get(job['key']) == job_id:
+                del self._job_ids[job['key']]
+
+        # A running worker may still be opening its snapshot file, so keep files until their jobs finish
+        self._orphans = [(job_version, future) for job_version, future in self._orphans if not future.done()]
+        needed = {job['graph_version'] for job in self._jobs.values() if not job['future'].done()}
+        needed.update(job_version for job_version, _ in self._orphans)
+        for file_version in [file_version for file_version in self._snapshot_files
+                             if file_version != version and file_version not in needed]:
+            self._remove(self._snapshot_files.pop(file_version))
+
+    @staticmethod
+    def _remove(filepath: str) -> None:
+        try:
+            os.remove(filepath)
+        except FileNotFoundError:
+            pass
+
+    def _describe(self, job_id: str, include_result: bool = False) -> Dict[str, Any]:
+        job = self._jobs[job_id]
+        future = job['future']
+        status = self._status(future)
+        description = {
+            'job_id': job_id,
+            'kind': job['kind'],
+            'params': job['params'],
+            'graph_version': job['graph_version'],
+            'submitted_at': job['submitted_at'],
+            'job_status': status
+        }
+        if include_result and status == 'finished':
+            description['result'] = future.result()
+        elif include_result and status == 'failed':
+            description['error'] = str(future.exception())
+        return description
+
+    @staticmethod
+    def _failed(future: Future) -> bool:
+        return future.done() and not future.cancelled() and future.exception() is not None
+
+    @staticmethod
+    def _status(future: Future) -> str:
+        if future.cancelled():
+            return 'cancelled'
+        if future.done():
+            return 'failed' if future.exception() is not None else 'finished'
+        return 'running' if future.running() else 'queued'
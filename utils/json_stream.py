@@ -0,0 +1,255 @@
+import json
+import zlib
+from typing import Any, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+
+# Fast encoders are optional; the standard library encoder is the fallback
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Characters read from the file per refill
+DEFAULT_READ_SIZE = 1 << 20
+
+# Bytes of encoded output collected before a chunk is handed to the response
+DEFAULT_CHUNK_SIZE = 1 << 16
+
+# Streaming output formats and the content encodings available for them, in order of preference
+STREAM_FORMATS = ('json', 'ndjson')
+SUPPORTED_ENCODINGS = (('br',) if brotli is not None else ()) + ('gzip',)
+
+_WHITESPACE = ' \t\n\r'
+
+
+class JsonStreamReader:
+    """Incremental reader for a top-level JSON object whose arrays may be huge
+
+    Items of the selected top-level arrays are decoded one at a time, so peak
+    memory is bounded by the largest single item plus the read buffer rather
+    than by the document size.
+    """
+
+    def __init__(self, f: TextIO, read_size: int = DEFAULT_READ_SIZE):
+        self.f = f
+        self.read_size = read_size
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+        self._decoder = json.JSONDecoder()
+
+    def iter_array_items(self, keys: Iterable[str]) -> Iterator[Tuple[str, Any]]:
+        """
+        Iterate over the items of selected top-level arrays
+
+        Args:
+            keys: Top-level keys whose array values should be streamed
+
+        Returns:
+            Iterator of (key, item) pairs in document order; all other
+            top-level values are decoded and discarded
+        """
+        keys = set(keys)
+        self._expect('{')
+        if self._peek() == '}':
+            self.pos += 1
+            return
+
+        while True:
+            key = self._decode_value()
+            if not isinstance(key, str):
+                raise ValueError('Expected a string key in JSON object')
+            self._expect(':')
+
+            if key in keys and self._peek() == '[':
+                self.pos += 1
+                if self._peek() == ']':
+                    self.pos += 1
+                else:
+                    while True:
+                        yield key, self._decode_value()
+                        if self._next_separator(']'):
+                            break
+            else:
+                self._decode_value()
+
+            if self._next_separator('}'):
+                return
+
+    def _fill(self) -> bool:
+        """Read the next block into the buffer, dropping consumed text"""
+        if self.eof:
+            return False
+        chunk = self.f.read(self.read_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def _peek(self) -> str:
+        """Return the next non-whitespace character without consuming it"""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                return ''
+
+    def _expect(self, char: str) -> None:
+        """Consume the given structural character or fail"""
+        found = self._peek()
+        if found != char:
+            raise ValueError(f"Expected '{char}' in JSON document, found '{found or 'end of file'}'")
+        self.pos += 1
+
+    def _next_separator(self, closing: str) -> bool:
+        """Consume ',' or the closing bracket; return True when the container ended"""
+        found = self._peek()
+        if found == ',':
+            self.pos += 1
+            return False
+        if found == closing:
+            self.pos += 1
+            return True
+        raise ValueError(f"Expected ',' or '{closing}' in JSON document, found '{found or 'end of file'}'")
+
+    def _decode_value(self) -> Any:
+        """Decode one JSON value, reading more input until it is complete"""
+        self._peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue
+                raise
+            # A value ending exactly at the buffer end may be a truncated number
+            if end == len(self.buffer) and self._fill():
+                continue
+            self.pos = end
+            return value
+
+
+def dumps(value: Any) -> bytes:
+    """Compact UTF-8 JSON for one value, with orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(value, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(value, separators=(',', ':')).encode('utf-8')
+
+
+def _is_array(value: Any) -> bool:
+    return isinstance(value, (list, tuple)) or (isinstance(value, Iterator) and not isinstance(value, dict))
+
+
+def iter_json(value: Any, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    Encode a response payload as JSON, piece by piece
+
+    Objects are written member by member and arrays item by item, each item
+    encoded whole. Arrays may be given as iterators, so items can be drawn
+    straight from graph iterators and never held in a list; only about
+    ``chunk_size`` bytes of output are buffered at a time.
+
+    Args:
+        value: Dict whose values may be lists, iterators or nested dicts
+        chunk_size: Buffered bytes per yielded chunk
+
+    Returns:
+        Iterator of byte chunks that concatenate to the JSON document
+    """
+    buffer = bytearray()
+
+    def write(value: Any) -> Iterator[bytes]:
+        nonlocal buffer
+        if isinstance(value, dict):
+            buffer += b'{'
+            for i, (key, member) in enumerate(value.items()):
+                buffer += (b',' if i else b'') + dumps(str(key)) + b':'
+                yield from write(member)
+            buffer += b'}'
+        elif _is_array(value):
+            buffer += b'['
+            for i, item in enumerate(value):
+                if i:
+                    buffer += b','
+                buffer += dumps(item)
+                if len(buffer) >= chunk_size:
+                    yield bytes(buffer)
+                    buffer = bytearray()
+            buffer += b']'
+        else:
+            buffer += dumps(value)
+
+    yield from write(value)
+    yield bytes(buffer)
+
+
+def iter_ndjson(value: Dict, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    Encode a response payload as newline-delimited JSON
+
+    The first line is the payload with its arrays left out. Every array item
+    follows on its own line as {"array": <dotted key path>, "item": <item>},
+    in payload order.
+
+    Args:
+        value: Dict whose values may be lists, iterators or nested dicts
+        chunk_size: Buffered bytes per yielded chunk
+
+    Returns:
+        Iterator of byte chunks, each ending on a line break
+    """
+    arrays: List[Tuple[str, Iterable]] = []
+
+    def split(value: Dict, path: str) -> Dict:
+        header = {}
+        for key, member in value.items():
+            if isinstance(member, dict):
+                header[key] = split(member, f'{path}{key}.')
+            elif _is_array(member):
+                arrays.append((f'{path}{key}', member))
+            else:
+                header[key] = member
+        return header
+
+    buffer = bytearray(dumps(split(value, '')) + b'\n')
+    for name, items in arrays:
+        for item in items:
+            buffer += dumps({'array': name, 'item': item}) + b'\n'
+            if len(buffer) >= chunk_size:
+                yield bytes(buffer)
+                buffer = bytearray()
+    yield bytes(buffer)
+
+
+def iter_compressed(chunks: Iterable[bytes], encoding: Optional[str]) -> Iterator[bytes]:
+    """
+    Compress a stream of chunks with a content encoding from SUPPORTED_ENCODINGS
+
+    Args:
+        chunks: Uncompressed byte chunks
+        encoding: 'br', 'gzip', or None to pass the chunks through
+
+    Returns:
+        Iterator of compressed byte chunks
+    """
+    if encoding is None:
+        yield from chunks
+        return
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=4)
+        compress, finish = compressor.process, compressor.finish
+    else:
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        compress, finish = compressor.compress, compressor.flush
+    for chunk in chunks:
+        compressed = compress(chunk)
+        if compressed:
+            yield compressed
+    yield finish()
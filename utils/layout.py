@@ -0,0 +1,172 @@
+import threading
+from typing import Any, Dict, Hashable
+
+import numpy as np
+
+from utils.csr_graph import CSRGraph
+
+# Force-directed iterations for a layout from scratch and for relaxing changed nodes
+LAYOUT_ITERATIONS = 50
+INCREMENTAL_ITERATIONS = 30
+
+# Nodes each node is repelled by per iteration; larger graphs sample this many, scaled up
+REPULSION_SAMPLE_SIZE = 512
+
+# Fixed seed so every viewer and every restart sees the same layout
+LAYOUT_SEED = 42
+
+# Pairwise repulsion terms evaluated at once, bounding temporary memory
+REPULSION_BLOCK = 1 << 18
+
+
+class LayoutEngine:
+    """Server-side force-directed layout with incremental relayout
+
+    Positions are Fruchterman-Reingold coordinates in the unit square,
+    computed with NumPy over the CSR arrays. Repulsion is exact for small
+    graphs and estimated from a fixed-size sample of nodes for large ones,
+    so an iteration costs O(N * REPULSION_SAMPLE_SIZE + E). Positions persist
+    between calls: nodes that are new, or whose degree changed since the
+    previous layout, are relaxed while every other node stays where it was.
+    """
+
+    def __init__(self, iterations: int = LAYOUT_ITERATIONS, incremental_iterations: int = INCREMENTAL_ITERATIONS,
+                 sample_size: int = REPULSION_SAMPLE_SIZE, seed: int = LAYOUT_SEED):
+        self.iterations = iterations
+        self.incremental_iterations = incremental_iterations
+        self.sample_size = sample_size
+        self.seed = seed
+        self._index: Dict[Hashable, int] = {}
+        self._positions = np.zeros((0, 2))
+        self._degrees = np.zeros(0, dtype=np.int64)
+        self._lock = threading.Lock()
+        self.last_moved = 0
+        self.total_layouts = 0
+
+    def update(self, csr: CSRGraph) -> np.ndarray:
+        """
+        Lay the graph out, relaxing only nodes touched since the last call
+
+        Args:
+            csr: Graph in CSR form
+
+        Returns:
+            Array of shape (num_nodes, 2) with x, y in [0, 1] per node id
+        """
+        with self._lock:
+            num_nodes = csr.number_of_nodes()
+            degrees = csr.in_degree() + csr.out_degree()
+            rng = np.random.default_rng(self.seed)
+
+            previous = np.fromiter((self._index.get(node, -1) for node in csr.nodes), dtype=np.int64, count=num_nodes)
+            known = previous >= 0
+            positions = np.empty((num_nodes, 2))
+            positions[known] = self._positions[previous[known]]
+            movable = ~known
+            movable[known] = degrees[known] != self._degrees[previous[known]]
+
+            self._place_new_nodes(csr, positions, known, rng)
+            if movable.any():
+                iterations = self.iterations if not known.any() else self.incremental_iterations
+                self._relax(csr, positions, movable, iterations, rng)
+
+            self._index = dict(csr.node_index)
+            self._positions = positions
+            self._degrees = degrees
+            self.last_moved = int(movable.sum())
+            self.total_layouts += 1
+            return positions.copy()
+
+    def stats(self) -> Dict[str, Any]:
+        """Size of the stored layout and how many nodes the last update moved"""
+        return {
+            'nodes': len(self._index),
+            'last_moved': self.last_moved,
+            'total_layouts': self.total_layouts
+        }
+
+    @staticmethod
+    def _place_new_nodes(csr: CSRGraph, positions: np.ndarray, known: np.ndarray, rng: np.random.Generator) -> None:
+        """
+        Start new nodes at the mean of their already placed neighbors, or at random
+
+        Args:
+            csr: Graph in CSR form
+            positions: Array of shape (num_nodes, 2), filled in for new nodes
+            known: Mask of nodes that already had a position
+            rng: Random generator for starting points and jitter
+        """
+        new = np.flatnonzero(~known)
+        if len(new) == 0:
+            return
+        positions[new] = rng.random((len(new), 2))
+        if not known.any():
+            return
+
+        sources, targets = csr.edge_arrays()
+        # Edges from a placed node to a new one, in both directions
+        ends = np.concatenate((targets, sources))
+        anchors = np.concatenate((sources, targets))
+        useful = ~known[ends] & known[anchors]
+        ends, anchors = ends[useful], anchors[useful]
+        counts = np.bincount(ends, minlength=len(known))
+        placed = np.flatnonzero(counts)
+        for axis in range(2):
+            sums = np.bincount(ends, weights=positions[anchors, axis], minlength=len(known))
+            # Small jitter keeps nodes with the same neighbors apart
+            positions[placed, axis] = sums[placed] / counts[placed] + (rng.random(len(placed)) - 0.5) * 0.01
+
+    def _relax(self, csr: CSRGraph, positions: np.ndarray, movable: np.ndarray, iterations: int,
+               rng: np.random.Generator) -> None:
+        """
+        Fruchterman-Reingold iterations that move only the movable nodes
+
+        Args:
+            csr: Graph in CSR form
+            positions: Array of shape (num_nodes, 2), updated in place
+            movable: Mask of nodes that may move
+            iterations: Number of iterations to run
+            rng: Random generator for the repulsion sample
+        """
+        num_nodes = csr.number_of_nodes()
+        k = np.sqrt(1.0 / num_nodes)
+        moving = np.flatnonzero(movable)
+
+        sources, targets = csr.edge_arrays()
+        # Only edges with a moving endpoint pull on anything that can move
+        pulling = movable[sources] | movable[targets]
+        sources, targets = sources[pulling], targets[pulling]
+
+        temperature = 0.1
+        cooling = temperature / (iterations + 1)
+        for _ in range(iterations):
+            if num_nodes <= self.sample_size:
+                sample, scale = np.arange(num_nodes), 1.0
+            else:
+                sample = rng.choice(num_nodes, self.sample_size, replace=False)
+                scale = num_nodes / self.sample_size
+
+            displacement = np.zeros((len(moving), 2))
+            sample_x, sample_y = positions[sample, 0], positions[sample, 1]
+            block = max(1, REPULSION_BLOCK // len(sample))
+            for start in range(0, len(moving), block):
+                rows = moving[start:start + block]
+                dx = positions[rows, 0, None] - sample_x
+                dy = positions[rows, 1, None] - sample_y
+                strength = (k * k * scale) / np.maximum(dx * dx + dy * dy, 1e-9)
+                displacement[start:start + block, 0] = np.einsum('ij,ij->i', dx, strength)
+                displacement[start:start + block, 1] = np.einsum('ij,ij->i', dy, strength)
+
+            delta = positions[sources] - positions[targets]
+            distance = np.sqrt(np.einsum('ij,ij->i', delta, delta))
+            pull = delta * (distance / k)[:, None]
+            attraction = np.empty((num_nodes, 2))
+            for axis in range(2):
+                attraction[:, axis] = (np.bincount(targets, weights=pull[:, axis], minlength=num_nodes)
+                                       - np.bincount(sources, weights=pull[:, axis], minlength=num_nodes))
+            displacement += attraction[moving]
+
+            length = np.maximum(np.sqrt(np.einsum('ij,ij->i', displacement, displacement)), 1e-9)
+            positions[moving] = np.clip(positions[moving] + displacement * (np.minimum(length, temperature) / length)[:, None],
+                                        0.0, 1.0)
+            temperature -= cooling
@@ -0,0 +1,114 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+import networkx as nx
+
+
+class MetricCache:
+    """Version-keyed cache for expensive graph metrics
+
+    The cache tracks a single graph. Every mutation of that graph must call
+    ``bump_version``, or a new immutable snapshot must be bound with ``bind``;
+    either drops all cached results. Between mutations repeated requests for
+    PageRank, betweenness, clustering, etc. are dictionary lookups. Results
+    for any other graph object (subgraphs, copies) are never cached.
+    """
+
+    def __init__(self, graph: nx.DiGraph = None, max_entries: int = 64):
+        self.graph = graph
+        self.max_entries = max_entries
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[Tuple, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def bind(self, graph: nx.DiGraph, version: int = None) -> None:
+        """Track a different graph object and drop everything cached so far"""
+        with self._lock:
+            self.graph = graph
+            self.version = version if version is not None else self.version + 1
+            self._entries.clear()
+
+    def bump_version(self) -> int:
+        """Record a mutation of the tracked graph and invalidate cached metrics"""
+        with self._lock:
+            self.version += 1
+            self._entries.clear()
+            return self.version
+
+    def tracks(self, graph: nx.DiGraph) -> bool:
+        """Check whether results for this graph object may be cached"""
+        return graph is not None and graph is self.graph
+
+    def get_or_compute(self, graph: nx.DiGraph, name: str, compute: Callable[[], Any], **params: Hashable) -> Any:
+        """
+        Return a cached metric or compute and store it
+
+        Args:
+            graph: Graph the metric is computed on
+            name: Metric name, e.g. 'pagerank'
+            compute: Zero-argument callable producing the metric
+            **params: Hashable parameters that distinguish variants of the metric
+
+        Returns:
+            The cached or freshly computed metric value
+        """
+        if not self.tracks(graph):
+            return compute()
+
+        with self._lock:
+            version = self.version
+            key = (version, name, tuple(sorted(params.items())))
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+
+        # Compute outside the lock so slow metrics do not block lookups
+        value = compute()
+
+        with self._lock:
+            # Drop the result if the graph changed while it was being computed
+            if version == self.version:
+                self._entries[key] = value
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+
+        return value
+
+    def peek(self, graph: nx.DiGraph, name: str, **params: Hashable) -> Any:
+        """Cached metric for the tracked graph, or None; does not count as a lookup"""
+        if not self.tracks(graph):
+            return None
+        with self._lock:
+            return self._entries.get((self.version, name, tuple(sorted(params.items()))))
+
+    def put(self, graph: nx.DiGraph, name: str, value: Any, **params: Hashable) -> None:
+        """Store a metric computed elsewhere for the tracked graph"""
+        if not self.tracks(graph):
+            return
+        with self._lock:
+            self._entries[(self.version, name, tuple(sorted(params.items())))] = value
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and current occupancy"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'graph_version': self.version,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups > 0 else 0.0
+            }
@@ -0,0 +1,215 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+# Seconds between background fsyncs; 0 makes every writer wait for its record to be synced
+DEFAULT_SYNC_INTERVAL = 0
+
+# Bytes hashed per read when archiving a file that log records refer to
+ARCHIVE_BLOCK_SIZE = 1 << 20
+
+
+def archive_file(filepath: str, directory: str) -> Tuple[str, str]:
+    """
+    Move a file a log record will refer to under an immutable, content-addressed name
+
+    A record that only names a file is replayed with whatever the file holds
+    at recovery time, so the file is renamed after its SHA-256 digest: a
+    later file can never take its place, and identical files share one copy.
+    The archived file is fsynced before the record referring to it is
+    written.
+
+    Args:
+        filepath: File to archive; it is moved, not copied
+        directory: Archive directory
+
+    Returns:
+        Tuple of (archived path, hex SHA-256 digest)
+    """
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for block in iter(lambda: f.read(ARCHIVE_BLOCK_SIZE), b''):
+            digest.update(block)
+    extension = os.path.splitext(filepath)[1].lower()
+    os.makedirs(directory, exist_ok=True)
+    archived = os.path.join(directory, digest.hexdigest() + extension)
+    if os.path.exists(archived):
+        os.remove(filepath)
+    else:
+        shutil.move(filepath, archived)
+        with open(archived, 'rb') as f:
+            os.fsync(f.fileno())
+    return archived, digest.hexdigest()
+
+
+class MutationLog:
+    """Append-only JSON Lines write-ahead log of graph mutations
+
+    Every mutating endpoint appends one record (sequence number, operation
+    name and parameters) from inside its GraphStore mutation, so records are
+    in the order mutations were applied. Appends only write to the file
+    buffer; ``commit`` makes them durable. Commits are grouped: one fsync
+    covers every record appended before it, so concurrent writers share
+    syncs, and with a sync interval a background thread syncs instead and
+    writers do not wait at all.
+
+    On startup the records after the latest snapshot's log position are
+    replayed, and ``truncate`` compacts the log once a snapshot covers it.
+    Operations must be idempotent in order: replaying records a snapshot
+    already reflects has to leave the same graph.
+    """
+
+    def __init__(self, filepath: str, sync_interval: float = DEFAULT_SYNC_INTERVAL):
+        self.filepath = filepath
+        self.sync_interval = sync_interval
+        self.seq = 0
+        self.synced_seq = 0
+        self.syncs = 0
+        self.records_retained = 0
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        directory = os.path.dirname(os.path.abspath(filepath))
+        os.makedirs(directory, exist_ok=True)
+        for record in self.replay():
+            self.seq = record['seq']
+            self.records_retained += 1
+        self.synced_seq = self.seq
+        self._file = open(filepath, 'a', encoding='utf-8')
+
+        if sync_interval > 0:
+            self._thread = threading.Thread(target=self._run, name='mutation-log-sync', daemon=True)
+            self._thread.start()
+
+    def append(self, op: str, params: Dict[str, Any]) -> int:
+        """
+        Append a mutation record; call from inside the mutation it describes
+
+        Args:
+            op: Operation name
+            params: JSON-serializable operation parameters
+
+        Returns:
+            The record's sequence number
+        """
+        with self._lock:
+            seq = self.seq + 1
+            self._file.write(json.dumps({'seq': seq, 'op': op, 'params': params}) + '\n')
+            self.seq = seq
+            self.records_retained += 1
+            return seq
+
+    def resume_after(self, seq: int) -> None:
+        """
+        Continue numbering after a snapshot's log position
+
+        Compaction can leave the log empty, or holding only records older
+        than the snapshot, so the position read back from the file alone
+        may be behind the snapshot. New records must be numbered past it or
+        replay would skip them as already covered.
+
+        Args:
+            seq: Last sequence number the loaded snapshot covers
+        """
+        with self._lock:
+            if seq > self.seq:
+                self.seq = seq
+                self.synced_seq = max(self.synced_seq, seq)
+
+    def commit(self) -> None:
+        """Make appended records durable before acknowledging them, unless a background thread syncs"""
+        if self.sync_interval <= 0:
+            self.sync()
+
+    def sync(self) -> None:
+        """Flush and fsync every record appended so far"""
+        with self._sync_lock:
+            with self._lock:
+                if self.synced_seq >= self.seq:
+                    return
+                self._file.flush()
+                seq = self.seq
+            # Appends may continue while the disk catches up; they are covered by the next sync
+            os.fsync(self._file.fileno())
+            self.synced_seq = seq
+            self.syncs += 1
+
+    def replay(self, since: int = 0) -> Iterator[Dict[str, Any]]:
+        """
+        Records after a sequence number, in order
+
+        Args:
+            since: Last sequence number already reflected in the graph
+
+        Returns:
+            Iterator of {'seq', 'op', 'params'} records
+        """
+        if not os.path.exists(self.filepath):
+            return
+        with open(self.filepath, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # A crash can leave the last line half written; it was never acknowledged
+                    continue
+                if record['seq'] > since:
+                    yield record
+
+    def truncate(self, through: int) -> int:
+        """
+        Compact the log by dropping records a snapshot already covers
+
+        Args:
+            through: Last sequence number included in the snapshot
+
+        Returns:
+            Number of records dropped
+        """
+        with self._sync_lock, self._lock:
+            self._file.flush()
+            kept = [record for record in self.replay(through)]
+            temp_path = f'{self.filepath}.tmp'
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                f.writelines(json.dumps(record) + '\n' for record in kept)
+                f.flush()
+                os.fsync(f.fileno())
+            self._file.close()
+            os.replace(temp_path, self.filepath)
+            self._file = open(self.filepath, 'a', encoding='utf-8')
+            dropped = self.records_retained - len(kept)
+            self.records_retained = len(kept)
+            self.synced_seq = self.seq
+            return dropped
+
+    def close(self) -> None:
+        """Sync outstanding records and stop the background thread"""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.sync()
+        self._file.close()
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.sync_interval):
+            try:
+                self.sync()
+            except Exception as e:
+                print(f"Error syncing mutation log: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Log position, durability and size counters"""
+        return {
+            'path': self.filepath,
+            'seq': self.seq,
+            'synced_seq': self.synced_seq,
+            'syncs': self.syncs,
+            'records_retained': self.records_retained,
+            'sync_interval': self.sync_interval
+        }
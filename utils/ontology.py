@@ -0,0 +1,102 @@
+import numpy as np
+import rdflib
+from rdflib.namespace import RDFS
+from typing import FrozenSet, Iterable, Tuple
+
+# Namespace of the social media ontology in ontology.owl
+ONTOLOGY_NAMESPACE = 'http://example.org/socialmedia#'
+
+# Content class of the ontology, and the class of its authors. The graph has no
+# post nodes: a like or share of a post is an edge to the user who wrote it.
+CONTENT_CLASS = 'Post'
+AUTHOR_CLASS = 'User'
+
+
+class OntologyValidator:
+    """Relationship validation against the ontology's domain/range rules
+
+    The ontology is read once and every property with both an rdfs:domain and
+    an rdfs:range is compiled into a frozen set of
+    ``(source_class, relation, target_class)`` triples. Validating an edge is
+    then a set lookup instead of triple-store queries.
+
+    Relations whose range is CONTENT_CLASS (likes, shares, creates) also
+    accept an AUTHOR_CLASS target, which stands for that user's content.
+    """
+
+    def __init__(self, rules: Iterable[Tuple[str, str, str]]):
+        rules = set(rules)
+        rules.update((source_class, relation, AUTHOR_CLASS)
+                     for source_class, relation, target_class in list(rules) if target_class == CONTENT_CLASS)
+        self.rules: FrozenSet[Tuple[str, str, str]] = frozenset(rules)
+
+    @classmethod
+    def from_file(cls, filepath: str, namespace: str = ONTOLOGY_NAMESPACE) -> 'OntologyValidator':
+        """
+        Compile the validation table from a Turtle ontology file
+
+        Args:
+            filepath: Path to the ontology file
+            namespace: Namespace whose properties and classes are used
+
+        Returns:
+            OntologyValidator holding the compiled rules
+        """
+        ontology = rdflib.Graph()
+        ontology.parse(filepath, format='turtle')
+
+        def local_name(term) -> str:
+            return str(term).split('#')[-1]
+
+        rules = []
+        for relation, domain in ontology.subject_objects(RDFS.domain):
+            if not str(relation).startswith(namespace):
+                continue
+            for range_ in ontology.objects(relation, RDFS.range):
+                rules.append((local_name(domain), local_name(relation), local_name(range_)))
+        return cls(rules)
+
+    def validate(self, source_type: str, relation: str, target_type: str) -> bool:
+        """
+        Check a single relationship
+
+        Args:
+            source_type: Ontology class of the source, e.g. 'User'
+            relation: Relationship type, e.g. 'follows'
+            target_type: Ontology class of the target
+
+        Returns:
+            True if the ontology allows the relationship
+        """
+        return (source_type, relation, target_type) in self.rules
+
+    def valid_mask(self, source_node_types: np.ndarray, relations: np.ndarray,
+                   target_node_types: np.ndarray) -> np.ndarray:
+        """
+        Validate many relationships at once
+
+        Node types are given as stored on graph nodes ('user') and are mapped
+        to ontology classes ('User') the same way as for single edges.
+
+        Args:
+            source_node_types: Array of source node types
+            relations: Array of relationship types
+            target_node_types: Array of target node types
+
+        Returns:
+            Boolean array, True where the relationship is allowed
+        """
+        source_classes = self._node_classes(source_node_types)
+        target_classes = self._node_classes(target_node_types)
+
+        # The rule table is tiny, so one vectorized comparison per rule is cheapest
+        mask = np.zeros(len(relations), dtype=bool)
+        for source_class, relation, target_class in self.rules:
+            mask |= (relations == relation) & (source_classes == source_class) & (target_classes == target_class)
+        return mask
+
+    @staticmethod
+    def _node_classes(node_types: np.ndarray) -> np.ndarray:
+        """Capitalize node types once per distinct value"""
+        distinct, inverse = np.unique(np.asarray(node_types, dtype=object).astype(str), return_inverse=True)
+        return np.array([node_type.capitalize() for node_type in distinct], dtype=object)[inverse]
@@ -0,0 +1,126 @@
+import threading
+import networkx as nx
+import numpy as np
+from typing import Any, Dict, Optional
+
+from utils.csr_graph import CSRGraph
+
+
+class PageRankEngine:
+    """Sparse power-iteration PageRank that warm-starts from its last solution
+
+    The transition matrix is a ``scipy.sparse`` CSR matrix built from the
+    CSRGraph arrays. Edge weights are normalized per source node and nodes
+    without out-weight spread their rank uniformly, as in ``nx.pagerank``.
+    After a small mutation the previous vector is already close to the new
+    fixed point, so the solve converges in a handful of iterations instead
+    of starting from the uniform vector.
+    """
+
+    def __init__(self, alpha: float = 0.85, max_iter: int = 100, tol: float = 1.0e-6):
+        self.alpha = alpha
+        self.max_iter = max_iter
+        self.tol = tol
+        self.last_iterations = 0
+        self.last_residual = 0.0
+        self.last_warm_start = False
+        self.total_solves = 0
+        # Previous solution per weighting mode: (node handles, PageRank vector)
+        self._previous: Dict[bool, Any] = {}
+        self._lock = threading.Lock()
+
+    def compute(self, csr: CSRGraph, weighted: bool = True, warm_start: bool = True) -> np.ndarray:
+        """
+        Compute PageRank for a CSR graph
+
+        Args:
+            csr: Graph to rank
+            weighted: Use edge weights, otherwise every edge counts as 1
+            warm_start: Start from the previous solution where nodes overlap
+
+        Returns:
+            PageRank vector indexed by node id
+        """
+        num_nodes = csr.number_of_nodes()
+        if num_nodes == 0:
+            return np.zeros(0, dtype=np.float64)
+
+        with self._lock:
+            previous = self._previous.get(weighted) if warm_start else None
+        nstart = self._initial_vector(csr, previous)
+
+        x, iterations, residual = self.solve(csr, weighted, nstart)
+
+        with self._lock:
+            self._previous[weighted] = (csr.nodes, x)
+            self.last_iterations = iterations
+            self.last_residual = residual
+            self.last_warm_start = nstart is not None
+            self.total_solves += 1
+
+        return x
+
+    def solve(self, csr: CSRGraph, weighted: bool = True, nstart: Optional[np.ndarray] = None):
+        """
+        Run the power iteration
+
+        Args:
+            csr: Graph to rank
+            weighted: Use edge weights, otherwise every edge counts as 1
+            nstart: Optional starting vector indexed by node id
+
+        Returns:
+            Tuple of (PageRank vector, iterations, final L1 residual)
+        """
+        num_nodes = csr.number_of_nodes()
+        transition, dangling = csr.transition_matrix(weighted)
+
+        if nstart is None:
+            x = np.full(num_nodes, 1.0 / num_nodes)
+        else:
+            x = nstart / nstart.sum()
+
+        teleport = (1 - self.alpha) / num_nodes
+        residual = 0.0
+        for iteration in range(1, self.max_iter + 1):
+            x_last = x
+            x = self.alpha * (transition @ x_last + x_last[dangling].sum() / num_nodes) + teleport
+            residual = float(np.abs(x - x_last).sum())
+            if residual < num_nodes * self.tol:
+                return x, iteration, residual
+        raise nx.PowerIterationFailedConvergence(self.max_iter)
+
+    def _initial_vector(self, csr: CSRGraph, previous) -> Optional[np.ndarray]:
+        """Map the previous solution onto the current node ids; new nodes start at 1/N"""
+        if previous is None:
+            return None
+        previous_nodes, previous_x = previous
+        num_nodes = csr.number_of_nodes()
+        nstart = np.full(num_nodes, 1.0 / num_nodes)
+
+        # Nodes are only appended between mutations, so the old ids are usually a prefix
+        if len(previous_nodes) <= num_nodes and csr.nodes[:len(previous_nodes)] == previous_nodes:
+            nstart[:len(previous_nodes)] = previous_x
+            return nstart
+
+        old_ids = []
+        new_ids = []
+        for old_id, node in enumerate(previous_nodes):
+            new_id = csr.node_index.get(node)
+            if new_id is not None:
+                old_ids.append(old_id)
+                new_ids.append(new_id)
+        if not new_ids:
+            return None
+        nstart[new_ids] = previous_x[old_ids]
+        return nstart
+
+    def stats(self) -> Dict[str, Any]:
+        """Iteration count and residual of the last solve, for monitoring"""
+        with self._lock:
+            return {
+                'iterations': self.last_iterations,
+                'residual': self.last_residual,
+                'warm_start': self.last_warm_start,
+                'total_solves': self.total_solves
+            }
@@ -0,0 +1,280 @@
+import math
+import os
+import random
+import threading
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from heapq import heappop, heappush
+from itertools import count
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from utils.centrality import BETWEENNESS_SEED
+from utils.csr_graph import CSRGraph
+
+# Below this many nodes the cost of starting tasks outweighs the parallel speedup
+PARALLEL_MIN_NODES = 1000
+
+# Source chunks per worker; more chunks even out the uneven per-source cost
+CHUNKS_PER_WORKER = 4
+
+# (dtype, length, byte offset) of each array inside a shared memory block
+ArrayLayout = List[Tuple[str, int, int]]
+
+# Adjacency lists of the most recently attached graph in a worker process
+_worker_graph: Dict[str, Tuple[list, list, list]] = {}
+
+
+def _share_arrays(arrays: Sequence[np.ndarray]) -> Tuple[shared_memory.SharedMemory, ArrayLayout]:
+    """Copy arrays into one shared memory block"""
+    layout: ArrayLayout = []
+    offset = 0
+    for array in arrays:
+        # Keep every array 8-byte aligned
+        offset = (offset + 7) // 8 * 8
+        layout.append((array.dtype.str, len(array), offset))
+        offset += array.nbytes
+    block = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+    for array, (dtype, length, start) in zip(arrays, layout):
+        np.ndarray(length, dtype=dtype, buffer=block.buf, offset=start)[:] = array
+    return block, layout
+
+
+def _attach_graph(block_name: str, layout: ArrayLayout) -> Tuple[list, list, list]:
+    """Adjacency lists of a shared graph, converted once per worker process"""
+    if block_name not in _worker_graph:
+        block = shared_memory.SharedMemory(name=block_name)
+        try:
+            graph = tuple(np.ndarray(length, dtype=dtype, buffer=block.buf, offset=start).tolist()
+                          for dtype, length, start in layout)
+        finally:
+            block.close()
+        _worker_graph.clear()
+        _worker_graph[block_name] = graph
+    return _worker_graph[block_name]
+
+
+def _brandes(indptr: list, indices: list, weights: Optional[list], num_nodes: int,
+             sources: Sequence[int]) -> np.ndarray:
+    """
+    Unnormalized betweenness contributions of the given sources
+
+    Follows networkx's BFS and Dijkstra accumulation step by step so that the
+    sums come out the same.
+    """
+    betweenness = [0.0] * num_nodes
+    for s in sources:
+        S = []
+        P = [[] for _ in range(num_nodes)]
+        sigma = [0.0] * num_nodes
+        sigma[s] = 1.0
+        if weights is None:
+            D = [-1] * num_nodes
+            D[s] = 0
+            Q = deque([s])
+            while Q:
+                v = Q.popleft()
+                S.append(v)
+                Dv = D[v]
+                sigmav = sigma[v]
+                for w in indices[indptr[v]:indptr[v + 1]]:
+                    if D[w] < 0:
+                        Q.append(w)
+                        D[w] = Dv + 1
+                    if D[w] == Dv + 1:
+                        sigma[w] += sigmav
+                        P[w].append(v)
+        else:
+            done = [False] * num_nodes
+            seen = {s: 0}
+            c = count()
+            heap = [(0, next(c), s, s)]
+            while heap:
+                dist, _, pred, v = heappop(heap)
+                if done[v]:
+                    continue
+                sigma[v] += sigma[pred]
+                S.append(v)
+                done[v] = True
+                for e in range(indptr[v], indptr[v + 1]):
+                    w = indices[e]
+                    vw_dist = dist + weights[e]
+                    if not done[w] and (w not in seen or vw_dist < seen[w]):
+                        seen[w] = vw_dist
+                        heappush(heap, (vw_dist, next(c), v, w))
+                        sigma[w] = 0.0
+                        P[w] = [v]
+                    elif vw_dist == seen[w]:
+                        sigma[w] += sigma[v]
+                        P[w].append(v)
+
+        delta = [0.0] * num_nodes
+        while S:
+            w = S.pop()
+            coeff = (1 + delta[w]) / sigma[w]
+            for v in P[w]:
+                delta[v] += sigma[v] * coeff
+            if w != s:
+                betweenness[w] += delta[w]
+    return np.array(betweenness, dtype=np.float64)
+
+
+def _closeness(indptr: list, indices: list, num_nodes: int, sources: Sequence[int]) -> np.ndarray:
+    """Closeness of the given nodes from BFS over their in-edges, as networkx computes it"""
+    closeness = np.zeros(len(sources), dtype=np.float64)
+    for i, s in enumerate(sources):
+        dist = [-1] * num_nodes
+        dist[s] = 0
+        queue = deque([s])
+        reached = 0
+        total = 0
+        while queue:
+            v = queue.popleft()
+            reached += 1
+            total += dist[v]
+            for w in indices[indptr[v]:indptr[v + 1]]:
+                if dist[w] < 0:
+                    dist[w] = dist[v] + 1
+                    queue.append(w)
+        if total > 0.0 and num_nodes > 1:
+            closeness[i] = (reached - 1.0) / total * ((reached - 1.0) / (num_nodes - 1))
+    return closeness
+
+
+def _betweenness_task(block_name: str, layout: ArrayLayout, num_nodes: int, weighted: bool,
+                      sources: List[int]) -> np.ndarray:
+    indptr, indices, weights = _attach_graph(block_name, layout)
+    return _brandes(indptr, indices, weights if weighted else None, num_nodes, sources)
+
+
+def _closeness_task(block_name: str, layout: ArrayLayout, num_nodes: int, sources: List[int]) -> np.ndarray:
+    indptr, indices, _ = _attach_graph(block_name, layout)
+    return _closeness(indptr, indices, num_nodes, sources)
+
+
+def rescale_betweenness(betweenness: np.ndarray, sampled: Optional[Sequence[int]] = None) -> np.ndarray:
+    """
+    Normalize directed betweenness the way nx.betweenness_centrality does
+
+    Args:
+        betweenness: Unnormalized sums over the processed sources
+        sampled: Pivot node ids when only a sample of sources was processed
+
+    Returns:
+        Normalized betweenness, scaled up from the sample if one was used
+    """
+    n = len(betweenness) - 1
+    if n < 2:
+        return betweenness
+    if sampled is None:
+        return betweenness * (1 / (n * (n - 1)))
+
+    k = len(sampled)
+    scale = np.full(len(betweenness), 1 / (k * (n - 1)))
+    # Sampled sources cannot lie on their own paths, so they average over one pivot fewer
+    scale[np.asarray(sampled, dtype=np.int64)] = 1 / ((k - 1) * (n - 1)) if k > 1 else math.nan
+    return betweenness * scale
+
+
+class CentralityEngine:
+    """Exact path-based centralities computed in parallel over source nodes
+
+    Betweenness (Brandes) and closeness both run one shortest-path search per
+    source node. The sources are split into chunks that a ProcessPoolExecutor
+    works through, which sidesteps the GIL. The graph is handed to workers
+    once per computation as CSR arrays in a shared memory block rather than
+    pickled per task, and the partial betweenness vectors are summed at the
+    end. The per-source kernels replicate networkx's, so results match
+    nx.betweenness_centrality and nx.closeness_centrality up to floating
+    point summation order.
+    """
+
+    def __init__(self, max_workers: int = None, min_nodes: int = PARALLEL_MIN_NODES):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.min_nodes = min_nodes
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> Executor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            return self._executor
+
+    def _parallel(self, num_nodes: int) -> bool:
+        return self.max_workers > 1 and num_nodes >= self.min_nodes
+
+    def _run(self, task, arrays: Sequence[np.ndarray], num_nodes: int, sources: List[int],
+             *args) -> Tuple[List[List[int]], List[np.ndarray]]:
+        """Run a task over interleaved chunks of sources in the pool"""
+        num_chunks = min(len(sources), self.max_workers * CHUNKS_PER_WORKER)
+        chunks = [sources[i::num_chunks] for i in range(num_chunks)]
+        block, layout = _share_arrays(arrays)
+        try:
+            executor = self._get_executor()
+            futures = [executor.submit(task, block.name, layout, num_nodes, *args, chunk) for chunk in chunks]
+            return chunks, [future.result() for future in futures]
+        finally:
+            block.close()
+            block.unlink()
+
+    def betweenness(self, csr: CSRGraph, k: int = None, weighted: bool = False,
+                    seed: int = BETWEENNESS_SEED) -> np.ndarray:
+        """
+        Exact or k-pivot sampled betweenness centrality
+
+        Args:
+            csr: Graph in CSR form
+            k: Number of pivot nodes to sample, None for the exact algorithm
+            weighted: Use edge weights as distances (Dijkstra) instead of hop counts
+            seed: Random seed for pivot selection, as networkx uses it
+
+        Returns:
+            Normalized betweenness per node id
+        """
+        num_nodes = csr.number_of_nodes()
+        if k == num_nodes:
+            k = None
+        # Same pivots as nx.betweenness_centrality(seed=seed)
+        sampled = None if k is None else [csr.node_index[node] for node in random.Random(seed).sample(csr.nodes, k)]
+        sources = list(range(num_nodes)) if sampled is None else sampled
+
+        if not self._parallel(num_nodes):
+            weights = csr.out_weights.tolist() if weighted else None
+            betweenness = _brandes(csr.out_indptr.tolist(), csr.out_indices.tolist(), weights, num_nodes, sources)
+        else:
+            arrays = (csr.out_indptr, csr.out_indices, csr.out_weights)
+            _, partials = self._run(_betweenness_task, arrays, num_nodes, sources, weighted)
+            betweenness = np.sum(partials, axis=0)
+        return rescale_betweenness(betweenness, sampled)
+
+    def closeness(self, csr: CSRGraph) -> np.ndarray:
+        """
+        Closeness centrality from incoming distances, as nx.closeness_centrality
+
+        Args:
+            csr: Graph in CSR form
+
+        Returns:
+            Closeness per node id
+        """
+        num_nodes = csr.number_of_nodes()
+        sources = list(range(num_nodes))
+        if not self._parallel(num_nodes):
+            return _closeness(csr.in_indptr.tolist(), csr.in_indices.tolist(), num_nodes, sources)
+
+        arrays = (csr.in_indptr, csr.in_indices, csr.in_weights)
+        chunks, partials = self._run(_closeness_task, arrays, num_nodes, sources)
+        closeness = np.zeros(num_nodes, dtype=np.float64)
+        for chunk, values in zip(chunks, partials):
+            closeness[chunk] = values
+        return closeness
+
+    def shutdown(self) -> None:
+        """Stop the worker processes"""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
@@ -0,0 +1,308 @@
+import json
+import os
+import struct
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+from utils.csr_graph import CSRGraph
+from utils.graph_store import GraphStore
+from utils.mutation_log import MutationLog
+
+# File signature and format version, checked before anything else is read
+SNAPSHOT_MAGIC = b'SMIGSNAP'
+SNAPSHOT_FORMAT_VERSION = 1
+
+# Arrays start on page-friendly boundaries so each one can be memory-mapped directly
+SNAPSHOT_ALIGNMENT = 64
+
+# CSRGraph arrays stored in a snapshot, in file order
+SNAPSHOT_ARRAYS = ('out_indptr', 'out_indices', 'out_weights', 'out_type_codes',
+                   'in_indptr', 'in_indices', 'in_weights', 'in_type_codes',
+                   'follower_count', 'engagement_score', 'node_type_codes', 'niche_codes')
+
+# Retained log records that trigger a background snapshot and compaction; 0 disables the threshold
+DEFAULT_MAX_LOG_RECORDS = 10000
+
+# Magic, then the little-endian byte length of the JSON header that follows it
+_PREAMBLE = struct.Struct('<8sQ')
+
+
+def _align(offset: int) -> int:
+    return (offset + SNAPSHOT_ALIGNMENT - 1) // SNAPSHOT_ALIGNMENT * SNAPSHOT_ALIGNMENT
+
+
+def _string_table(strings) -> Tuple[np.ndarray, np.ndarray]:
+    """UTF-8 bytes of all strings back to back, plus N + 1 byte offsets"""
+    encoded = [str(s).encode('utf-8') for s in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum(np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded)), out=offsets[1:])
+    return np.frombuffer(b''.join(encoded), dtype=np.uint8), offsets
+
+
+def write_snapshot(csr: CSRGraph, filepath: str, metadata: Dict[str, Any] = None) -> Dict[str, Any]:
+    """
+    Write a graph to a binary snapshot file, atomically
+
+    The file holds a JSON header describing every array, followed by the raw
+    CSR/CSC adjacency, weight, relationship-type code and node attribute
+    arrays and a UTF-8 string table of node handles. It is written to a
+    temporary file that is fsynced and then renamed over ``filepath``, so a
+    crash leaves either the old snapshot or the new one, never a torn file.
+
+    Args:
+        csr: Graph in CSR form
+        filepath: Snapshot file path
+        metadata: Optional JSON-serializable values stored in the header
+
+    Returns:
+        Summary with path, node and edge counts, size in bytes and seconds taken
+    """
+    started = time.perf_counter()
+    handle_bytes, handle_offsets = _string_table(csr.nodes)
+    arrays = [(name, np.ascontiguousarray(getattr(csr, name))) for name in SNAPSHOT_ARRAYS]
+    arrays += [('handle_offsets', handle_offsets), ('handle_bytes', handle_bytes)]
+
+    descriptors = {}
+    offset = 0
+    for name, array in arrays:
+        descriptors[name] = {'dtype': array.dtype.str, 'length': len(array), 'offset': offset}
+        offset = _align(offset + array.nbytes)
+
+    header = json.dumps({
+        'format_version': SNAPSHOT_FORMAT_VERSION,
+        'node_count': csr.number_of_nodes(),
+        'edge_count': csr.number_of_edges(),
+        'relationship_types': list(csr.relationship_types),
+        'node_types': list(csr.node_types),
+        'niches': list(csr.niches),
+        'arrays': descriptors,
+        'metadata': metadata or {},
+        'created_at': time.time()
+    }).encode('utf-8')
+    data_start = _align(_PREAMBLE.size + len(header))
+
+    directory = os.path.dirname(os.path.abspath(filepath))
+    os.makedirs(directory, exist_ok=True)
+    temp_path = f'{filepath}.tmp-{os.getpid()}-{threading.get_ident()}'
+    try:
+        with open(temp_path, 'wb') as f:
+            f.write(_PREAMBLE.pack(SNAPSHOT_MAGIC, len(header)))
+            f.write(header)
+            for name, array in arrays:
+                f.seek(data_start + descriptors[name]['offset'])
+                f.write(memoryview(array).cast('B'))
+            f.truncate(data_start + offset)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, filepath)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+    # Persist the rename itself; not every platform can open a directory
+    try:
+        directory_fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        directory_fd = None
+    if directory_fd is not None:
+        try:
+            os.fsync(directory_fd)
+        finally:
+            os.close(directory_fd)
+
+    return {
+        'path': filepath,
+        'node_count': csr.number_of_nodes(),
+        'edge_count': csr.number_of_edges(),
+        'bytes': data_start + offset,
+        'seconds': time.perf_counter() - started
+    }
+
+
+def read_snapshot(filepath: str, mmap: bool = True) -> Tuple[CSRGraph, Dict[str, Any]]:
+    """
+    Load a graph from a binary snapshot file
+
+    With ``mmap`` every array is a read-only ``np.memmap`` over the file, so
+    loading does no parsing beyond decoding the handle string table, pages are
+    read on first touch, and processes that open the same snapshot share
+    them through the page cache.
+
+    Args:
+        filepath: Snapshot file path
+        mmap: Memory-map the arrays instead of reading them into memory
+
+    Returns:
+        Tuple of (CSRGraph, header) where the header holds counts, type
+        tables, creation time and the metadata passed to write_snapshot
+    """
+    with open(filepath, 'rb') as f:
+        preamble = f.read(_PREAMBLE.size)
+        if len(preamble) < _PREAMBLE.size:
+            raise ValueError(f'{filepath} is not a graph snapshot')
+        magic, header_length = _PREAMBLE.unpack(preamble)
+        if magic != SNAPSHOT_MAGIC:
+            raise ValueError(f'{filepath} is not a graph snapshot')
+        header = json.loads(f.read(header_length).decode('utf-8'))
+        if header.get('format_version') != SNAPSHOT_FORMAT_VERSION:
+            raise ValueError(f"Unsupported snapshot format version {header.get('format_version')}")
+        data_start = _align(_PREAMBLE.size + header_length)
+
+        arrays = {}
+        for name, descriptor in header['arrays'].items():
+            dtype, length = np.dtype(descriptor['dtype']), descriptor['length']
+            if mmap and length > 0:
+                arrays[name] = np.memmap(filepath, dtype=dtype, mode='r', shape=(length,),
+                                         offset=data_start + descriptor['offset'])
+            else:
+                f.seek(data_start + descriptor['offset'])
+                arrays[name] = np.fromfile(f, dtype=dtype, count=length)
+
+    blob = arrays.pop('handle_bytes').tobytes()
+    offsets = arrays.pop('handle_offsets').tolist()
+    nodes = [blob[start:end].decode('utf-8') for start, end in zip(offsets, offsets[1:])]
+
+    # Snapshots written before niches were tracked have no niche table
+    csr = CSRGraph(nodes, *(arrays[name] for name in SNAPSHOT_ARRAYS[:8]),
+                   header['relationship_types'], arrays['follower_count'], arrays['engagement_score'],
+                   arrays['node_type_codes'], header['node_types'], arrays.get('niche_codes'), header.get('niches'))
+    return csr, header
+
+
+class SnapshotWriter:
+    """Writes snapshots of a GraphStore on demand or on a schedule
+
+    Each snapshot is taken from the store's frozen read snapshot, so writing
+    never blocks ingestion. A scheduled save is skipped when the graph
+    version has not changed since the last snapshot. With a mutation log,
+    every snapshot records the log position it covers and compacts the log
+    up to there. Writers do not save inline: ``request_save`` and
+    ``compact_if_needed`` wake the background thread instead, the latter
+    once the log holds ``max_log_records`` records.
+    """
+
+    def __init__(self, graph_store: GraphStore, filepath: str, interval: float = 0,
+                 mutation_log: MutationLog = None, max_log_records: int = DEFAULT_MAX_LOG_RECORDS):
+        self.graph_store = graph_store
+        self.filepath = filepath
+        self.interval = interval
+        self.mutation_log = mutation_log
+        self.max_log_records = max_log_records
+        self.saved_version: Optional[int] = None
+        self.last_save: Optional[Dict[str, Any]] = None
+        self.requested_saves = 0
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._requested = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def save(self, force: bool = True) -> Optional[Dict[str, Any]]:
+        """
+        Snapshot the current graph version
+
+        Args:
+            force: Write even if this version was already saved
+
+        Returns:
+            Summary from write_snapshot, or None if the save was skipped
+        """
+        with self._lock:
+            # Version and log position are read under the lock the snapshot is current under
+            graph, (version, log_seq) = self.graph_store.snapshot_with(
+                lambda: (self.graph_store.version, self.mutation_log.seq if self.mutation_log is not None else 0))
+            if not force and version == self.saved_version:
+                return None
+            result = write_snapshot(CSRGraph.from_networkx(graph), self.filepath,
+                                    {'graph_version': version, 'log_seq': log_seq})
+            if self.mutation_log is not None:
+                result['log_records_compacted'] = self.mutation_log.truncate(log_seq)
+            result['graph_version'] = version
+            result['log_seq'] = log_seq
+            self.saved_version = version
+            self.last_save = result
+            return result
+
+    def load(self) -> Optional[Dict[str, Any]]:
+        """
+        Replace the store's graph with the saved snapshot, if there is one,
+        and number new log records after the log position it covers
+
+        Returns:
+            Snapshot header, or None if no snapshot file exists
+        """
+        if not os.path.exists(self.filepath):
+            return None
+        csr, header = read_snapshot(self.filepath)
+
+        def mutation(graph):
+            graph.clear()
+            csr.to_networkx(graph)
+            if self.graph_store.graph_stats is not None:
+                self.graph_store.graph_stats.rebuild(graph)
+        self.graph_store.apply(mutation)
+        self.saved_version = self.graph_store.version
+        if self.mutation_log is not None:
+            self.mutation_log.resume_after(header['metadata'].get('log_seq', 0))
+        return header
+
+    def request_save(self) -> None:
+        """Ask the background thread to snapshot the current version soon"""
+        if not self._requested.is_set():
+            self.requested_saves += 1
+            self._requested.set()
+
+    def compact_if_needed(self) -> bool:
+        """
+        Request a save once the mutation log has grown past ``max_log_records``
+
+        Returns:
+            True if a save was requested
+        """
+        if self.mutation_log is None or self.max_log_records <= 0:
+            return False
+        if self.mutation_log.records_retained < self.max_log_records:
+            return False
+        self.request_save()
+        return True
+
+    def start(self) -> None:
+        """Start the daemon thread that saves on request and every ``interval`` seconds"""
+        if self._thread is not None:
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name='snapshot-writer', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the background saves"""
+        self._stopped.set()
+        self._requested.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        while True:
+            self._requested.wait(self.interval if self.interval > 0 else None)
+            if self._stopped.is_set():
+                return
+            self._requested.clear()
+            try:
+                self.save(force=False)
+            except Exception as e:
+                print(f"Error writing snapshot: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Path, schedule and the outcome of the last save"""
+        return {
+            'path': self.filepath,
+            'interval': self.interval,
+            'max_log_records': self.max_log_records,
+            'requested_saves': self.requested_saves,
+            'saved_version': self.saved_version,
+            'last_save': self.last_save
+        }